@@ -1,74 +1,418 @@
+import asyncio
+import json
+import time
+from typing import List
 from fastapi import APIRouter, UploadFile, File, HTTPException
-import cv2
-import numpy as np
-from backend.services.validator import validator
-from backend.services.preprocessing import preprocess_image
-from backend.services.inference import inference_service
-from backend.services.xai import xai_service
-from backend.services.anatomy import locate_tumor
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from backend.core.config import settings
+from backend.services.executor import pipeline_executor, PipelineBusyError
+from backend.services.heatmaps import heatmap_store, to_base64
+from backend.services.lifecycle import model_lifecycle, ModelNotReadyError
+from backend.services import metrics
+from backend.services.result_cache import result_cache
+from backend.services.uploads import UploadError, expand_uploads, read_upload, screen_image
 
 router = APIRouter()
 
-@router.post("/analyze")
-async def analyze_mri(file: UploadFile = File(...)):
-    # 1. Read Bytes
-    contents = await file.read()
-    
-    # 2. Strict Validation
-    validation = validator.validate(contents)
-    if not validation["valid"]:
-        raise HTTPException(status_code=400, detail=validation["error"])
-        
-    try:
-        # Decode for processing
-        nparr = np.frombuffer(contents, np.uint8)
-        original_image = cv2.imdecode(nparr, cv2.IMREAD_UNCHANGED)
-        
-        # 3. Preprocessing (for display/mask only)
-        processed = preprocess_image(original_image)
-        
-        # 4. Inference (uses RAW image - applies its own transforms)
-        classification = inference_service.classify_tumor(original_image)
-        mask = inference_service.segment_tumor(processed)
-        
-        # 5. GradCAM Visualization (shows WHERE tumor is detected)
-        class_idx = classification.get("class_index", 0)
-        gradcam_result = inference_service.generate_visualization(original_image, class_idx)
-        
-        # 6. Anatomical Localization
-        location = locate_tumor(mask)
-        
-        # 7. XAI Generation (text explanation)
-        heatmap = xai_service.generate_heatmap(original_image, mask)
-        explanation = xai_service.generate_explanation(classification, location)
-        
-        # Build response with GradCAM
+def _cache_key(service, contents: bytes, explain: bool, frame: int = None) -> str:
+    variant = "" if explain else "no-explain"
+    if frame:
+        variant += f"|frame={frame}"
+    return result_cache.key_for(contents, service.model_version, variant)
+
+async def _analyze(contents: bytes, explain: bool = True, wait: bool = False, frame: int = None):
+    """
+    Validate + analyze on the worker pool (keeps the event loop free).
+    Returns (result, cache source). Cached results are shared - never mutate them.
+    """
+    service = model_lifecycle.require()
+    # Loaded by the lifecycle (or the worker process) - not at app import
+    from backend.services.pipeline import run_analysis
+
+    async def compute():
+        result, timing = await pipeline_executor.run("analyze", run_analysis, contents, explain, frame, wait=wait)
+        result["timings"] = {**timing, "stages": result.pop("stages")}
+        metrics.observe_pipeline(timing, result["timings"]["stages"])
+        return result
+
+    if settings.CACHE_ENABLED:
+        # Retried / duplicate uploads reuse the stored (or in-flight) result
+        key = _cache_key(service, contents, explain, frame)
+        return await result_cache.get_or_compute(key, compute)
+    return await compute(), "disabled"
+
+HEATMAP_DELIVERY_MODES = ("base64", "url")
+
+def _delivery_mode(heatmap: str) -> str:
+    mode = heatmap or settings.HEATMAP_DELIVERY
+    if mode not in HEATMAP_DELIVERY_MODES:
+        raise HTTPException(status_code=400, detail=f"heatmap must be one of {', '.join(HEATMAP_DELIVERY_MODES)}")
+    return mode
+
+def _deliver_gradcam(gradcam: dict, delivery: str) -> dict:
+    """
+    Finalizes the cached/raw "gradcam" block for one response:
+    base64 inlines the image (legacy clients), url parks the raw bytes in the
+    heatmap store and returns GET /api/v1/heatmaps/{id} instead.
+    """
+    data = gradcam.get("heatmap")
+    details = {k: v for k, v in gradcam.items() if k not in ("heatmap", "heatmap_media_type")}
+    if data is None:
+        return {"heatmap_base64": None, **details}
+    if delivery == "url":
+        heatmap_id = heatmap_store.put(data, gradcam["heatmap_media_type"])
         return {
-            "status": "success",
-            "validation": validation,
-            "classification": classification,
-            "segmentation": {
-                "mask_base64": "dummy_base64_mask",
-                "has_tumor": classification["type"].lower() != "notumor"
-            },
-            "anatomy": location,
-            "xai": {
-                "heatmap_base64": heatmap,
-                "explanation": explanation
-            },
-            "gradcam": {
-                "heatmap_base64": gradcam_result.get("heatmap"),
-                "tumor_location": gradcam_result.get("location", "Analysis pending"),
-                "intensity": gradcam_result.get("intensity", 0),
-                "available": gradcam_result.get("success", False)
-            }
+            "heatmap_base64": None,
+            "heatmap_id": heatmap_id,
+            "heatmap_url": f"{settings.API_V1_STR}/heatmaps/{heatmap_id}",
+            "heatmap_media_type": gradcam["heatmap_media_type"],
+            **details
         }
+    started = time.perf_counter()
+    heatmap_base64 = to_base64(data)
+    metrics.STAGE_SECONDS.observe(time.perf_counter() - started, stage="base64")
+    return {"heatmap_base64": heatmap_base64, **details}
+
+def _ndjson(event: dict) -> str:
+    return json.dumps(event) + "\n"
+
+def _result_events(result: dict, source: str, delivery: str):
+    """A complete (e.g. cached) result as the same events a live stream sends."""
+    first = {k: v for k, v in result.items() if k not in ("gradcam", "timings")}
+    yield _ndjson({"event": "classification", **first})
+    yield _ndjson({"event": "gradcam", "gradcam": _deliver_gradcam(result["gradcam"], delivery)})
+    yield _ndjson({"event": "done", "timings": {**result["timings"], "cache": source}})
+
+async def _start_stream(contents: bytes, explain: bool, delivery: str, frame: int = None):
+    """
+    Progressive /analyze: runs validation + classification, then returns
+    (status, response) where the response streams the classification right
+    away and the GradCAM heatmap once it has been rendered.
+    Invalid uploads return ("invalid", validation) so the caller can 400.
+    """
+    service = model_lifecycle.require()
+    from backend.services.pipeline import classify_upload, run_explanation, gradcam_response, NOT_REQUESTED
+
+    key = _cache_key(service, contents, explain, frame) if settings.CACHE_ENABLED else None
+    cached = result_cache.lookup(key) if key else None
+    if cached is not None:
+        if cached["status"] == "invalid":
+            return "invalid", cached["validation"]
+        return "success", StreamingResponse(_result_events(cached, "hit", delivery), media_type="application/x-ndjson")
+
+    (ctx, partial), timing = await pipeline_executor.run("analyze_classify", classify_upload, contents, explain, frame)
+    if partial["status"] == "invalid":
+        return "invalid", partial["validation"]
+
+    async def events():
+        cam = partial.pop("cam")
+        stages = partial.pop("stages")
+        yield _ndjson({"event": "classification", **partial})
+
+        queue_wait, compute = timing["queue_wait_ms"], timing["compute_ms"]
+        if explain:
+            try:
+                # Connection is already open: wait for a worker rather than reject
+                (gradcam, explain_stages), explain_timing = await pipeline_executor.run(
+                    "analyze_explain", run_explanation, ctx, partial["classification"], cam, wait=True
+                )
+            except Exception as e:
+                yield _ndjson({"event": "error", "error": f"Explanation failed: {str(e)}"})
+                return
+            stages = {**stages, **explain_stages}
+            queue_wait += explain_timing["queue_wait_ms"]
+            compute += explain_timing["compute_ms"]
+        else:
+            gradcam = gradcam_response(NOT_REQUESTED)
+        yield _ndjson({"event": "gradcam", "gradcam": _deliver_gradcam(gradcam, delivery)})
+
+        timings = {"queue_wait_ms": round(queue_wait, 2), "compute_ms": round(compute, 2), "stages": stages}
+        metrics.observe_pipeline(timings, stages)
+        yield _ndjson({"event": "done", "timings": {**timings, "cache": "miss" if key else "disabled"}})
+        if key:
+            await result_cache.store(key, {**partial, "gradcam": gradcam, "timings": timings})
+
+    return "success", StreamingResponse(events(), media_type="application/x-ndjson")
+
+@router.post("/analyze")
+async def analyze_mri(file: UploadFile = File(...), stream: bool = False, explain: bool = True, heatmap: str = None,
+                      frame: int = None):
+    """
+    stream=true: NDJSON events - "classification" (validation, classification,
+    anatomy, text explanation) as soon as it exists, then "gradcam", then "done".
+    explain=false: skip GradCAM entirely (gradcam.available is false).
+    heatmap=base64|url: inline base64 image or a short-lived heatmap URL
+    (default HEATMAP_DELIVERY).
+    frame: which frame of a multi-frame DICOM to analyze (default 0).
+    """
+    delivery = _delivery_mode(heatmap)
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        # 1. Read Bytes (capped while streaming) + reject what can't pass from the header alone
+        try:
+            contents = await read_upload(file, settings.MAX_UPLOAD_BYTES, settings.UPLOAD_CHUNK_SIZE)
+            screen_image(contents, settings.MIN_IMAGE_SIDE, settings.MAX_IMAGE_SIDE)
+        except UploadError as e:
+            outcome = "rejected"
+            raise HTTPException(status_code=e.status_code, detail=str(e))
+
+        # 2. Validate + analyze
+        try:
+            if stream:
+                outcome, response = await _start_stream(contents, explain, delivery, frame)
+                if outcome == "invalid":
+                    raise HTTPException(status_code=400, detail=response["error"])
+                return response
+            result, source = await _analyze(contents, explain, frame=frame)
+        except HTTPException:
+            raise
+        except ModelNotReadyError as e:
+            outcome = "not_ready"
+            raise HTTPException(
+                status_code=503,
+                detail=f"Model is not ready yet ({e.state}). Please try again shortly.",
+                headers={"Retry-After": str(e.retry_after)}
+            )
+        except PipelineBusyError as e:
+            outcome = "busy"
+            raise HTTPException(
+                status_code=503,
+                detail="Server is busy. Please try again shortly.",
+                headers={"Retry-After": str(e.retry_after)}
+            )
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+
+        outcome = result["status"]
+        if result["status"] == "invalid":
+            raise HTTPException(status_code=400, detail=result["validation"]["error"])
+
+        response = dict(result)
+        response["gradcam"] = _deliver_gradcam(result["gradcam"], delivery)
+        response["timings"] = {**result["timings"], "cache": source}
+        return response
+    finally:
+        metrics.REQUESTS.inc(endpoint="analyze", outcome=outcome)
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint="analyze")
 
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+async def _stream_batch(images: list, delivery: str):
+    """
+    Yields one NDJSON line per image in completion order, then a summary line.
+    Several images are in flight at once so the classifier micro-batcher can
+    stack them; validation errors and failures are reported per image.
+    """
+    slots = asyncio.Semaphore(max(1, settings.ANALYZE_BATCH_CONCURRENCY))
+    counts = {"success": 0, "invalid": 0, "error": 0}
+
+    async def analyze_one(index: int, filename: str, contents: bytes, frame: int) -> dict:
+        line = {"index": index, "filename": filename}
+        async with slots:
+            started = time.perf_counter()
+            try:
+                screen_image(contents, settings.MIN_IMAGE_SIDE, settings.MAX_IMAGE_SIDE)
+                # The client is already connected and waiting: queue, don't reject
+                result, source = await _analyze(contents, wait=True, frame=frame)
+            except UploadError as e:
+                line.update(status="invalid", error=str(e))
+            except Exception as e:
+                line.update(status="error", error=f"Analysis failed: {str(e)}")
+            else:
+                if result["status"] == "invalid":
+                    line.update(status="invalid", error=result["validation"]["error"])
+                else:
+                    line.update(
+                        result,
+                        gradcam=_deliver_gradcam(result["gradcam"], delivery),
+                        timings={**result["timings"], "cache": source}
+                    )
+            metrics.REQUESTS.inc(endpoint="analyze_batch", outcome=line["status"])
+            metrics.REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint="analyze_batch")
+        return line
+
+    tasks = [asyncio.create_task(analyze_one(i, *image)) for i, image in enumerate(images)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            line = await next_done
+            counts[line["status"]] += 1
+            yield json.dumps(line) + "\n"
+        yield json.dumps({"status": "done", "total": len(images), **counts}) + "\n"
+    finally:
+        # Client went away: stop the images that haven't started yet
+        for task in tasks:
+            task.cancel()
+
+@router.post("/analyze/batch")
+async def analyze_batch(files: List[UploadFile] = File(...), heatmap: str = None):
+    """
+    Analyzes many slices (individual files, zip archives and/or multi-frame
+    DICOM files, one line per frame) in one request.
+    Streams application/x-ndjson: one line per image as it finishes.
+    """
+    delivery = _delivery_mode(heatmap)
+    if not model_lifecycle.ready:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Model is not ready yet ({model_lifecycle.state}). Please try again shortly.",
+            headers={"Retry-After": str(model_lifecycle.retry_after)}
+        )
+
+    try:
+        # Zips may exceed the per-image limit; their entries are checked while unpacking
+        uploads = [
+            # Byte cap only: unsupported files become per-image "invalid" lines
+            (file.filename, await read_upload(file, settings.MAX_REQUEST_BYTES, settings.UPLOAD_CHUNK_SIZE, sniff=False))
+            for file in files
+        ]
+        images = expand_uploads(uploads, settings.ANALYZE_BATCH_MAX_IMAGES, settings.MAX_UPLOAD_BYTES,
+                                   settings.MAX_EXPANDED_BYTES, settings.MAX_ZIP_RATIO)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    if not images:
+        raise HTTPException(status_code=400, detail="No images in upload")
+
+    return StreamingResponse(_stream_batch(images, delivery), media_type="application/x-ndjson")
+
+async def _stream_study(slices: list, delivery: str, top_k: int, early_stop: bool):
+    """
+    NDJSON for /analyze/study: "slices" events as each batch of slices is
+    classified, then "verdict", one "gradcam" per top slice, and "done".
+    """
+    from backend.services.study import StudyAggregator, classify_slices, explain_slices
+
+    service = model_lifecycle.require()
+    aggregator = StudyAggregator(service.classes, top_k, settings.STUDY_TUMOR_THRESHOLD)
+    by_index = {index: (index, name, data, frame) for index, (name, data, frame) in enumerate(slices)}
+    chunk_size = max(1, settings.STUDY_BATCH_SIZE)
+    started = time.perf_counter()
+    timings = {"queue_wait_ms": 0.0, "compute_ms": 0.0, "forward_ms": 0.0}
+    outcome = "error"
+    analyzed = 0
+    try:
+        # 1. Batched classification, chunk by chunk, until the verdict is certain
+        for start in range(0, len(slices), chunk_size):
+            chunk = [by_index[i] for i in range(start, min(start + chunk_size, len(slices)))]
+            try:
+                (results, forward_ms), timing = await pipeline_executor.run("study_classify", classify_slices, chunk, wait=True)
+            except Exception as e:
+                yield _ndjson({"event": "error", "error": f"Analysis failed: {str(e)}"})
+                return
+            timings["queue_wait_ms"] += timing["queue_wait_ms"]
+            timings["compute_ms"] += timing["compute_ms"]
+            timings["forward_ms"] += forward_ms
+            analyzed += len(chunk)
+            aggregator.add(results)
+            yield _ndjson({"event": "slices", "results": results})
+            if early_stop and aggregator.certain(len(slices) - analyzed):
+                break
+
+        verdict = aggregator.verdict()
+        top = aggregator.top_slices()
+        yield _ndjson({
+            "event": "verdict",
+            "study": verdict,
+            "top_slices": top,
+            "slices_total": len(slices),
+            "slices_analyzed": analyzed,
+            "stopped_early": analyzed < len(slices)
+        })
+
+        # 2. GradCAM only for the top slices, in one stacked pass
+        if top:
+            try:
+                gradcams, timing = await pipeline_executor.run(
+                    "study_explain", explain_slices,
+                    [by_index[item["index"]] for item in top], [item["classification"] for item in top], wait=True
+                )
+            except Exception as e:
+                yield _ndjson({"event": "error", "error": f"Explanation failed: {str(e)}"})
+                return
+            timings["queue_wait_ms"] += timing["queue_wait_ms"]
+            timings["compute_ms"] += timing["compute_ms"]
+            for item, gradcam in zip(top, gradcams):
+                yield _ndjson({
+                    "event": "gradcam",
+                    "index": item["index"],
+                    "filename": slices[item["index"]][0],
+                    "gradcam": _deliver_gradcam(gradcam, delivery)
+                })
+
+        outcome = "success" if verdict["type"] is not None else "invalid"
+        yield _ndjson({"event": "done", "timings": {k: round(v, 2) for k, v in timings.items()}})
+    finally:
+        metrics.REQUESTS.inc(endpoint="analyze_study", outcome=outcome)
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint="analyze_study")
+
+@router.post("/analyze/study")
+async def analyze_study(files: List[UploadFile] = File(...), heatmap: str = None, top_k: int = None,
+                        early_stop: bool = True):
+    """
+    Analyzes one MRI study: an ordered slice series (files, a zip archive
+    and/or a multi-frame DICOM) classified in batches and aggregated into
+    one verdict with the most suspicious slices. GradCAM runs only on the
+    top_k slices (default STUDY_TOP_K). With early_stop, reading stops once
+    no remaining slice could change the verdict; early_stop=false reads
+    every slice regardless. Streams application/x-ndjson.
+    """
+    delivery = _delivery_mode(heatmap)
+    if not model_lifecycle.ready:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Model is not ready yet ({model_lifecycle.state}). Please try again shortly.",
+            headers={"Retry-After": str(model_lifecycle.retry_after)}
+        )
+
+    try:
+        uploads = [
+            # Byte cap only: unsupported files become per-image "invalid" lines
+            (file.filename, await read_upload(file, settings.MAX_REQUEST_BYTES, settings.UPLOAD_CHUNK_SIZE, sniff=False))
+            for file in files
+        ]
+        slices = expand_uploads(uploads, settings.STUDY_MAX_SLICES, settings.MAX_UPLOAD_BYTES,
+                                   settings.MAX_EXPANDED_BYTES, settings.MAX_ZIP_RATIO)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    if not slices:
+        raise HTTPException(status_code=400, detail="No images in upload")
+
+    top_k = settings.STUDY_TOP_K if top_k is None else top_k
+    if top_k < 1:
+        raise HTTPException(status_code=400, detail="top_k must be at least 1")
+    return StreamingResponse(_stream_study(slices, delivery, top_k, early_stop), media_type="application/x-ndjson")
+
+@router.get("/heatmaps/{heatmap_id}")
+def get_heatmap(heatmap_id: str):
+    entry = heatmap_store.get(heatmap_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Heatmap not found or expired")
+    data, media_type = entry
+    return Response(
+        content=data,
+        media_type=media_type,
+        headers={"Cache-Control": f"private, max-age={settings.HEATMAP_TTL_SECONDS}"}
+    )
+
+@router.get("/pipeline/stats")
+def pipeline_stats():
+    return pipeline_executor.stats()
+
+@router.get("/cache/stats")
+def cache_stats():
+    return result_cache.info()
+
+@router.delete("/cache")
+def invalidate_cache():
+    result_cache.invalidate()
+    return {"status": "invalidated"}
 
 @router.get("/health")
 def health_check():
     return {"status": "ok"}
+
+@router.get("/ready")
+def readiness_check():
+    # Liveness is /health; this only turns 200 once the model is loaded and warm
+    status = model_lifecycle.status()
+    return JSONResponse(status_code=200 if model_lifecycle.ready else 503, content=status)
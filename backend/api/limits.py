@@ -0,0 +1,46 @@
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from backend.services import metrics
+
+
+class BodySizeLimitMiddleware:
+    """
+    Caps the request body before anything buffers it. A declared
+    Content-Length over the limit is refused without reading the body;
+    chunked / undeclared bodies are counted as they stream in and the
+    request fails with 413 as soon as they cross the limit.
+    """
+
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    def _detail(self) -> str:
+        return f"Request too large (max {self.max_bytes // (1024 * 1024)} MB)."
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.max_bytes:
+            await self.app(scope, receive, send)
+            return
+
+        declared = dict(scope["headers"]).get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > self.max_bytes:
+            metrics.UPLOAD_REJECTIONS.inc(reason="body_too_large")
+            response = JSONResponse({"detail": self._detail()}, status_code=413, headers={"Connection": "close"})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    metrics.UPLOAD_REJECTIONS.inc(reason="body_too_large")
+                    # Raised inside body parsing: FastAPI passes HTTPException through as the response
+                    raise HTTPException(status_code=413, detail=self._detail())
+            return message
+
+        await self.app(scope, limited_receive, send)
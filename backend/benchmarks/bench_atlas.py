@@ -0,0 +1,150 @@
+"""
+Atlas region scoring vs. the centroid localization it replaced.
+
+    python -m backend.benchmarks.bench_atlas --batch-sizes 1 8 32
+
+legacy mask : cv2.moments centroid -> 3x3 grid (old anatomy.locate_tumor)
+legacy CAM  : np.indices centre of mass -> thirds/40-60% grid (old GradCAM text)
+atlas       : row_bands @ weights @ column_bands -> per-region fractions
+              (services/atlas.py); batches score in one product
+
+Checks, exit non-zero on failure:
+  - the factored product equals scoring against the dense region masks
+  - blobs lying inside one atlas cell get the legacy mask grid's region
+"""
+
+import argparse
+import sys
+import cv2
+import numpy as np
+from backend.benchmarks.common import summarize_latencies, time_call, write_json
+from backend.services.atlas import atlas
+
+LEGACY_REGIONS = [
+    ["Frontal Lobe", "Frontal Lobe", "Frontal Lobe"],
+    ["Temporal Lobe", "Parietal Lobe", "Temporal Lobe"],
+    ["Cerebellum", "Brainstem", "Cerebellum"],
+]
+
+
+def legacy_mask_region(mask: np.ndarray) -> tuple:
+    moments = cv2.moments(mask)
+    if moments["m00"] == 0:
+        return "Unknown", "Unknown"
+    cx, cy = int(moments["m10"] / moments["m00"]), int(moments["m01"] / moments["m00"])
+    height, width = mask.shape
+    hemisphere = "Left" if cx > width // 2 else "Right"
+    try:
+        return LEGACY_REGIONS[cy // (height // 3)][cx // (width // 3)], hemisphere
+    except IndexError:
+        return "Unknown", hemisphere
+
+
+def legacy_cam_region(cam: np.ndarray) -> tuple:
+    h, w = cam.shape
+    y_idx, x_idx = np.indices((h, w))
+    total = cam.sum()
+    cy, cx = (y_idx * cam).sum() / total, (x_idx * cam).sum() / total
+    vertical = "frontal" if cy < h * 0.33 else "occipital" if cy > h * 0.67 else "parietal"
+    horizontal = "left" if cx < w * 0.4 else "right" if cx > w * 0.6 else "midline"
+    return vertical, horizontal
+
+
+def blob_masks(count: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    masks = np.zeros((count, atlas.size, atlas.size), dtype=np.uint8)
+    for mask in masks:
+        for _ in range(rng.integers(1, 3)):
+            center = tuple(int(v) for v in rng.integers(20, atlas.size - 20, 2))
+            axes = tuple(int(v) for v in rng.integers(5, 30, 2))
+            cv2.ellipse(mask, center, axes, float(rng.uniform(0, 180)), 0, 360, 255, -1)
+    return masks
+
+
+def smooth_cams(count: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:atlas.size, 0:atlas.size].astype(np.float32)
+    cams = []
+    for _ in range(count):
+        cy, cx = rng.uniform(20, atlas.size - 20, 2)
+        cam = np.exp(-((yy - cy) ** 2 + (xx - cx) ** 2) / (2 * rng.uniform(10, 40) ** 2))
+        cams.append(cam / cam.max())
+    return np.stack(cams).astype(np.float32)
+
+
+def cell_blobs(count: int, seed: int = 1) -> list:
+    """Small blobs entirely inside one atlas cell (clear of the band edges)."""
+    rng = np.random.default_rng(seed)
+    masks, cells = [], np.argwhere(atlas.masks().any(axis=(2, 3)))
+    dense = atlas.masks()
+    for index in range(count):
+        row, column = cells[index % len(cells)]
+        ys, xs = np.nonzero(dense[row, column])
+        cy = int(rng.integers(ys.min() + 10, ys.max() - 9))
+        cx = int(rng.integers(xs.min() + 10, xs.max() - 9))
+        mask = np.zeros((atlas.size, atlas.size), dtype=np.uint8)
+        cv2.circle(mask, (cx, cy), int(rng.integers(3, 8)), 255, -1)
+        masks.append(mask)
+    return masks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--checks", type=int, default=200, help="Maps per correctness check")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--output", help="Optional JSON output path")
+    args = parser.parse_args()
+
+    failures = 0
+    results = {"atlas_bytes": atlas.row_bands.nbytes + atlas.column_bands.nbytes,
+               "dense_mask_bytes": atlas.masks().size * 4, "checks": {}, "timings": []}
+    print(f"Atlas factors: {results['atlas_bytes'] / 1024:.1f} KB "
+          f"(dense float32 region masks: {results['dense_mask_bytes'] / 1024:.0f} KB)")
+
+    # Factored product == overlap with the dense region masks
+    dense = atlas.masks().astype(np.float32)
+    maps = np.concatenate([blob_masks(args.checks).astype(np.float32), smooth_cams(args.checks)])
+    expected = np.einsum("nyx,rcyx->nrc", maps, dense)
+    max_err = float(np.abs(atlas.overlap(maps) - expected).max() / max(1.0, expected.max()))
+    results["checks"]["dense_rel_err"] = max_err
+    print(f"Factored vs dense overlap: max rel err {max_err:.2e} -> {'PASS' if max_err < 1e-5 else 'FAIL'}")
+    failures += max_err >= 1e-5
+
+    # In-cell blobs: no ambiguity, so the atlas must agree with the legacy grid
+    agree = [atlas.locate(mask)["region"] == legacy_mask_region(mask)[0] for mask in cell_blobs(args.checks)]
+    results["checks"]["in_cell_agreement"] = float(np.mean(agree))
+    print(f"In-cell blobs agreeing with the legacy grid: {np.mean(agree) * 100:.1f}% "
+          f"-> {'PASS' if all(agree) else 'FAIL'}")
+    failures += not all(agree)
+
+    # Straddling blobs are where a centroid label and region fractions can differ
+    masks = blob_masks(args.checks, seed=2)
+    differ = np.mean([atlas.locate(mask)["region"] != legacy_mask_region(mask)[0] for mask in masks])
+    results["checks"]["random_blob_region_differs"] = float(differ)
+    print(f"Random blobs whose dominant region differs from the centroid cell: {differ * 100:.1f}%")
+
+    print(f"{'input':>6} {'batch':>5} {'legacy us/map':>13} {'atlas us/map':>12} {'speedup':>8}")
+    for kind, legacy, source in (("mask", legacy_mask_region, blob_masks), ("cam", legacy_cam_region, smooth_cams)):
+        for batch_size in args.batch_sizes:
+            batch = source(batch_size, seed=3)
+            legacy_stats = summarize_latencies(time_call(lambda: [legacy(m) for m in batch], repeat=args.repeat))
+            if batch_size == 1:
+                atlas_call = lambda: atlas.locate(batch[0])
+            else:
+                atlas_call = lambda: atlas.fractions(batch)
+            atlas_stats = summarize_latencies(time_call(atlas_call, repeat=args.repeat))
+            legacy_us = legacy_stats["p50_ms"] * 1000 / batch_size
+            atlas_us = atlas_stats["p50_ms"] * 1000 / batch_size
+            results["timings"].append({"input": kind, "batch": batch_size, "legacy": legacy_stats,
+                                       "atlas": atlas_stats, "speedup": round(legacy_us / atlas_us, 2)})
+            print(f"{kind:>6} {batch_size:>5} {legacy_us:>13.1f} {atlas_us:>12.1f} {legacy_us / atlas_us:>7.1f}x")
+
+    print("PASS" if failures == 0 else "FAIL")
+    if args.output:
+        write_json(args.output, results)
+    return 0 if failures == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+Side-by-side eager PyTorch vs. TorchScript vs. ONNX Runtime classifier
+benchmark + parity check.
+
+    python -m backend.benchmarks.bench_backends --batch-sizes 1 8 --intra-threads 0 1 2
+
+Parity: every backend must give the same top-1 class as eager PyTorch on
+the fixed synthetic image set, with softmax within --atol. Exits non-zero
+otherwise. Run `python -m backend.training.export_onnx` and
+`python -m backend.training.export_torchscript` first, or pass --export to
+write temporary artifacts from the loaded model.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import numpy as np
+import torch
+from backend.benchmarks.common import ensure_model, synthetic_mri, summarize_latencies, time_call, write_json
+from backend.core.config import settings
+from backend.services.backends import FrozenTorchBackend, OnnxBackend, TorchBackend
+from backend.services.inference import inference_service
+
+
+def _throughput(backend, batch: torch.Tensor, repeat: int) -> dict:
+    durations = time_call(lambda: backend.predict(batch), repeat=repeat)
+    stats = summarize_latencies(durations)
+    stats["images_per_s"] = round(batch.shape[0] / np.median(durations), 2)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=16, help="Fixed parity image set size")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--intra-threads", type=int, nargs="+", default=[settings.ONNX_INTRA_OP_THREADS])
+    parser.add_argument("--graph-optimization", default=settings.ONNX_GRAPH_OPTIMIZATION)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--atol", type=float, default=1e-4)
+    parser.add_argument("--export", action="store_true", help="Export temporary ONNX / TorchScript models first")
+    parser.add_argument("--output", help="Optional JSON output path")
+    args = parser.parse_args()
+
+    service = ensure_model(inference_service)
+    onnx_path, torchscript_path = settings.ONNX_PATH, settings.TORCHSCRIPT_PATH
+    if args.export:
+        from backend.training.export_onnx import export_onnx
+        from backend.training.export_torchscript import export_torchscript
+        export_dir = tempfile.mkdtemp()
+        onnx_path = export_onnx(service.model, os.path.join(export_dir, "classifier.onnx"))
+        torchscript_path = os.path.join(export_dir, "classifier_ts.pt")
+        export_torchscript(service.model, torchscript_path, atol=float("inf"))  # Parity is checked below
+    if not os.path.exists(onnx_path):
+        print(f"ONNX model not found at {onnx_path} (use --export)")
+        return 1
+
+    backends = {"torch": TorchBackend(service.model, service.device)}
+    if os.path.exists(torchscript_path):
+        backends["torchscript"] = FrozenTorchBackend(torchscript_path)
+    else:
+        print(f"TorchScript model not found at {torchscript_path} (use --export)")
+    for threads in args.intra_threads:
+        backends[f"onnx[intra={threads}]"] = OnnxBackend(
+            onnx_path, intra_op_threads=threads, graph_optimization=args.graph_optimization
+        )
+
+    images = torch.stack([service.prepare_tensor(synthetic_mri(512, seed)) for seed in range(args.images)])
+    reference = backends["torch"].predict(images)
+
+    failures = 0
+    results = {"torch_threads": torch.get_num_threads(), "backends": {}}
+    print(f"{'backend':<18} {'top1 agree':>10} {'max|dp|':>9} " +
+          " ".join(f"{'b' + str(b) + ' p50 ms':>11} {'img/s':>8}" for b in args.batch_sizes))
+    for name, backend in backends.items():
+        probabilities = backend.predict(images)
+        agreement = float((probabilities.argmax(1) == reference.argmax(1)).float().mean())
+        max_err = float((probabilities - reference).abs().max())
+        failures += agreement < 1.0 or max_err > args.atol
+
+        entry = {"top1_agreement": agreement, "max_abs_prob_diff": max_err, "batches": {}}
+        row = f"{name:<18} {agreement:>10.3f} {max_err:>9.1e} "
+        for batch_size in args.batch_sizes:
+            stats = _throughput(backend, images[:batch_size], args.repeat)
+            entry["batches"][batch_size] = stats
+            row += f"{stats['p50_ms']:>11} {stats['images_per_s']:>8} "
+        results["backends"][name] = entry
+        print(row)
+
+    print("PASS" if failures == 0 else "FAIL: backend outputs diverge from PyTorch")
+    if args.output:
+        write_json(args.output, results)
+    return 0 if failures == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
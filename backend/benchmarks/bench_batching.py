@@ -0,0 +1,96 @@
+"""
+Micro-batching benchmark: throughput vs. p99 latency of classification
+at 1/4/16/64 concurrent clients, with and without the BatchScheduler.
+
+    python -m backend.benchmarks.bench_batching --max-batch 8 --max-wait-ms 5
+
+Uses the real InferenceService model; falls back to randomly initialized
+weights (same architecture, same cost) when no checkpoint is present.
+"""
+
+import argparse
+import threading
+import time
+import torch
+from backend.benchmarks.common import ensure_model, synthetic_mri, summarize_latencies, write_json
+from backend.services.batching import BatchScheduler
+from backend.services.inference import inference_service
+
+
+def _drive(classify, tensors: list, concurrency: int, total_requests: int) -> dict:
+    latencies = []
+    lock = threading.Lock()
+    next_index = [0]
+
+    def client():
+        while True:
+            with lock:
+                index = next_index[0]
+                next_index[0] += 1
+            if index >= total_requests:
+                return
+            start = time.perf_counter()
+            classify(tensors[index % len(tensors)])
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "throughput_rps": round(total_requests / wall, 2),
+        **summarize_latencies(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--requests-per-client", type=int, default=4)
+    parser.add_argument("--min-requests", type=int, default=32)
+    parser.add_argument("--max-batch", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--output", help="Optional JSON output path")
+    args = parser.parse_args()
+
+    service = ensure_model(inference_service)
+    tensors = [service.prepare_tensor(synthetic_mri(512, seed)) for seed in range(8)]
+
+    # Warm up kernels before measuring
+    service.predict_batch(tensors[:args.max_batch])
+
+    scheduler = BatchScheduler(service.predict_batch, args.max_batch, args.max_wait_ms, name="bench-batcher")
+    modes = {
+        "unbatched": lambda t: service.predict_batch([t])[0],
+        "batched": scheduler.submit,
+    }
+
+    results = {"max_batch": args.max_batch, "max_wait_ms": args.max_wait_ms,
+               "torch_threads": torch.get_num_threads(), "runs": []}
+
+    print(f"{'mode':<10} {'clients':>7} {'req/s':>8} {'p50 ms':>9} {'p99 ms':>9} {'avg batch':>9}")
+    for concurrency in args.concurrency:
+        total = max(args.min_requests, concurrency * args.requests_per_client)
+        for mode, classify in modes.items():
+            scheduler.batches = scheduler.items = 0
+            run = _drive(classify, tensors, concurrency, total)
+            run["mode"] = mode
+            run["mean_batch_size"] = round(scheduler.mean_batch_size, 2) if mode == "batched" else 1.0
+            results["runs"].append(run)
+            print(f"{mode:<10} {concurrency:>7} {run['throughput_rps']:>8} {run['p50_ms']:>9} "
+                  f"{run['p99_ms']:>9} {run['mean_batch_size']:>9}")
+
+    scheduler.stop()
+    if args.output:
+        write_json(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
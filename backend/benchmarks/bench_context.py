@@ -0,0 +1,133 @@
+"""
+Per-stage decode/convert/resize counts: legacy pipeline vs. AnalysisContext.
+
+    python -m backend.benchmarks.bench_context --size 2048
+
+The legacy column replays the pre-context call sequence (validator decode,
+second imdecode, preprocess_image, PIL transform in classify, cvtColor +
+resize + PIL transform again in GradCAM). The context column runs the
+current stages. Model forward passes are excluded from both; only image
+preparation is measured. Peak traced memory comes from tracemalloc, which
+sees NumPy/OpenCV array buffers.
+"""
+
+import argparse
+import time
+import tracemalloc
+from collections import Counter
+import cv2
+import numpy as np
+from PIL import Image
+from backend.benchmarks.common import synthetic_mri_bytes
+from backend.services.context import AnalysisContext
+from backend.services.inference import inference_service
+from backend.services.preprocessing import preprocess_image
+from backend.services.validator import validator
+
+TRACKED = {
+    "imdecode": (cv2, "imdecode"),
+    "cvtColor": (cv2, "cvtColor"),
+    "resize": (cv2, "resize"),
+    "fromarray": (Image, "fromarray"),
+}
+
+
+class OpCounter:
+    """Temporarily wraps the tracked image functions and counts their calls."""
+
+    def __init__(self):
+        self.counts = Counter()
+        self._originals = {}
+
+    def __enter__(self):
+        for name, (module, attr) in TRACKED.items():
+            original = getattr(module, attr)
+            self._originals[name] = original
+
+            def wrapper(*args, _name=name, _original=original, **kwargs):
+                self.counts[_name] += 1
+                return _original(*args, **kwargs)
+            setattr(module, attr, wrapper)
+        return self
+
+    def __exit__(self, *exc):
+        for name, (module, attr) in TRACKED.items():
+            setattr(module, attr, self._originals[name])
+
+
+def _measure(stages: list) -> dict:
+    report = {}
+    for name, fn in stages:
+        tracemalloc.start()
+        with OpCounter() as counter:
+            start = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        report[name] = {
+            "ops": sum(counter.counts.values()),
+            "detail": dict(counter.counts),
+            "peak_kb": round(peak / 1024, 1),
+            "ms": round(elapsed * 1000, 2),
+        }
+    return report
+
+
+def legacy_stages(contents: bytes, transform) -> list:
+    state = {}
+
+    def decode():
+        state["image"] = cv2.imdecode(np.frombuffer(contents, np.uint8), cv2.IMREAD_UNCHANGED)
+
+    def classify_input():
+        rgb = cv2.cvtColor(state["image"], cv2.COLOR_BGR2RGB)
+        transform(Image.fromarray(rgb))
+
+    def gradcam_input():
+        rgb = cv2.cvtColor(state["image"], cv2.COLOR_BGR2RGB)
+        rgb_resized = cv2.resize(rgb, (224, 224))
+        rgb_resized.astype(np.float32) / 255.0
+        transform(Image.fromarray(rgb_resized))
+
+    return [
+        ("validate", lambda: validator.validate(contents)),
+        ("decode", decode),
+        ("preprocess", lambda: preprocess_image(state["image"])),
+        ("classify_input", classify_input),
+        ("gradcam_input", gradcam_input),
+    ]
+
+
+def context_stages(contents: bytes) -> list:
+    ctx = AnalysisContext.from_bytes(contents)
+    return [
+        ("validate", lambda: validator.validate_context(ctx)),
+        ("preprocess", lambda: ctx.rgb_224_float),
+        ("classify_input", lambda: inference_service.context_tensor(ctx)),
+        ("gradcam_input", lambda: (ctx.rgb_224_float, inference_service.context_tensor(ctx))),
+    ]
+
+
+def _print(title: str, report: dict):
+    print(f"\n{title}")
+    print(f"{'stage':<16} {'ops':>4} {'peak KB':>10} {'ms':>8}  detail")
+    for stage, row in report.items():
+        print(f"{stage:<16} {row['ops']:>4} {row['peak_kb']:>10} {row['ms']:>8}  {row['detail']}")
+    total_ops = sum(row["ops"] for row in report.values())
+    total_ms = sum(row["ms"] for row in report.values())
+    print(f"{'total':<16} {total_ops:>4} {'':>10} {total_ms:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=512)
+    args = parser.parse_args()
+
+    contents = synthetic_mri_bytes(args.size)
+    _print(f"Legacy pipeline ({args.size}px)", _measure(legacy_stages(contents, inference_service.transform)))
+    _print(f"AnalysisContext ({args.size}px)", _measure(context_stages(contents)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+DICOM ingestion throughput: lazy memory-mapped frames vs read-everything.
+
+    python -m backend.benchmarks.bench_dicom --frames 300 --size 512 --output dicom.json
+
+Writes a synthetic multi-frame 16-bit MR file and converts every frame to
+the 8-bit image the pipeline consumes, three ways:
+
+  baseline  pydicom.dcmread(...).pixel_array for the whole volume, then
+            rescale + window per frame in float64
+  mmap      DicomImage.open(path).frames(): np.memmap view, one LUT gather per frame
+  bytes     DicomImage.open(upload_bytes).frames(): same, over the upload buffer
+
+Peak memory is tracemalloc (Python/numpy allocations; memory-mapped pages
+belong to the page cache and are not counted).
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pydicom
+from backend.benchmarks.common import synthetic_dicom, write_json
+from backend.services.dicom import DicomImage
+
+
+def _baseline(path: str):
+    ds = pydicom.dcmread(path)
+    volume = ds.pixel_array
+    slope, intercept = float(ds.RescaleSlope), float(ds.RescaleIntercept)
+    center, width = float(ds.WindowCenter), float(ds.WindowWidth)
+    for raw in volume:
+        values = raw.astype(np.float64) * slope + intercept
+        values = ((values - (center - 0.5)) / (width - 1) + 0.5) * 255
+        yield np.clip(np.rint(values), 0, 255).astype(np.uint8)
+
+
+def _run(frames_fn) -> dict:
+    tracemalloc.start()
+    start = time.perf_counter()
+    first = None
+    count = 0
+    checksum = 0
+    for frame in frames_fn():
+        if first is None:
+            first = time.perf_counter() - start
+        checksum += int(frame[::64, ::64].sum())
+        count += 1
+    total = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "frames": count,
+        "total_s": round(total, 3),
+        "frames_per_s": round(count / total, 1),
+        "first_frame_ms": round(first * 1000, 2),
+        "peak_mb": round(peak / 1e6, 2),
+        "checksum": checksum,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--size", type=int, default=512)
+    parser.add_argument("--output", help="Optional JSON output path")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "volume.dcm")
+        data = synthetic_dicom(args.frames, args.size, path=path)
+        print(f"Volume: {args.frames} x {args.size}x{args.size} uint16 ({len(data) / 1e6:.0f} MB)")
+
+        runs = {
+            "baseline": lambda: _baseline(path),
+            "mmap": lambda: DicomImage.open(path).frames(),
+            "bytes": lambda: DicomImage.open(data).frames(),
+        }
+        results = {"frames": args.frames, "size": args.size, "file_mb": round(len(data) / 1e6, 1), "modes": {}}
+        print(f"{'mode':<9} {'total s':>8} {'frames/s':>9} {'first ms':>9} {'peak MB':>8}")
+        for name, frames_fn in runs.items():
+            stats = _run(frames_fn)
+            results["modes"][name] = stats
+            print(f"{name:<9} {stats['total_s']:>8.3f} {stats['frames_per_s']:>9.1f} "
+                  f"{stats['first_frame_ms']:>9.2f} {stats['peak_mb']:>8.2f}")
+
+        checksums = {stats["checksum"] for stats in results["modes"].values()}
+        results["identical_output"] = len(checksums) == 1
+        print(f"Identical 8-bit frames across modes: {results['identical_output']}")
+
+    if args.output:
+        write_json(args.output, results)
+    return 0 if results["identical_output"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Heatmap encoding comparison: bytes on the wire and encode/decode time per format.
+
+    python -m backend.benchmarks.bench_heatmap_encoding --output heatmap_encoding.json
+
+Encodes realistic 224x224 Grad-CAM overlays (synthetic MRI + smooth CAM,
+same overlay code as the API) with every configuration in --configs.
+"wire" is the raw size served by GET /api/v1/heatmaps/{id}; "json" is the
+base64 size inlined by heatmap=base64. PSNR is against the uncompressed
+overlay (inf = lossless).
+"""
+
+import argparse
+import sys
+import cv2
+import numpy as np
+from backend.benchmarks.common import synthetic_mri, time_call, write_json
+from backend.services.context import AnalysisContext
+from backend.services.gradcam_service import GradCAMService, encode_heatmap
+from backend.services.heatmaps import to_base64
+
+DEFAULT_CONFIGS = ["png:0", "png:1", "png:3", "png:6", "png:9", "webp:101", "webp:90", "webp:75", "jpeg:90", "jpeg:75"]
+
+
+def _overlays(count: int) -> list:
+    service = GradCAMService(model=None, device=None)
+    rng = np.random.default_rng(0)
+    overlays = []
+    for seed in range(count):
+        ctx = AnalysisContext.from_image(synthetic_mri(512, seed))
+        cam = cv2.resize(rng.random((7, 7)).astype(np.float32), (224, 224))
+        cam = (cam - cam.min()) / (cam.max() - cam.min() + 1e-7)
+        overlays.append(service._create_enhanced_overlay(ctx.rgb_224_float, cam))
+    return overlays
+
+
+def _psnr(reference: np.ndarray, decoded: np.ndarray) -> float:
+    mse = np.mean((reference.astype(np.float64) - decoded.astype(np.float64)) ** 2)
+    return float("inf") if mse == 0 else float(10 * np.log10(255.0 ** 2 / mse))
+
+
+def _encode(overlay: np.ndarray, fmt: str, level: int) -> bytes:
+    if fmt == "png":
+        return encode_heatmap(overlay, fmt, png_level=level)[0]
+    return encode_heatmap(overlay, fmt, quality=level)[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--configs", nargs="+", default=DEFAULT_CONFIGS,
+                        help="format:level pairs (png level 0-9, webp/jpeg quality)")
+    parser.add_argument("--images", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", help="Optional JSON output path")
+    args = parser.parse_args()
+
+    overlays = _overlays(args.images)
+    raw_bytes = overlays[0].nbytes
+
+    results = {"raw_rgb_bytes": raw_bytes, "configs": {}}
+    print(f"{'config':<10} {'wire B':>8} {'json B':>8} {'vs png:1':>9} {'encode ms':>10} {'decode ms':>10} {'PSNR dB':>8}")
+    # Today's default: PNG (OpenCV level 1) inlined as base64
+    baseline = float(np.mean([len(to_base64(_encode(overlay, "png", 1))) for overlay in overlays]))
+    for config in args.configs:
+        fmt, level = config.split(":")
+        level = int(level)
+
+        encoded = [_encode(overlay, fmt, level) for overlay in overlays]
+        wire = float(np.mean([len(data) for data in encoded]))
+        json_size = float(np.mean([len(to_base64(data)) for data in encoded]))
+        encode_ms = float(np.median(time_call(lambda: _encode(overlays[0], fmt, level), repeat=args.repeat))) * 1000
+        buffer = np.frombuffer(encoded[0], np.uint8)
+        decode_ms = float(np.median(time_call(lambda: cv2.imdecode(buffer, cv2.IMREAD_COLOR), repeat=args.repeat))) * 1000
+        psnr = float(np.mean([
+            _psnr(overlay, cv2.cvtColor(cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR), cv2.COLOR_BGR2RGB))
+            for overlay, data in zip(overlays, encoded)
+        ]))
+
+        results["configs"][config] = {
+            "wire_bytes": round(wire),
+            "json_base64_bytes": round(json_size),
+            "encode_ms": round(encode_ms, 3),
+            "decode_ms": round(decode_ms, 3),
+            "psnr_db": None if np.isinf(psnr) else round(psnr, 2),  # None = lossless
+        }
+        print(f"{config:<10} {wire:>8.0f} {json_size:>8.0f} {wire / baseline:>9.0%} {encode_ms:>10.2f} {decode_ms:>10.2f} {psnr:>8.1f}")
+
+    print("(vs png:1 = raw wire bytes relative to today's inline base64 PNG)")
+    if args.output:
+        write_json(args.output, results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
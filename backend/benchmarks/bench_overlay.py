@@ -0,0 +1,106 @@
+"""
+Heatmap colorization microbenchmark and regression gate.
+
+    python -m backend.benchmarks.bench_overlay --max-ms 5
+
+Checks that the vectorized colormaps in gradcam_service are pixel-identical
+to the original per-pixel loops (kept below as the reference), then times
+the overlay per 224x224 image. With --max-ms the run fails when the median
+overlay time exceeds the budget.
+"""
+
+import argparse
+import sys
+import cv2
+import numpy as np
+from backend.benchmarks.common import time_call
+from backend.services.gradcam_service import GradCAMService, _colorize_cam, _colorize_highlight
+
+
+def _reference_cam_colors(cam: np.ndarray) -> np.ndarray:
+    heatmap = np.zeros((cam.shape[0], cam.shape[1], 3), dtype=np.float32)
+    for i in range(cam.shape[0]):
+        for j in range(cam.shape[1]):
+            v = cam[i, j]
+            if v < 0.2:
+                heatmap[i, j] = [v * 5 * 0.2, v * 5 * 0.2, v * 5]
+            elif v < 0.4:
+                t = (v - 0.2) / 0.2
+                heatmap[i, j] = [0, 0.5 + t * 0.5, 1 - t]
+            elif v < 0.6:
+                t = (v - 0.4) / 0.2
+                heatmap[i, j] = [t, 1, 0]
+            elif v < 0.8:
+                t = (v - 0.6) / 0.2
+                heatmap[i, j] = [1, 1 - t * 0.5, 0]
+            else:
+                t = (v - 0.8) / 0.2
+                heatmap[i, j] = [1, 0.5 - t * 0.5, 0]
+    return heatmap
+
+
+def _reference_highlight_colors(mask: np.ndarray) -> np.ndarray:
+    heatmap = np.zeros((mask.shape[0], mask.shape[1], 3), dtype=np.float32)
+    for i in range(mask.shape[0]):
+        for j in range(mask.shape[1]):
+            v = mask[i, j]
+            if v < 0.3:
+                heatmap[i, j] = [0, 0, v * 3]
+            elif v < 0.6:
+                t = (v - 0.3) / 0.3
+                heatmap[i, j] = [t, 1 - t * 0.5, 1 - t]
+            else:
+                t = (v - 0.6) / 0.4
+                heatmap[i, j] = [1, 0.5 - t * 0.5, 0]
+    return heatmap
+
+
+def _sample_cams(count: int) -> list:
+    rng = np.random.default_rng(0)
+    cams = []
+    for _ in range(count):
+        coarse = rng.random((7, 7)).astype(np.float32)
+        cam = cv2.resize(coarse, (224, 224))
+        cam = (cam - cam.min()) / (cam.max() - cam.min() + 1e-7)
+        cams.append(cam.astype(np.float32))
+    # Exact band boundaries and extremes
+    edges = np.array([0.0, 0.2, 0.3, 0.4, 0.6, 0.8, 1.0], dtype=np.float32)
+    cams.append(np.resize(edges, (224, 224)).astype(np.float32))
+    return cams
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--max-ms", type=float, help="Fail if median overlay time exceeds this")
+    args = parser.parse_args()
+
+    service = GradCAMService(model=None, device=None)
+    cams = _sample_cams(args.images)
+
+    mismatches = 0
+    for cam in cams:
+        mismatches += not np.array_equal(_colorize_cam(cam), _reference_cam_colors(cam))
+        mismatches += not np.array_equal(_colorize_highlight(cam), _reference_highlight_colors(cam))
+    print(f"pixel-identical colormaps: {'yes' if mismatches == 0 else f'NO ({mismatches} maps differ)'}")
+
+    rgb = np.random.default_rng(1).random((224, 224, 3)).astype(np.float32)
+    cam = cams[0]
+    loop_ms = np.median(time_call(lambda: _reference_cam_colors(cam), repeat=3, warmup=0)) * 1000
+    overlay_ms = np.median(time_call(lambda: service._create_enhanced_overlay(rgb, cam), repeat=args.repeat)) * 1000
+    colors_ms = np.median(time_call(lambda: _colorize_cam(cam), repeat=args.repeat)) * 1000
+
+    print(f"reference loop colormap: {loop_ms:8.2f} ms/image")
+    print(f"vectorized colormap:     {colors_ms:8.2f} ms/image")
+    print(f"full overlay:            {overlay_ms:8.2f} ms/image")
+
+    failed = mismatches > 0
+    if args.max_ms is not None and overlay_ms > args.max_ms:
+        print(f"REGRESSION: overlay {overlay_ms:.2f} ms exceeds budget {args.max_ms:.2f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
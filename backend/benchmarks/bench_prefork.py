@@ -0,0 +1,190 @@
+"""
+Multi-worker serving: memory per worker and throughput per core.
+
+    python -m backend.benchmarks.bench_prefork --workers 1 2 4 8 --output prefork.json
+
+For each worker count, starts a real server on localhost in two modes:
+
+  prefork  python -m backend.serve (model loaded once, workers forked, weights shared)
+  uvicorn  uvicorn backend.main:app --workers N (every worker loads its own model)
+
+then drives it with 2 x N concurrent clients posting distinct synthetic
+scans to /api/v1/analyze?explain=false (result cache disabled) for
+--duration seconds. Memory comes from /proc/<pid>/smaps_rollup: RSS counts
+shared pages in every worker, PSS splits them between the sharers, so
+total PSS is the host's real footprint. Linux only.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+import httpx
+import numpy as np
+from backend.benchmarks.common import free_port, stop_server, synthetic_mri_bytes, write_json
+
+
+def _children(pid: int) -> list:
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+
+def _memory_kb(pid: int) -> dict:
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:"):
+                values[parts[0][:-1].lower()] = int(parts[1])
+    return values
+
+
+def _workers(server_pid: int) -> list:
+    """Worker pids; a single-worker uvicorn serves from the server process itself."""
+    # uvicorn's multiprocess mode also starts a multiprocessing resource tracker
+    pids = []
+    for pid in _children(server_pid):
+        try:
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                if b"resource_tracker" in f.read():
+                    continue
+        except OSError:
+            continue
+        pids.append(pid)
+    return pids or [server_pid]
+
+
+def _start(mode: str, workers: int, threads: int, port: int) -> subprocess.Popen:
+    env = dict(os.environ, CACHE_ENABLED="false", OMP_NUM_THREADS=str(threads))
+    if mode == "prefork":
+        command = [sys.executable, "-m", "backend.serve", "--workers", str(workers), "--threads", str(threads),
+                   "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "backend.main:app", "--workers", str(workers),
+                   "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    return subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                            start_new_session=True)
+
+
+def _wait_ready(server: subprocess.Popen, url: str, workers: int, timeout: float) -> bool:
+    """Ready once every worker exists and /ready answered 200 enough times in a row to have hit them all."""
+    deadline = time.monotonic() + timeout
+    streak = 0
+    while time.monotonic() < deadline and server.poll() is None:
+        try:
+            ok = len(_workers(server.pid)) >= workers and httpx.get(f"{url}/api/v1/ready", timeout=5).status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        streak = streak + 1 if ok else 0
+        if streak >= 4 * workers:
+            return True
+        time.sleep(0.25)
+    return False
+
+
+def _load(url: str, payloads: list, clients: int, duration: float) -> dict:
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client(offset: int):
+        with httpx.Client(timeout=120) as http:
+            i = offset
+            while time.monotonic() < stop_at:
+                contents = payloads[i % len(payloads)]
+                i += clients
+                start = time.perf_counter()
+                try:
+                    response = http.post(f"{url}/api/v1/analyze", params={"explain": "false"},
+                                         files={"file": ("scan.png", contents, "image/png")})
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                with lock:
+                    if ok:
+                        latencies.append(time.perf_counter() - start)
+                    else:
+                        errors[0] += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    values = np.asarray(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(float(np.percentile(values, 50)), 1) if len(values) else None,
+        "p99_ms": round(float(np.percentile(values, 99)), 1) if len(values) else None,
+    }
+
+
+def run(mode: str, workers: int, threads: int, args, payloads: list) -> dict:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    server = _start(mode, workers, threads, port)
+    try:
+        if not _wait_ready(server, url, workers, args.startup_timeout):
+            return {"error": "server did not become ready"}
+        load = _load(url, payloads, 2 * workers, args.duration)
+
+        pids = _workers(server.pid)
+        memory = [_memory_kb(pid) for pid in pids]
+        parent = _memory_kb(server.pid) if pids != [server.pid] else {"pss": 0}
+        rss = [m["rss"] / 1024 for m in memory]
+        pss = [m["pss"] / 1024 for m in memory]
+        cores = min(workers * threads, os.cpu_count() or 1)
+        return {
+            **load,
+            "throughput_per_core_rps": round(load["throughput_rps"] / cores, 2),
+            "cores_used": cores,
+            "worker_rss_mb": round(float(np.mean(rss)), 1),
+            "worker_pss_mb": round(float(np.mean(pss)), 1),
+            "parent_pss_mb": round(parent["pss"] / 1024, 1),
+            "total_pss_mb": round(sum(pss) + parent["pss"] / 1024, 1),
+        }
+    finally:
+        stop_server(server)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 2, 4, 8])
+    parser.add_argument("--threads", type=int, default=1, help="torch threads per worker")
+    parser.add_argument("--modes", nargs="+", default=["prefork", "uvicorn"], choices=["prefork", "uvicorn"])
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of load per configuration")
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    parser.add_argument("--output", help="Optional JSON output path")
+    args = parser.parse_args()
+
+    payloads = [synthetic_mri_bytes(256, seed) for seed in range(64)]
+    results = {"cpu_count": os.cpu_count(), "threads_per_worker": args.threads, "runs": []}
+    print(f"{'mode':<8} {'workers':>7} {'req/s':>7} {'req/s/core':>10} {'p99 ms':>8} "
+          f"{'RSS/worker':>10} {'PSS/worker':>10} {'total PSS':>9}")
+    for workers in args.workers:
+        for mode in args.modes:
+            stats = run(mode, workers, args.threads, args, payloads)
+            results["runs"].append({"mode": mode, "workers": workers, **stats})
+            if "error" in stats:
+                print(f"{mode:<8} {workers:>7} {stats['error']}")
+                continue
+            print(f"{mode:<8} {workers:>7} {stats['throughput_rps']:>7.1f} {stats['throughput_per_core_rps']:>10.1f} "
+                  f"{stats['p99_ms']:>8.0f} {stats['worker_rss_mb']:>10.0f} {stats['worker_pss_mb']:>10.0f} "
+                  f"{stats['total_pss_mb']:>9.0f}")
+
+    if args.output:
+        write_json(args.output, results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
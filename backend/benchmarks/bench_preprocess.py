@@ -0,0 +1,96 @@
+"""
+Preprocessing kernel vs. the torchvision/PIL path: parity + throughput.
+
+    python -m backend.benchmarks.bench_preprocess --sizes 256 512 1024 --batch-sizes 1 8 32
+
+reference : per image Image.fromarray -> Resize -> ToTensor -> Normalize, then torch.stack
+kernel    : resize_for_model (uint8 antialiased resize) per image, then
+            BatchPreprocessor.batch (normalize in place into a reused buffer)
+
+Parity: over synthetic MRI slices and random-noise images of several
+shapes (upscales included), the kernel's batch must be within --atol of
+the reference (default: one uint8 level after normalization) and at most
+--max-mismatch of the values may differ at all. Exits non-zero otherwise.
+"""
+
+import argparse
+import sys
+import numpy as np
+import torch
+import cv2
+from backend.benchmarks.common import synthetic_mri, summarize_latencies, time_call, write_json
+from backend.services.preprocessing import BatchPreprocessor, IMAGENET_STD, reference_tensor, resize_for_model
+
+ONE_LEVEL = 1 / 255 / min(IMAGENET_STD)
+
+
+def _parity_images(count: int) -> list:
+    rng = np.random.default_rng(0)
+    images = [cv2.cvtColor(synthetic_mri(size, seed), cv2.COLOR_BGR2RGB)
+              for seed, size in enumerate([512, 256, 300, 1000] * max(1, count // 8))]
+    for height, width in [(512, 512), (600, 480), (224, 224), (150, 190), (2048, 1800)] * max(1, count // 10):
+        images.append(rng.integers(0, 256, (height, width, 3), dtype=np.uint8))
+    return images
+
+
+def _reference_batch(images: list) -> torch.Tensor:
+    return torch.stack([reference_tensor(image) for image in images])
+
+
+def _kernel_batch(preprocessor: BatchPreprocessor, images: list) -> torch.Tensor:
+    return preprocessor.batch([resize_for_model(image) for image in images])
+
+
+def check_parity(preprocessor: BatchPreprocessor, count: int, atol: float = ONE_LEVEL * 1.0001,
+                 max_mismatch: float = 0.01) -> dict:
+    """Kernel vs. reference batch over _parity_images(count): error stats and "passed"."""
+    images = _parity_images(count)
+    reference = _reference_batch(images)
+    kernel = _kernel_batch(preprocessor, images).clone()
+    diff = (kernel - reference).abs()
+    max_err = float(diff.max())
+    mismatch = float((diff > 0).float().mean())
+    return {"images": len(images), "max_abs_diff": max_err, "max_abs_diff_levels": max_err / ONE_LEVEL,
+            "mismatch_fraction": mismatch, "mean_abs_diff": float(diff.mean()),
+            "passed": max_err <= atol and mismatch <= max_mismatch}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[256, 512, 1024])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--parity-images", type=int, default=20)
+    parser.add_argument("--atol", type=float, default=ONE_LEVEL * 1.0001)
+    parser.add_argument("--max-mismatch", type=float, default=0.01, help="Max fraction of differing values")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--output", help="Optional JSON output path")
+    args = parser.parse_args()
+
+    preprocessor = BatchPreprocessor()
+    results = {"torch_threads": torch.get_num_threads(), "parity": {}, "throughput": []}
+
+    parity = results["parity"] = check_parity(preprocessor, args.parity_images, args.atol, args.max_mismatch)
+    passed = parity["passed"]
+    print(f"Parity on {parity['images']} images: max |diff| {parity['max_abs_diff']:.4f} "
+          f"({parity['max_abs_diff_levels']:.2f} levels), {parity['mismatch_fraction'] * 100:.3f}% of values differ "
+          f"-> {'PASS' if passed else 'FAIL'}")
+
+    print(f"{'size':>5} {'batch':>5} {'reference ms':>12} {'kernel ms':>10} {'speedup':>8} {'kernel img/s':>12}")
+    for size in args.sizes:
+        for batch_size in args.batch_sizes:
+            batch = [cv2.cvtColor(synthetic_mri(size, seed), cv2.COLOR_BGR2RGB) for seed in range(batch_size)]
+            ref_stats = summarize_latencies(time_call(lambda: _reference_batch(batch), repeat=args.repeat))
+            kernel_stats = summarize_latencies(time_call(lambda: _kernel_batch(preprocessor, batch), repeat=args.repeat))
+            speedup = ref_stats["p50_ms"] / kernel_stats["p50_ms"]
+            results["throughput"].append({"size": size, "batch": batch_size, "reference": ref_stats,
+                                          "kernel": kernel_stats, "speedup": round(speedup, 2)})
+            print(f"{size:>5} {batch_size:>5} {ref_stats['p50_ms']:>12.2f} {kernel_stats['p50_ms']:>10.2f} "
+                  f"{speedup:>7.1f}x {batch_size / kernel_stats['p50_ms'] * 1000:>12.0f}")
+
+    if args.output:
+        write_json(args.output, results)
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""
+Training input pipeline: epoch time with and without the image cache.
+
+    python -m backend.benchmarks.bench_training_data --images 800 --epochs 3 --workers 2
+    python -m backend.benchmarks.bench_training_data --data-dir "/data/Brain MRI" --train-step
+
+Pipelines over the Training split (train.py's batch size and augmentation):
+
+  imagefolder          ImageFolder, num_workers=0 (the previous train.py)
+  imagefolder+workers  ImageFolder, --workers persistent workers
+  cache                CachedImageFolder (pre-decoded uint8 memmap shards,
+                       same PIL augmentation minus the Resize), num_workers=0
+  cache+workers        CachedImageFolder, --workers persistent workers
+
+Epoch 1 includes starting the workers; later epochs reuse them. --train-step
+adds an EfficientNet-B0 forward/backward per batch (random weights) to
+show the share of a real epoch. Also times the class-weight computation
+(iterating the transformed dataset vs. reading its targets) and checks that
+cached validation tensors equal the ImageFolder ones. Without --data-dir a
+synthetic ImageFolder of JPEG slices is written to a temporary directory.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+import cv2
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader
+from torchvision import datasets, models
+from backend.benchmarks.common import synthetic_mri, write_json
+from backend.training.image_cache import CachedImageFolder, build_cache
+from backend.training.train import BATCH_SIZE, INPUT_SIZE, class_weights_from_targets, get_data_transforms
+
+CLASSES = ("glioma", "meningioma", "notumor", "pituitary")
+
+
+def _synthetic_dataset(root: str, images: int, size: int):
+    counts = {"Training": images, "Validation": max(len(CLASSES), images // 8), "Testing": max(len(CLASSES), images // 8)}
+    seed = 0
+    for split, count in counts.items():
+        for index in range(count):
+            class_dir = os.path.join(root, split, CLASSES[index % len(CLASSES)])
+            os.makedirs(class_dir, exist_ok=True)
+            cv2.imwrite(os.path.join(class_dir, f"{index:05d}.jpg"), synthetic_mri(size, seed))
+            seed += 1
+
+
+def _epochs(loader: DataLoader, epochs: int, step=None) -> list:
+    times = []
+    for _ in range(epochs):
+        start = time.perf_counter()
+        for inputs, labels in loader:
+            if step is not None:
+                step(inputs, labels)
+        times.append(round(time.perf_counter() - start, 2))
+    return times
+
+
+def _train_step():
+    torch.manual_seed(0)
+    model = models.efficientnet_b0(weights=None, num_classes=len(CLASSES))
+    optimizer = torch.optim.AdamW(model.parameters(), lr=1e-3)
+    criterion = nn.CrossEntropyLoss()
+    model.train()
+
+    def step(inputs, labels):
+        optimizer.zero_grad()
+        criterion(model(inputs), labels).backward()
+        optimizer.step()
+    return step
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", help="ImageFolder root with Training/Validation/Testing (default: synthetic)")
+    parser.add_argument("--images", type=int, default=800, help="Synthetic training images")
+    parser.add_argument("--image-size", type=int, default=512, help="Synthetic JPEG side")
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--train-step", action="store_true", help="Include an EfficientNet-B0 training step")
+    parser.add_argument("--output", help="Optional JSON output path")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        data_dir = args.data_dir
+        if data_dir is None:
+            data_dir = os.path.join(scratch, "data")
+            print(f"Writing {args.images} synthetic {args.image_size}px training JPEGs...")
+            _synthetic_dataset(data_dir, args.images, args.image_size)
+        cache_dir = os.path.join(scratch, "cache")
+        plain, cached = get_data_transforms(INPUT_SIZE), get_data_transforms(INPUT_SIZE, cached=True)
+        results = {"cpu_count": os.cpu_count(), "workers": args.workers, "batch_size": BATCH_SIZE,
+                   "train_step": args.train_step, "epochs": {}}
+
+        start = time.perf_counter()
+        build_cache(data_dir, cache_dir, INPUT_SIZE, ("Training", "Validation"), num_workers=args.workers)
+        results["cache_build_s"] = round(time.perf_counter() - start, 2)
+
+        train_folder = datasets.ImageFolder(os.path.join(data_dir, "Training"), plain["Training"])
+        train_cache = CachedImageFolder(os.path.join(cache_dir, "Training"), cached["Training"])
+        results["images"] = len(train_folder)
+
+        # Class weights: decode + augment everything vs. labels only
+        start = time.perf_counter()
+        Counter(label for _, label in train_folder)
+        iterate_s = time.perf_counter() - start
+        start = time.perf_counter()
+        weights = class_weights_from_targets(train_folder.targets, len(train_folder.classes))
+        targets_s = time.perf_counter() - start
+        results["class_weights"] = {"iterate_dataset_s": round(iterate_s, 3), "targets_s": round(targets_s, 6),
+                                    "weights": [round(w, 4) for w in weights.tolist()]}
+        print(f"Class weights: iterating the dataset {iterate_s:.2f}s, from targets {targets_s * 1000:.2f}ms")
+
+        # Cached validation tensors (no augmentation) must equal the decode + Resize path
+        val_folder = datasets.ImageFolder(os.path.join(data_dir, "Validation"), plain["Validation"])
+        val_cache = CachedImageFolder(os.path.join(cache_dir, "Validation"), cached["Validation"])
+        parity = max(float((val_folder[i][0] - val_cache[i][0]).abs().max()) for i in range(len(val_folder)))
+        results["validation_max_abs_diff"] = parity
+        print(f"Cached vs decoded validation tensors: max |diff| {parity:.2e} -> {'PASS' if parity < 1e-6 else 'FAIL'}")
+
+        pipelines = {
+            "imagefolder": (train_folder, 0),
+            "imagefolder+workers": (train_folder, args.workers),
+            "cache": (train_cache, 0),
+            "cache+workers": (train_cache, args.workers),
+        }
+        print(f"{'pipeline':<20} {'epoch times (s)':<24} {'steady img/s':>12}")
+        for name, (dataset, workers) in pipelines.items():
+            loader = DataLoader(dataset, batch_size=BATCH_SIZE, shuffle=True, num_workers=workers,
+                                persistent_workers=workers > 0)
+            times = _epochs(loader, args.epochs, _train_step() if args.train_step else None)
+            steady = min(times[1:] or times)
+            results["epochs"][name] = {"epoch_s": times, "steady_images_per_s": round(len(dataset) / steady, 1)}
+            print(f"{name:<20} {str(times):<24} {len(dataset) / steady:>12.1f}")
+            del loader
+
+    if args.output:
+        write_json(args.output, results)
+    return 0 if parity < 1e-6 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
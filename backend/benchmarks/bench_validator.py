@@ -0,0 +1,141 @@
+"""
+Validator modes: time and peak memory per validation, plus decision agreement.
+
+    python -m backend.benchmarks.bench_validator --output validator.json
+    python -m backend.benchmarks.bench_validator --corpus path/to/labeled
+
+"full" decodes the whole upload and runs the checks on it; "fast" reads the
+dimensions from the header and runs the checks on a reduced-resolution
+preview (see MRIValidator._validate_fast). Peak memory is measured with
+tracemalloc, which sees numpy/OpenCV output arrays but not decoder-internal
+scratch buffers.
+
+The labeled corpus is synthetic (brain-like scans plus the rejection cases
+the validator exists for) unless --corpus points at a directory with
+valid/ and invalid/ subfolders of real files. Both modes must return the
+same decision (and the same error message) for every file.
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+import cv2
+import numpy as np
+from backend.benchmarks.common import synthetic_mri, write_json
+from backend.services.context import AnalysisContext
+from backend.services.validator import MRIValidator
+
+MODES = ("full", "fast")
+
+
+def _encode(image: np.ndarray, ext: str) -> bytes:
+    ok, buffer = cv2.imencode(ext, image)
+    if not ok:
+        raise RuntimeError(f"Could not encode image as {ext}")
+    return buffer.tobytes()
+
+
+def _synthetic_corpus(sizes: list) -> list:
+    """[(name, bytes, expected_valid)]"""
+    rng = np.random.default_rng(0)
+    corpus = []
+    for size in sizes:
+        for seed in range(3):
+            scan = synthetic_mri(size, seed)
+            gray = scan[:, :, 0]
+            invalid = {
+                # Color photo: independent channels
+                "color": cv2.resize(rng.integers(0, 255, (32, 32, 3), dtype=np.uint8), (size, size)),
+                "bright_background": cv2.cvtColor(255 - gray, cv2.COLOR_GRAY2BGR),
+                "too_dark": (scan * 0.1).astype(np.uint8),
+                "blank": np.full((size, size, 3), 90, dtype=np.uint8),
+                "no_detail": cv2.GaussianBlur(scan, (0, 0), size / 20),
+            }
+            for ext in (".png", ".jpg"):
+                corpus.append((f"mri_{size}_{seed}{ext}", _encode(scan, ext), True))
+                for kind, image in invalid.items():
+                    corpus.append((f"{kind}_{size}_{seed}{ext}", _encode(image, ext), False))
+    corpus.append(("tiny.png", _encode(synthetic_mri(64), ".png"), False))
+    corpus.append(("oversized.jpg", _encode(synthetic_mri(4200), ".jpg"), False))
+    corpus.append(("not_an_image.png", b"\x89PNG\r\n\x1a\n" + b"\x00" * 64, False))
+    return corpus
+
+
+def _directory_corpus(root: str) -> list:
+    corpus = []
+    for label in ("valid", "invalid"):
+        folder = os.path.join(root, label)
+        for name in sorted(os.listdir(folder)):
+            with open(os.path.join(folder, name), "rb") as f:
+                corpus.append((f"{label}/{name}", f.read(), label == "valid"))
+    return corpus
+
+
+def _measure(validator: MRIValidator, contents: bytes, repeat: int) -> dict:
+    validator.validate(contents)  # Warm-up
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        validator.validate(contents)
+        durations.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    validator.validate(contents)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"median_ms": round(float(np.median(durations)) * 1000, 2), "peak_mb": round(peak / 1e6, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[512, 2048, 4000])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--corpus", help="Directory with valid/ and invalid/ subfolders (default: synthetic)")
+    parser.add_argument("--output", help="Optional JSON output path")
+    args = parser.parse_args()
+
+    validators = {mode: MRIValidator(mode=mode) for mode in MODES}
+    results = {"timing": {}, "agreement": {}}
+
+    print(f"{'image':<12} {'mode':<5} {'median ms':>10} {'peak MB':>8}")
+    for size in args.sizes:
+        for ext in (".png", ".jpg"):
+            contents = _encode(synthetic_mri(size), ext)
+            name = f"{size}px{ext}"
+            results["timing"][name] = {}
+            for mode, validator in validators.items():
+                stats = _measure(validator, contents, args.repeat)
+                results["timing"][name][mode] = stats
+                print(f"{name:<12} {mode:<5} {stats['median_ms']:>10.2f} {stats['peak_mb']:>8.2f}")
+
+    corpus = _directory_corpus(args.corpus) if args.corpus else _synthetic_corpus(args.sizes)
+    correct = {mode: 0 for mode in MODES}
+    disagreements = []
+    for name, contents, expected in corpus:
+        decisions = {mode: validator.validate_context(AnalysisContext.from_bytes(contents))
+                     for mode, validator in validators.items()}
+        for mode, decision in decisions.items():
+            correct[mode] += decision["valid"] == expected
+        full, fast = decisions["full"], decisions["fast"]
+        if full["valid"] != fast["valid"] or full.get("error") != fast.get("error"):
+            disagreements.append({"file": name, "full": full.get("error", "valid"), "fast": fast.get("error", "valid")})
+
+    results["agreement"] = {
+        "files": len(corpus),
+        "accuracy": {mode: round(correct[mode] / len(corpus), 4) for mode in MODES},
+        "disagreements": disagreements,
+    }
+    print(f"\nCorpus: {len(corpus)} files  accuracy full={correct['full']}/{len(corpus)} "
+          f"fast={correct['fast']}/{len(corpus)}  disagreements={len(disagreements)}")
+    for item in disagreements:
+        print(f"  {item['file']}: full={item['full']!r} fast={item['fast']!r}")
+
+    if args.output:
+        write_json(args.output, results)
+    return 1 if disagreements else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+Parity + cost check for the fused classification/GradCAM pass.
+
+    python -m backend.benchmarks.check_fused_gradcam --images 8
+
+For every synthetic image it compares InferenceService.predict_with_cam
+against the two-pass path (no-grad classify, then pytorch_grad_cam.GradCAM
+on the same input tensor): predicted class, softmax and CAM must match.
+Exits non-zero on any mismatch so it can gate CI.
+"""
+
+import argparse
+import sys
+import time
+import numpy as np
+import torch
+from backend.benchmarks.common import ensure_model, synthetic_mri
+from backend.services.inference import inference_service
+from backend.services import gradcam_service
+
+
+def _two_pass(service, tensor: torch.Tensor):
+    probabilities = service.predict_batch([tensor])[0]
+    class_idx = int(probabilities.argmax())
+    targets = [gradcam_service.ClassifierOutputTarget(class_idx)]
+    with gradcam_service.GradCAM(model=service.model, target_layers=[service.model.features[-1]]) as cam:
+        grayscale_cam = cam(input_tensor=tensor.unsqueeze(0).to(service.device), targets=targets)[0]
+    return probabilities, grayscale_cam
+
+
+def compare(service, images: int, prob_atol: float = 1e-5, cam_atol: float = 1e-3) -> dict:
+    """
+    Fused vs. two-pass results on `images` synthetic slices:
+    {"images": [per-image errors, match flags and timings], "passed"}.
+    """
+    rows = []
+    for seed in range(images):
+        tensor = service.prepare_tensor(synthetic_mri(512, seed))
+
+        start = time.perf_counter()
+        ref_probs, ref_cam = _two_pass(service, tensor)
+        two_pass_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        probs, cam, _ = service.predict_with_cam([tensor])[0]
+        fused_s = time.perf_counter() - start
+
+        same_class = int(ref_probs.argmax()) == int(probs.argmax())
+        prob_err = float((ref_probs - probs).abs().max())
+        cam_err = float(np.abs(ref_cam - cam).max())
+        rows.append({"same_class": same_class, "prob_err": prob_err, "cam_err": cam_err,
+                     "ok": same_class and prob_err <= prob_atol and cam_err <= cam_atol,
+                     "two_pass_s": two_pass_s, "fused_s": fused_s})
+    return {"images": rows, "passed": all(row["ok"] for row in rows)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=8)
+    parser.add_argument("--prob-atol", type=float, default=1e-5)
+    parser.add_argument("--cam-atol", type=float, default=1e-3)
+    args = parser.parse_args()
+
+    service = ensure_model(inference_service)
+    gradcam_service._try_import_gradcam()
+    if not gradcam_service.GRADCAM_AVAILABLE:
+        print("pytorch-grad-cam is not installed; nothing to compare against.")
+        return 1
+
+    results = compare(service, args.images, args.prob_atol, args.cam_atol)
+    for seed, row in enumerate(results["images"]):
+        print(f"image {seed}: class_match={row['same_class']} max|dp|={row['prob_err']:.2e} "
+              f"max|dcam|={row['cam_err']:.2e} {'OK' if row['ok'] else 'MISMATCH'}")
+
+    two_pass_ms = np.median([row["two_pass_s"] for row in results["images"]]) * 1000
+    fused_ms = np.median([row["fused_s"] for row in results["images"]]) * 1000
+    failures = sum(not row["ok"] for row in results["images"])
+    print(f"\nmedian two-pass: {two_pass_ms:.1f} ms | fused: {fused_ms:.1f} ms "
+          f"| speedup x{two_pass_ms / fused_ms:.2f}")
+    print("PASS" if failures == 0 else f"FAIL ({failures} mismatches)")
+    return 0 if failures == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
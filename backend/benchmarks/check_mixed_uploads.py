@@ -0,0 +1,72 @@
+"""
+Gate: one bad file must not fail a multi-image request.
+
+    python -m backend.benchmarks.check_mixed_uploads --good 4
+
+Posts --good valid synthetic PNGs plus unsupported files (garbage bytes, a
+text file) to /api/v1/analyze/batch and /api/v1/analyze/study in-process.
+Both must answer 200 and stream a result for every good image, with the
+bad files reported as their own "invalid" lines (batch) / slices (study).
+Exits non-zero otherwise.
+"""
+
+import argparse
+import json
+import sys
+from fastapi.testclient import TestClient
+from backend.benchmarks.common import synthetic_mri_bytes
+from backend.main import app
+from backend.services.lifecycle import model_lifecycle
+
+BAD_FILES = [("garbage.png", b"xx", "image/png"), ("notes.txt", b"not an image at all", "text/plain")]
+
+
+def _stream(client, path: str, files: list) -> tuple:
+    with client.stream("POST", path, files=files) as response:
+        if response.status_code != 200:
+            response.read()
+            return response.status_code, [response.text]
+        return 200, [json.loads(line) for line in response.iter_lines() if line]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--good", type=int, default=4)
+    args = parser.parse_args()
+
+    good = [(f"scan_{i}.png", synthetic_mri_bytes(256, i), "image/png") for i in range(args.good)]
+    files = [("files", item) for item in good + BAD_FILES]
+    bad_names = {name for name, _, _ in BAD_FILES}
+    failures = 0
+
+    with TestClient(app) as client:
+        model_lifecycle.wait_ready()
+
+        status, lines = _stream(client, "/api/v1/analyze/batch", files)
+        items = [line for line in lines if isinstance(line, dict) and "index" in line]
+        succeeded = sum(line["status"] == "success" for line in items)
+        invalid = {line["filename"] for line in items if line["status"] == "invalid"}
+        ok = status == 200 and succeeded == args.good and invalid == bad_names
+        failures += not ok
+        print(f"batch: HTTP {status}, {succeeded}/{args.good} good images analyzed, "
+              f"invalid lines {sorted(invalid)} -> {'PASS' if ok else 'FAIL'}")
+
+        # Read every slice (no early stop) so all good ones must show up
+        status, lines = _stream(client, "/api/v1/analyze/study?early_stop=false", files)
+        slices = [entry for line in lines if isinstance(line, dict) and line.get("event") == "slices"
+                  for entry in line.get("results", [])]
+        succeeded = sum(entry["status"] == "success" for entry in slices)
+        invalid = {entry["filename"] for entry in slices if entry["status"] == "invalid"}
+        verdict = any(isinstance(line, dict) and line.get("event") == "verdict" for line in lines)
+        ok = status == 200 and verdict and succeeded == args.good and invalid == bad_names
+        failures += not ok
+        print(f"study: HTTP {status}, {succeeded}/{args.good} good slices classified, "
+              f"invalid slices {sorted(invalid)}, verdict {'streamed' if verdict else 'missing'} "
+              f"-> {'PASS' if ok else 'FAIL'}")
+
+    print("PASS" if failures == 0 else "FAIL")
+    return 0 if failures == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
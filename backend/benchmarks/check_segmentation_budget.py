@@ -0,0 +1,107 @@
+"""
+CPU latency budget for the segmentation head.
+
+    python -m backend.benchmarks.check_segmentation_budget --budget-ms 15 --budget-fraction 0.25
+
+Times, per batch size, on the eager model:
+
+  classify  features -> classifier (what classification alone costs)
+  shared    one backbone pass -> classifier + segmentation head (served path)
+  separate  classify, then a second backbone pass for the head (what a
+            standalone segmentation network would add at minimum)
+
+The head's cost is shared - classify. Fails (exit 1) when that exceeds
+--budget-ms per image or --budget-fraction of the classification pass, or
+when the stage-by-stage encoder doesn't reproduce features(). Uses the
+trained head when present, otherwise a randomly initialized one (same cost).
+"""
+
+import argparse
+import sys
+import torch
+from backend.benchmarks.common import ensure_model, synthetic_mri, summarize_latencies, time_call, write_json
+from backend.services.context import AnalysisContext
+from backend.services.inference import inference_service
+from backend.services.segmentation import SegmentationHead, encode
+
+
+def encoder_error(service, inputs: list) -> float:
+    """Max |stage-by-stage encode() - features()| over a batch of model inputs (must be 0)."""
+    model = service.model
+    with torch.no_grad():
+        batch = service.preprocessor.batch(inputs).clone().contiguous()
+        return float((encode(model.features, batch)[0] - model.features(batch)).abs().max())
+
+
+def measure(service, head, inputs: list, batch_sizes: list, budget_ms: float = 15.0, budget_fraction: float = 0.25,
+            repeat: int = 10) -> dict:
+    """classify / shared / separate latencies per batch size, head cost and "within_budget" flags."""
+    model = service.model
+
+    def classify(batch):
+        with torch.no_grad():
+            return model.classifier(torch.flatten(model.avgpool(model.features(batch)), 1))
+
+    def shared(batch):
+        with torch.no_grad():
+            features, taps = encode(model.features, batch)
+            logits = model.classifier(torch.flatten(model.avgpool(features), 1))
+        return logits, head.masks(taps, (batch.shape[-1], batch.shape[-2]))
+
+    def separate(batch):
+        logits = classify(batch)
+        with torch.no_grad():
+            _, taps = encode(model.features, batch)
+        return logits, head.masks(taps, (batch.shape[-1], batch.shape[-2]))
+
+    results = {}
+    for batch_size in batch_sizes:
+        batch = service.preprocessor.batch(inputs[:batch_size]).clone().contiguous()
+        stats = {name: summarize_latencies(time_call(lambda: fn(batch), repeat=repeat))
+                 for name, fn in (("classify", classify), ("shared", shared), ("separate", separate))}
+        head_ms = max(0.0, stats["shared"]["p50_ms"] - stats["classify"]["p50_ms"]) / batch_size
+        fraction = head_ms * batch_size / stats["classify"]["p50_ms"]
+        results[batch_size] = {**stats, "head_ms_per_image": round(head_ms, 2), "head_fraction": round(fraction, 4),
+                               "within_budget": head_ms <= budget_ms and fraction <= budget_fraction}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--budget-ms", type=float, default=15.0, help="Max head cost per image")
+    parser.add_argument("--budget-fraction", type=float, default=0.25, help="Max head cost relative to classification")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--output", help="Optional JSON output path")
+    args = parser.parse_args()
+
+    service = ensure_model(inference_service)
+    head = service.seg_head or SegmentationHead().to(service.device).eval()
+    print(f"Head: {'trained' if service.seg_head is not None else 'random init'}, "
+          f"{sum(p.numel() for p in head.parameters()) / 1e3:.0f}K parameters, torch threads {torch.get_num_threads()}")
+
+    inputs = [service.model_input(AnalysisContext.from_image(synthetic_mri(512, seed))) for seed in range(max(args.batch_sizes))]
+    failures = 0
+    results = {"torch_threads": torch.get_num_threads()}
+
+    encoder_err = encoder_error(service, inputs[:2])
+    if encoder_err > 0:
+        print(f"FAIL: stage-by-stage encoder differs from features() by {encoder_err:.2e}")
+        failures += 1
+
+    results["batches"] = measure(service, head, inputs, args.batch_sizes, args.budget_ms, args.budget_fraction, args.repeat)
+    print(f"{'batch':>5} {'classify ms':>11} {'shared ms':>10} {'separate ms':>11} {'head ms/img':>11} {'head %':>7}")
+    for batch_size, stats in results["batches"].items():
+        failures += not stats["within_budget"]
+        print(f"{batch_size:>5} {stats['classify']['p50_ms']:>11.1f} {stats['shared']['p50_ms']:>10.1f} "
+              f"{stats['separate']['p50_ms']:>11.1f} {stats['head_ms_per_image']:>11.2f} "
+              f"{stats['head_fraction'] * 100:>6.1f}%{'' if stats['within_budget'] else '  over budget'}")
+
+    print("PASS" if failures == 0 else "FAIL")
+    if args.output:
+        write_json(args.output, results)
+    return 0 if failures == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
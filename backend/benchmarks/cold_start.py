@@ -0,0 +1,119 @@
+"""
+Cold-start report: app import time, time-to-ready and first-request latency.
+
+    python -m backend.benchmarks.cold_start --output cold_start.json --max-import-ms 500
+
+Each measurement runs in a fresh interpreter (like a scale-from-zero host).
+The import of backend.main is profiled with -X importtime, so the report
+also lists the slowest imports and flags heavy modules (torch, cv2, ...)
+that leak back onto the bind path. Exits non-zero when --max-import-ms is
+exceeded or a heavy module is imported by the app itself.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ("torch", "torchvision", "cv2", "pytorch_grad_cam", "onnxruntime", "PIL")
+
+
+def _child(skip_requests: bool):
+    start = time.perf_counter()
+    import backend.main  # noqa: F401
+    report = {"app_import_ms": round((time.perf_counter() - start) * 1000, 2)}
+    report["heavy_modules_at_import"] = [name for name in HEAVY_MODULES if name in sys.modules]
+
+    from backend.services.lifecycle import model_lifecycle
+    start = time.perf_counter()
+    model_lifecycle.wait_ready()
+    report["wait_ready_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    report["lifecycle"] = model_lifecycle.status()
+
+    if not skip_requests and model_lifecycle.ready:
+        from backend.benchmarks.common import synthetic_mri_bytes
+        from backend.services.pipeline import run_analysis
+        for label, seed in (("first_request_ms", 1), ("second_request_ms", 2)):
+            contents = synthetic_mri_bytes(512, seed)
+            start = time.perf_counter()
+            run_analysis(contents)
+            report[label] = round((time.perf_counter() - start) * 1000, 2)
+
+    print("COLD_START_REPORT " + json.dumps(report))
+
+
+def _parse_importtime(stderr: str, top: int) -> list:
+    """`import time: self [us] | cumulative | imported package` -> slowest imports."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = [part.strip() for part in line.split(":", 1)[1].split("|")]
+        rows.append({"module": name, "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000})
+    rows.sort(key=lambda row: row["cumulative_ms"], reverse=True)
+    return rows[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--skip-requests", action="store_true")
+    parser.add_argument("--warmup-passes", type=int, help="Override WARMUP_PASSES (0 = no warm-up)")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to list")
+    parser.add_argument("--max-import-ms", type=float, help="Fail when the app import is slower")
+    parser.add_argument("--output", help="Optional JSON output path")
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.skip_requests)
+        return 0
+
+    env = dict(os.environ)
+    if args.warmup_passes is not None:
+        env["WARMUP_PASSES"] = str(args.warmup_passes)
+    command = [sys.executable, "-X", "importtime", "-m", "backend.benchmarks.cold_start", "--child"]
+    if args.skip_requests:
+        command.append("--skip-requests")
+
+    start = time.perf_counter()
+    proc = subprocess.run(command, capture_output=True, text=True, env=env)
+    total_ms = round((time.perf_counter() - start) * 1000, 2)
+    lines = [line for line in proc.stdout.splitlines() if line.startswith("COLD_START_REPORT ")]
+    if proc.returncode != 0 or not lines:
+        print(proc.stdout + proc.stderr)
+        print("✗ Cold-start child failed")
+        return 1
+
+    report = json.loads(lines[-1].split(" ", 1)[1])
+    report["process_total_ms"] = total_ms
+    report["slowest_imports"] = _parse_importtime(proc.stderr, args.top)
+
+    print(f"App import:        {report['app_import_ms']:.0f} ms")
+    print(f"Heavy at import:   {', '.join(report['heavy_modules_at_import']) or 'none'}")
+    print(f"Time to ready:     {report['lifecycle']['timings'].get('time_to_ready_ms', 'n/a')} ms "
+          f"({report['lifecycle']['status']}, {report['lifecycle']['timings']})")
+    for label in ("first_request_ms", "second_request_ms"):
+        if label in report:
+            print(f"{label.replace('_ms', '').replace('_', ' ').capitalize() + ':':<19}{report[label]:.0f} ms")
+    print("Slowest imports (cumulative):")
+    for row in report["slowest_imports"]:
+        print(f"  {row['cumulative_ms']:>9.1f} ms  {row['module']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    failures = []
+    if report["heavy_modules_at_import"]:
+        failures.append(f"heavy modules imported by backend.main: {report['heavy_modules_at_import']}")
+    if args.max_import_ms is not None and report["app_import_ms"] > args.max_import_ms:
+        failures.append(f"app import {report['app_import_ms']:.0f} ms > {args.max_import_ms:.0f} ms")
+    for failure in failures:
+        print(f"✗ {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
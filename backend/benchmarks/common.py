@@ -0,0 +1,145 @@
+"""
+Shared helpers for the backend benchmarks.
+Run any benchmark from the repository root, e.g.:
+    python -m backend.benchmarks.bench_batching
+"""
+
+import json
+import os
+import signal
+import socket
+import subprocess
+import time
+import cv2
+import numpy as np
+
+
+def ensure_model(service):
+    """
+    Gives a demo-mode InferenceService randomly initialized weights (same
+    architecture, same compute) so benchmarks run without a checkpoint.
+    """
+    if service.model is None:
+        from backend.services.backends import TorchBackend
+        print("No trained weights found - using a randomly initialized model.")
+        service.model = service._build_architecture().to(service.device).eval()
+        if service.backend is None:
+            service.backend = TorchBackend(service.model, service.device)
+    return service
+
+
+def synthetic_mri(size: int = 512, seed: int = 0) -> np.ndarray:
+    """
+    Builds a grayscale, brain-like BGR image that passes MRIValidator:
+    dark background, elliptical textured "brain" and one bright lesion.
+    """
+    rng = np.random.default_rng(seed)
+    mask = np.zeros((size, size), dtype=np.uint8)
+    center = size // 2
+    cv2.ellipse(mask, (center, center), (int(size * 0.36), int(size * 0.42)), 0, 0, 360, 255, -1)
+
+    coarse = rng.uniform(40, 200, (50, 50)).astype(np.float32)
+    texture = cv2.resize(coarse, (size, size), interpolation=cv2.INTER_CUBIC)
+    gray = np.where(mask > 0, np.clip(texture, 35, 230), 0).astype(np.uint8)
+
+    lesion_x = int(center + size * rng.uniform(-0.15, 0.15))
+    lesion_y = int(center + size * rng.uniform(-0.15, 0.15))
+    cv2.circle(gray, (lesion_x, lesion_y), size // 12, 220, -1)
+
+    return cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+
+
+def synthetic_mri_bytes(size: int = 512, seed: int = 0, ext: str = ".png") -> bytes:
+    """Encoded upload bytes for synthetic_mri()."""
+    ok, buffer = cv2.imencode(ext, synthetic_mri(size, seed))
+    if not ok:
+        raise RuntimeError(f"Could not encode synthetic image as {ext}")
+    return buffer.tobytes()
+
+
+def synthetic_dicom(frames: int = 1, size: int = 512, seed: int = 0, path: str = None) -> bytes:
+    """
+    Uncompressed 16-bit MR DICOM (explicit VR little endian) whose frames are
+    synthetic_mri() slices stored as raw values with a rescale and a window
+    that map back to the 8-bit image. Written to `path` too when given.
+    """
+    import io
+    import pydicom
+    from pydicom.dataset import Dataset, FileMetaDataset
+    from pydicom.uid import ExplicitVRLittleEndian, MRImageStorage, generate_uid
+
+    meta = FileMetaDataset()
+    meta.MediaStorageSOPClassUID = MRImageStorage
+    meta.MediaStorageSOPInstanceUID = generate_uid()
+    meta.TransferSyntaxUID = ExplicitVRLittleEndian
+    ds = Dataset()
+    ds.file_meta = meta
+    ds.SOPClassUID = MRImageStorage
+    ds.SOPInstanceUID = meta.MediaStorageSOPInstanceUID
+    ds.Modality = "MR"
+    ds.Rows = ds.Columns = size
+    ds.NumberOfFrames = frames
+    ds.SamplesPerPixel = 1
+    ds.PhotometricInterpretation = "MONOCHROME2"
+    ds.BitsAllocated, ds.BitsStored, ds.HighBit, ds.PixelRepresentation = 16, 12, 11, 0
+    # Stored = 8-bit * 16, rescaled = stored / 2 - 100 (-100..1940); the window maps that back onto 0..255
+    ds.RescaleSlope, ds.RescaleIntercept = 0.5, -100
+    ds.WindowCenter, ds.WindowWidth = 920.5, 2041
+    pixels = np.stack([synthetic_mri(size, seed + i)[:, :, 0] for i in range(frames)]).astype(np.uint16) * 16
+    ds.PixelData = pixels.tobytes()
+
+    buffer = io.BytesIO()
+    pydicom.dcmwrite(buffer, ds, enforce_file_format=True)
+    data = buffer.getvalue()
+    if path:
+        with open(path, "wb") as f:
+            f.write(data)
+    return data
+
+
+def summarize_latencies(latencies_s: list) -> dict:
+    """p50/p95/p99/mean in milliseconds."""
+    values = np.asarray(latencies_s, dtype=np.float64) * 1000
+    if values.size == 0:
+        return {"count": 0}
+    return {
+        "count": int(values.size),
+        "mean_ms": round(float(values.mean()), 2),
+        "p50_ms": round(float(np.percentile(values, 50)), 2),
+        "p95_ms": round(float(np.percentile(values, 95)), 2),
+        "p99_ms": round(float(np.percentile(values, 99)), 2),
+    }
+
+
+def time_call(fn, repeat: int = 20, warmup: int = 2) -> list:
+    """Returns `repeat` wall-clock durations (seconds) of fn()."""
+    for _ in range(warmup):
+        fn()
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def stop_server(server: subprocess.Popen):
+    """Stops a server started with start_new_session=True (its whole process group)."""
+    try:
+        os.killpg(server.pid, signal.SIGTERM)
+        server.wait(timeout=30)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        os.killpg(server.pid, signal.SIGKILL)
+        server.wait()
+
+
+def write_json(path: str, payload: dict):
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2)
+    print(f"Results written to {path}")
@@ -0,0 +1,334 @@
+"""
+End-to-end load test + per-function microbenchmarks, with regression checks.
+
+    python -m backend.benchmarks.suite run --output baseline.json
+    python -m backend.benchmarks.suite run --output current.json --compare baseline.json
+    python -m backend.benchmarks.suite compare baseline.json current.json --tolerance 0.15
+
+run:
+  micro      validator.validate, classify_tumor, locate_tumor, xai
+             generate_heatmap and the GradCAM overlay (inference_service.explain)
+             on synthetic MRI slices
+  inprocess  POST /api/v1/analyze through the ASGI app in this process
+  localhost  the same against `python -m backend.serve` on a free port
+
+Each load target is driven at every --concurrency level with distinct
+synthetic scans (all of which must pass MRIValidator) and the result cache
+off. Reported per level: throughput, p50/p95/p99 of successful requests,
+status counts (503s once the executor queue is full) and the peak RSS of
+the serving process tree, sampled every 20 ms.
+
+compare: flattens both result files into metrics and flags every metric
+that got worse by more than --tolerance (relative) and by more than its
+noise floor (--min-delta-ms, --min-delta-micro-ms, --min-delta-mb). Exits 1
+when anything regressed. Baselines are host-specific: compare runs from the
+same machine.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+import httpx
+import torch
+from backend.benchmarks.common import (ensure_model, free_port, stop_server, summarize_latencies, synthetic_mri,
+                                       synthetic_mri_bytes, time_call, write_json)
+from backend.core.config import settings
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+LOAD_TARGETS = ("inprocess", "localhost")
+
+
+def _process_tree(pid: int) -> list:
+    pids, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        pids.append(current)
+        try:
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except OSError:
+            continue
+    return pids
+
+
+def _rss_bytes(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        return 0
+
+
+class PeakRss:
+    """Peak summed RSS of a process tree, sampled in a background thread while active."""
+
+    def __init__(self, pid: int, interval: float = 0.02):
+        self.pid = pid
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name="rss-sampler", daemon=True)
+
+    def _sample(self):
+        while True:
+            self.peak = max(self.peak, sum(_rss_bytes(pid) for pid in _process_tree(self.pid)))
+            if self._stop.wait(self.interval):
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    @property
+    def peak_mb(self) -> float:
+        return round(self.peak / 1024 / 1024, 1)
+
+
+def _payloads(count: int) -> list:
+    from backend.services.validator import validator
+    payloads = [synthetic_mri_bytes(512, seed) for seed in range(count)]
+    rejected = [i for i, contents in enumerate(payloads) if not validator.validate(contents)["valid"]]
+    if rejected:
+        raise SystemExit(f"✗ Synthetic scans {rejected} do not pass MRIValidator")
+    return payloads
+
+
+async def _drive(client: httpx.AsyncClient, payloads: list, concurrency: int, total: int, explain: bool) -> dict:
+    latencies, statuses = [], Counter()
+    indices = iter(range(total))  # Shared by the clients (one event loop, no lock needed)
+
+    async def client_loop():
+        for index in indices:
+            files = {"file": (f"scan_{index}.png", payloads[index % len(payloads)], "image/png")}
+            start = time.perf_counter()
+            try:
+                response = await client.post("/api/v1/analyze", params={"explain": str(explain).lower()}, files=files)
+                status = response.status_code
+            except httpx.HTTPError:
+                status = "error"
+            if status == 200:
+                latencies.append(time.perf_counter() - start)
+            statuses[str(status)] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "throughput_rps": round(len(latencies) / wall, 2),
+        "error_rate": round(1 - len(latencies) / total, 4),
+        "status_counts": dict(statuses),
+        **summarize_latencies(latencies),
+    }
+
+
+async def _load_levels(client_factory, pid: int, payloads: list, args) -> list:
+    runs = []
+    for concurrency in args.concurrency:
+        total = max(args.min_requests, concurrency * args.requests_per_client)
+        async with client_factory() as client:
+            with PeakRss(pid) as rss:
+                run = await _drive(client, payloads, concurrency, total, args.explain)
+        run["peak_rss_mb"] = rss.peak_mb
+        runs.append(run)
+        print(f"  c={concurrency:<3} {run['throughput_rps']:>7.2f} req/s  p50 {run.get('p50_ms', '-'):>8} "
+              f"p95 {run.get('p95_ms', '-'):>8} p99 {run.get('p99_ms', '-'):>8} ms  "
+              f"errors {run['error_rate'] * 100:.1f}%  peak RSS {rss.peak_mb:.0f} MB")
+    return runs
+
+
+def run_inprocess(payloads: list, args) -> list:
+    from backend.main import app
+    from backend.services.lifecycle import model_lifecycle
+    model_lifecycle.wait_ready()
+    settings.CACHE_ENABLED = False
+    transport = httpx.ASGITransport(app=app)
+    return asyncio.run(_load_levels(lambda: httpx.AsyncClient(transport=transport, base_url="http://inprocess",
+                                                              timeout=600), os.getpid(), payloads, args))
+
+
+def run_localhost(payloads: list, args) -> list:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, CACHE_ENABLED="false")
+    server = subprocess.Popen([sys.executable, "-m", "backend.serve", "--workers", str(args.server_workers),
+                               "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+                              env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+    try:
+        deadline = time.monotonic() + args.startup_timeout
+        while True:
+            try:
+                if httpx.get(f"{url}/api/v1/ready", timeout=5).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if server.poll() is not None or time.monotonic() > deadline:
+                raise SystemExit("✗ Server did not become ready")
+            time.sleep(0.25)
+        limits = httpx.Limits(max_connections=max(args.concurrency))
+        return asyncio.run(_load_levels(lambda: httpx.AsyncClient(base_url=url, timeout=600, limits=limits),
+                                        server.pid, payloads, args))
+    finally:
+        stop_server(server)
+
+
+def run_micro(args) -> dict:
+    from backend.services.anatomy import locate_tumor
+    from backend.services.context import AnalysisContext
+    from backend.services.lifecycle import model_lifecycle
+    from backend.services.validator import validator
+    from backend.services.xai import xai_service
+
+    model_lifecycle.wait_ready()
+    service = ensure_model(model_lifecycle.service)
+    image = synthetic_mri(512, 0)
+    contents = synthetic_mri_bytes(512, 0)
+    ctx = AnalysisContext.from_image(image)
+    classification = service.classify_context(ctx)
+    mask = service.segment_context(ctx)
+
+    functions = {
+        "validate": lambda: validator.validate(contents),
+        "classify_tumor": lambda: service.classify_tumor(image),
+        "locate_tumor": lambda: locate_tumor(mask),
+        "generate_heatmap": lambda: xai_service.generate_heatmap(image, mask),
+        # A fresh context each call so the CAM is not served from the request views
+        "explain": lambda: service.explain(AnalysisContext.from_image(image), classification),
+    }
+    results = {}
+    for name, fn in functions.items():
+        results[name] = summarize_latencies(time_call(fn, repeat=args.micro_repeat))
+        print(f"  {name:<17} p50 {results[name]['p50_ms']:>8.2f} ms  p95 {results[name]['p95_ms']:>8.2f} ms")
+    return results
+
+
+def run_suite(args) -> dict:
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": {"cpu_count": os.cpu_count(), "machine": platform.machine(), "python": platform.python_version(),
+                 "torch": torch.__version__, "torch_threads": torch.get_num_threads()},
+        "config": {"explain": args.explain, "concurrency": args.concurrency, "server_workers": args.server_workers},
+        "micro": {},
+        "load": {},
+    }
+    payloads = _payloads(args.payloads)
+    if "micro" in args.parts:
+        print("Microbenchmarks")
+        results["micro"] = run_micro(args)
+    for target in LOAD_TARGETS:
+        if target in args.parts:
+            print(f"Load: {target} (explain={str(args.explain).lower()})")
+            results["load"][target] = (run_inprocess if target == "inprocess" else run_localhost)(payloads, args)
+    return results
+
+
+def flatten(results: dict) -> dict:
+    """{metric name: value} for compare, e.g. load.localhost.c4.p99_ms."""
+    metrics = {}
+    for name, stats in results.get("micro", {}).items():
+        for key in ("p50_ms", "p95_ms"):
+            metrics[f"micro.{name}.{key}"] = stats.get(key)
+    for target, runs in results.get("load", {}).items():
+        for run in runs:
+            for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms", "error_rate", "peak_rss_mb"):
+                metrics[f"load.{target}.c{run['concurrency']}.{key}"] = run.get(key)
+    return {name: value for name, value in metrics.items() if value is not None}
+
+
+def compare(baseline: dict, current: dict, tolerance: float, min_delta_ms: float, min_delta_mb: float,
+            min_delta_micro_ms: float = 0.05) -> list:
+    """One row per metric present in both: (name, baseline, current, relative change, regressed)."""
+    rows = []
+    base, cur = flatten(baseline), flatten(current)
+    for name in sorted(base.keys() & cur.keys()):
+        before, after = base[name], cur[name]
+        higher_is_better = name.endswith("throughput_rps")
+        worse_by = (before - after) if higher_is_better else (after - before)
+        change = (after - before) / before if before else 0.0
+        if name.endswith("error_rate"):
+            regressed = worse_by > 0.01
+        else:
+            if name.endswith("_mb"):
+                floor = min_delta_mb
+            elif name.endswith("_ms"):
+                floor = min_delta_micro_ms if name.startswith("micro.") else min_delta_ms
+            else:
+                floor = 0.0
+            regressed = worse_by > floor and worse_by > tolerance * abs(before)
+        rows.append((name, before, after, change, regressed))
+    return rows
+
+
+def report(baseline: dict, current: dict, args) -> int:
+    if baseline.get("host", {}).get("cpu_count") != current.get("host", {}).get("cpu_count"):
+        print("⚠️ Baseline was recorded on a host with a different CPU count; differences are not comparable.")
+    rows = compare(baseline, current, args.tolerance, args.min_delta_ms, args.min_delta_mb, args.min_delta_micro_ms)
+    regressions = [row for row in rows if row[4]]
+    print(f"{'metric':<40} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, before, after, change, regressed in rows:
+        print(f"{name:<40} {before:>10.2f} {after:>10.2f} {change * 100:>+7.1f}%{'  REGRESSION' if regressed else ''}")
+    print(f"\n{len(regressions)} regression(s) in {len(rows)} metrics (tolerance {args.tolerance * 100:.0f}%)")
+    return 1 if regressions else 0
+
+
+def _load_json(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def _add_compare_options(parser):
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Relative change that counts as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="Ignore load latency changes smaller than this")
+    parser.add_argument("--min-delta-micro-ms", type=float, default=0.05,
+                        help="Ignore microbenchmark changes smaller than this")
+    parser.add_argument("--min-delta-mb", type=float, default=25.0, help="Ignore RSS changes smaller than this")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the suite and write JSON results")
+    run_parser.add_argument("--parts", nargs="+", default=["micro", *LOAD_TARGETS], choices=["micro", *LOAD_TARGETS])
+    run_parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    run_parser.add_argument("--requests-per-client", type=int, default=4)
+    run_parser.add_argument("--min-requests", type=int, default=16)
+    run_parser.add_argument("--payloads", type=int, default=32, help="Distinct synthetic scans")
+    run_parser.add_argument("--no-explain", dest="explain", action="store_false", help="Analyze with explain=false")
+    run_parser.add_argument("--server-workers", type=int, default=settings.SERVE_WORKERS)
+    run_parser.add_argument("--startup-timeout", type=float, default=300.0)
+    run_parser.add_argument("--micro-repeat", type=int, default=20)
+    run_parser.add_argument("--output", help="JSON output path")
+    run_parser.add_argument("--compare", metavar="BASELINE", help="Compare against a stored result file")
+    _add_compare_options(run_parser)
+
+    compare_parser = commands.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    _add_compare_options(compare_parser)
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        return report(_load_json(args.baseline), _load_json(args.current), args)
+
+    results = run_suite(args)
+    if args.output:
+        write_json(args.output, results)
+    return report(_load_json(args.compare), results, args) if args.compare else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
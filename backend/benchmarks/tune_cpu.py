@@ -0,0 +1,178 @@
+"""
+CPU core budget tuner: sweeps worker processes x torch intra-op threads x
+inter-op threads x batch size on this host and saves the best setting.
+
+    python -m backend.benchmarks.tune_cpu --duration 5 --p99-budget-ms 400
+
+Every configuration forks `workers` copies of the real InferenceService
+model (loaded once here, like backend.serve), pins each to its thread
+budget and has them all run stacked forward passes of `batch` images at
+the same time for --duration seconds. A configuration's latency is the
+p99 of those batch passes; its throughput is images/s over all workers.
+
+The winner is the highest throughput whose p99 stays within the budget
+(otherwise the lowest p99). It is written to TUNING_PATH (or --output),
+which Settings loads at startup:
+
+  SERVE_WORKERS, SERVE_THREADS_PER_WORKER  python -m backend.serve
+  TORCH_THREADS                            single-process server (best 1-worker config)
+  TORCH_INTEROP_THREADS, BATCH_MAX_SIZE    both
+
+Oversubscribed combinations (workers x threads > cores) are skipped unless
+--oversubscribe is given. Runs offline; no server or network needed.
+"""
+
+import argparse
+import datetime
+import multiprocessing
+import os
+import platform
+import sys
+import time
+import torch
+from backend.benchmarks.common import ensure_model, synthetic_mri, summarize_latencies, write_json
+from backend.core.config import settings
+from backend.services.lifecycle import configure_torch_threads
+
+
+def _powers_of_two(limit: int) -> list:
+    values = [1]
+    while values[-1] * 2 <= limit:
+        values.append(values[-1] * 2)
+    if values[-1] != limit:
+        values.append(limit)
+    return values
+
+
+def _candidates(args, cores: int) -> list:
+    limit = cores * (2 if args.oversubscribe else 1)
+    workers = args.workers or _powers_of_two(limit)
+    threads = args.threads or _powers_of_two(limit)
+    return [(w, t, i, b)
+            for w in workers for t in threads if w * t <= limit
+            for i in args.interop
+            for b in args.batch_sizes]
+
+
+def _worker(service, batch, threads: int, interop: int, duration: float, barrier, results):
+    configure_torch_threads(threads, interop)
+    for _ in range(2):
+        service.predict_batch(batch)
+    barrier.wait()
+    latencies = []
+    stop_at = time.perf_counter() + duration
+    while time.perf_counter() < stop_at:
+        start = time.perf_counter()
+        service.predict_batch(batch)
+        latencies.append(time.perf_counter() - start)
+    results.put((len(latencies) * len(batch), latencies))
+
+
+def run(service, tensors: list, workers: int, threads: int, interop: int, batch_size: int, duration: float) -> dict:
+    context = multiprocessing.get_context("fork")
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    batch = [tensors[i % len(tensors)] for i in range(batch_size)]
+    processes = [context.Process(target=_worker, args=(service, batch, threads, interop, duration, barrier, results))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    images, latencies = 0, []
+    for _ in processes:
+        count, values = results.get()
+        images += count
+        latencies.extend(values)
+    for process in processes:
+        process.join()
+    return {
+        "workers": workers,
+        "threads": threads,
+        "interop_threads": interop,
+        "batch_size": batch_size,
+        "throughput_ips": round(images / duration, 2),
+        **summarize_latencies(latencies),
+    }
+
+
+def _pick(results: list, budget_ms: float) -> dict:
+    within = [r for r in results if r.get("p99_ms", float("inf")) <= budget_ms]
+    if within:
+        # Fewer threads win ties: same throughput, less contention
+        return max(within, key=lambda r: (r["throughput_ips"], -r["workers"] * r["threads"]))
+    return min(results, key=lambda r: r.get("p99_ms", float("inf")))
+
+
+def _cpu_model() -> str:
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", nargs="+", type=int, help="Worker counts (default: powers of two up to cores)")
+    parser.add_argument("--threads", nargs="+", type=int, help="Intra-op threads per worker (default: same)")
+    parser.add_argument("--interop", nargs="+", type=int, default=[1, 2])
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 4, 8, 16])
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per configuration")
+    parser.add_argument("--p99-budget-ms", type=float, default=500.0)
+    parser.add_argument("--oversubscribe", action="store_true", help="Also try workers x threads up to 2x cores")
+    parser.add_argument("--output", default=settings.TUNING_PATH, help="Tuning file (default: TUNING_PATH)")
+    parser.add_argument("--dry-run", action="store_true", help="Print the result without writing the tuning file")
+    args = parser.parse_args()
+
+    # Single-threaded parent: the forked workers must not inherit an OpenMP team
+    torch.set_num_threads(1)
+    from backend.services.context import AnalysisContext
+    from backend.services.inference import inference_service
+
+    service = ensure_model(inference_service)
+    tensors = [service.model_input(AnalysisContext.from_image(synthetic_mri(512, seed))) for seed in range(16)]
+
+    cores = os.cpu_count() or 1
+    candidates = _candidates(args, cores)
+    print(f"{len(candidates)} configurations x {args.duration:.0f}s on {cores} core(s)")
+    print(f"{'workers':>7} {'threads':>7} {'interop':>7} {'batch':>5} {'img/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    results = []
+    for workers, threads, interop, batch_size in candidates:
+        result = run(service, tensors, workers, threads, interop, batch_size, args.duration)
+        results.append(result)
+        print(f"{workers:>7} {threads:>7} {interop:>7} {batch_size:>5} {result['throughput_ips']:>8.1f} "
+              f"{result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f}")
+
+    best = _pick(results, args.p99_budget_ms)
+    best_single = _pick([r for r in results if r["workers"] == 1] or results, args.p99_budget_ms)
+    tuned = {
+        "SERVE_WORKERS": best["workers"],
+        "SERVE_THREADS_PER_WORKER": best["threads"],
+        "TORCH_THREADS": best_single["threads"],
+        "TORCH_INTEROP_THREADS": best["interop_threads"],
+        "BATCH_MAX_SIZE": best["batch_size"],
+    }
+    print(f"✓ Best: {best['workers']} worker(s) x {best['threads']} thread(s), interop {best['interop_threads']}, "
+          f"batch {best['batch_size']}: {best['throughput_ips']:.1f} img/s, p99 {best['p99_ms']:.0f} ms")
+    if best.get("p99_ms", float("inf")) > args.p99_budget_ms:
+        print(f"⚠️ No configuration met the {args.p99_budget_ms:.0f} ms p99 budget; picked the lowest p99")
+
+    if args.dry_run:
+        print(tuned)
+        return 0
+    write_json(args.output, {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "host": {"cpu_count": cores, "cpu_model": _cpu_model(), "torch": torch.__version__,
+                 "backend": service.backend.name},
+        "p99_budget_ms": args.p99_budget_ms,
+        "duration_s": args.duration,
+        "settings": tuned,
+        "sweep": results,
+    })
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
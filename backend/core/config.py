@@ -1,5 +1,35 @@
+import json
 import os
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, PydanticBaseSettingsSource
+
+
+class TunedSettingsSource(PydanticBaseSettingsSource):
+    """
+    Host-specific values written by backend/benchmarks/tune_cpu.py
+    (TUNING_PATH). Environment variables still win; a file tuned on a
+    machine with a different core count is ignored.
+    """
+
+    def get_field_value(self, field, field_name):
+        return None, field_name, False
+
+    def __call__(self) -> dict:
+        path = os.environ.get("TUNING_PATH", self.settings_cls.model_fields["TUNING_PATH"].default)
+        if not path or not os.path.exists(path):
+            return {}
+        try:
+            with open(path) as f:
+                tuning = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Ignoring CPU tuning file {path}: {e}")
+            return {}
+        if tuning.get("host", {}).get("cpu_count") != os.cpu_count():
+            print(f"⚠️ Ignoring CPU tuning file {path}: tuned for {tuning.get('host', {}).get('cpu_count')} cores, "
+                  f"this host has {os.cpu_count()}")
+            return {}
+        return {name: value for name, value in tuning.get("settings", {}).items()
+                if name in self.settings_cls.model_fields}
+
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Brain Tumor Detection"
@@ -9,11 +39,93 @@ class Settings(BaseSettings):
     MODEL_DIR: str = os.path.join(os.path.dirname(__file__), "../models")
     CLASSIFIER_PATH: str = os.path.join(MODEL_DIR, "classifier_real.pth")
     CLASSES_PATH: str = os.path.join(MODEL_DIR, "classes.txt")
+    ONNX_PATH: str = os.path.join(MODEL_DIR, "classifier.onnx")
+    QUANTIZED_PATH: str = os.path.join(MODEL_DIR, "classifier_int8.pt")
+    TORCHSCRIPT_PATH: str = os.path.join(MODEL_DIR, "classifier_ts.pt")
+    SEGMENTATION_PATH: str = os.path.join(MODEL_DIR, "segmentation_head.pth")
+    
+    # Classifier Backend
+    MODEL_BACKEND: str = "torch"  # "torch" or "onnx"
+    TORCHSCRIPT_ENABLED: bool = True  # torch: serve TORCHSCRIPT_PATH when exported from the current checkpoint
+    ONNX_INTRA_OP_THREADS: int = 0  # 0 = let ONNX Runtime decide
+    ONNX_INTER_OP_THREADS: int = 0
+    ONNX_GRAPH_OPTIMIZATION: str = "all"  # "disable", "basic", "extended" or "all"
+    MODEL_PRECISION: str = "fp32"  # "fp32" or "int8" (training/quantize.py artifact)
     
     # Validation Rules
     ALLOWED_EXTENSIONS: set = {"jpg", "jpeg", "png", "dicom"}
+    VALIDATOR_MODE: str = "full"  # "full" or "fast" (header dimensions + reduced-resolution decode)
+    MIN_IMAGE_SIDE: int = 100  # Pixels
+    MAX_IMAGE_SIDE: int = 4000
+    
+    # Upload Limits (enforced while the body streams in, before any decode)
+    MAX_UPLOAD_BYTES: int = 32 * 1024 * 1024  # Per file (and per zip entry)
+    MAX_REQUEST_BYTES: int = 256 * 1024 * 1024  # Whole request body, e.g. /analyze/batch
+    MAX_EXPANDED_BYTES: int = 256 * 1024 * 1024  # All images of one request once zips are unpacked
+    MAX_ZIP_RATIO: int = 100  # Max uncompressed/compressed size of a zip entry (zip bombs)
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    
+    # Startup (model loads in the background; /api/v1/ready reports when done)
+    WARMUP_PASSES: int = 3  # Dummy classify + GradCAM passes before ready
+    
+    # Pre-fork Server (python -m backend.serve: model loaded once, workers share it copy-on-write)
+    SERVE_WORKERS: int = 1
+    SERVE_THREADS_PER_WORKER: int = 0  # torch intra-op threads per worker; 0 = cores // workers
+    
+    # CPU Threads (0 = torch default; TUNING_PATH values apply unless overridden by env)
+    TORCH_THREADS: int = 0  # Intra-op threads for the single-process server
+    TORCH_INTEROP_THREADS: int = 0
+    TUNING_PATH: str = os.path.join(MODEL_DIR, "cpu_tuning.json")  # Written by benchmarks/tune_cpu.py
+    
+    # Analysis Worker Pool (keeps CPU-bound work off the event loop)
+    EXECUTOR_KIND: str = "thread"  # "thread" or "process"
+    EXECUTOR_WORKERS: int = 2
+    EXECUTOR_QUEUE_SIZE: int = 8  # Jobs allowed to wait beyond the busy workers
+    EXECUTOR_RETRY_AFTER: int = 5  # Seconds suggested to clients when the queue is full
+    
+    # Dynamic Micro-Batching (stacks concurrent classify calls into one forward pass)
+    BATCH_ENABLED: bool = True
+    BATCH_MAX_SIZE: int = 8
+    BATCH_MAX_WAIT_MS: float = 5.0
+    
+    # Grad-CAM from the classification pass instead of a second forward + backward
+    FUSED_GRADCAM: bool = True
+    
+    # Segmentation Head (decoder on the classifier's backbone features; mock mask when not trained)
+    SEGMENTATION_ENABLED: bool = True  # Uses SEGMENTATION_PATH when present
+    SEGMENTATION_THRESHOLD: float = 0.5  # Tumor probability per pixel
+    
+    # Batch Endpoint (/analyze/batch)
+    ANALYZE_BATCH_MAX_IMAGES: int = 64  # Files + zip entries per request
+    ANALYZE_BATCH_CONCURRENCY: int = 4  # Images of one request in the pipeline at once
+    
+    # Study Endpoint (/analyze/study: one slice series -> one verdict)
+    STUDY_MAX_SLICES: int = 512
+    STUDY_BATCH_SIZE: int = 16  # Slices per forward pass
+    STUDY_TOP_K: int = 3  # Most suspicious slices: drive the verdict and get GradCAM
+    STUDY_TUMOR_THRESHOLD: float = 0.5  # Study tumor score for a tumor verdict
+    
+    # Heatmap Delivery
+    HEATMAP_DELIVERY: str = "base64"  # "base64" (inline JSON) or "url" (GET /api/v1/heatmaps/{id})
+    HEATMAP_FORMAT: str = "png"  # "png", "webp" or "jpeg"
+    HEATMAP_PNG_LEVEL: int = 1  # 0-9 (OpenCV default: 1)
+    HEATMAP_QUALITY: int = 85  # WebP / JPEG quality
+    HEATMAP_TTL_SECONDS: int = 300
+    HEATMAP_STORE_MAX_BYTES: int = 32 * 1024 * 1024
+    HEATMAP_DISK_DIR: str = ""  # Empty = memory only; backend.serve uses a shared temp dir for several workers
+    
+    # Result Cache (keyed by upload hash + model version)
+    CACHE_ENABLED: bool = True
+    CACHE_TTL_SECONDS: int = 3600
+    CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # In-memory budget
+    CACHE_DISK_DIR: str = ""  # Empty = memory only
+    CACHE_DISK_MAX_BYTES: int = 512 * 1024 * 1024
     
     class Config:
         case_sensitive = True
+    
+    @classmethod
+    def settings_customise_sources(cls, settings_cls, init_settings, env_settings, dotenv_settings, file_secret_settings):
+        return init_settings, env_settings, dotenv_settings, TunedSettingsSource(settings_cls), file_secret_settings
 
 settings = Settings()
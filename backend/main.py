@@ -1,8 +1,21 @@
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from backend.core.config import settings
 from backend.api.endpoints import router as api_router
+from backend.api.limits import BodySizeLimitMiddleware
+from backend.services.executor import pipeline_executor
+from backend.services.lifecycle import model_lifecycle
+from backend.services.metrics import render_metrics
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Bind right away; the model loads and warms up in the background (see /api/v1/ready)
+    model_lifecycle.start()
+    yield
+    pipeline_executor.shutdown()
 
 app = FastAPI(
     title="Brain Tumor Detection API",
@@ -10,8 +23,12 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
+# Refuse oversized bodies before multipart parsing spools them (inside CORS, so 413s keep CORS headers)
+app.add_middleware(BodySizeLimitMiddleware, max_bytes=settings.MAX_REQUEST_BYTES)
+
 # CORS Configuration
 origins = [
     "*", # Allow all for mobile dev
@@ -27,6 +44,11 @@ app.add_middleware(
 
 app.include_router(api_router, prefix="/api/v1")
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    # Prometheus scrape target (text exposition format 0.0.4)
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 @app.get("/")
 def health_check():
     return {
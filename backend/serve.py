@@ -0,0 +1,172 @@
+"""
+Pre-fork server: loads and warms the model once, then forks uvicorn workers
+that share the weight pages copy-on-write.
+
+    python -m backend.serve --workers 4 --threads 1 --port 8000
+
+`uvicorn --workers N` starts N fresh interpreters that each import torch,
+load their own InferenceService / GradCAMService and warm up, so memory
+grows by a full model per worker. Here the parent does that once, freezes
+the GC (so collections in the children don't write to the shared object
+headers) and forks; every worker serves from the same listening socket
+with its own torch.set_num_threads budget. Dead workers are re-forked
+from the warm parent.
+
+The parent warms up single-threaded and stops the micro-batcher threads
+before forking: an OpenMP pool or a thread holding a lock must not cross
+fork(). Each worker has its own result cache, executor and /metrics.
+Heatmaps (HEATMAP_DELIVERY=url) must survive the follow-up GET landing on
+another worker, so with several workers the heatmap store also writes to
+HEATMAP_DISK_DIR, or to a temporary directory shared by the workers and
+removed on exit when that is unset.
+
+Nothing answers on the socket (/, /api/v1/health and /api/v1/ready
+included) until the parent has loaded and warmed the model, so this is
+opt-in: the Docker image runs `uvicorn backend.main:app` (bind at once,
+load in the background) unless SERVE_PREFORK=1. Use it where the platform
+tolerates a slow first bind.
+"""
+
+import argparse
+import gc
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+from backend.core.config import settings
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _threads_per_worker(workers: int, threads: int) -> int:
+    return threads if threads > 0 else max(1, (os.cpu_count() or 1) // workers)
+
+
+def _preload():
+    """Parent: import the app, load + warm the model, leave no threads behind."""
+    from backend.main import app
+    from backend.services.lifecycle import model_lifecycle
+
+    if not model_lifecycle.preload():
+        raise SystemExit(f"Model failed to load: {model_lifecycle.error}")
+    service = model_lifecycle.service
+    for batcher in (service.batcher, service.cam_batcher):
+        if batcher is not None:
+            batcher.stop()  # Restarted lazily in each worker
+    return app
+
+
+def _run_worker(app, sock: socket.socket, threads: int, args):
+    import torch
+    import uvicorn
+
+    torch.set_num_threads(threads)
+    print(f"✓ Worker {os.getpid()} serving with {threads} torch thread(s)")
+    config = uvicorn.Config(app, host=args.host, port=args.port, log_level=args.log_level, access_log=False)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def _fork_worker(app, sock: socket.socket, threads: int, args) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            _run_worker(app, sock, threads, args)
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def serve(args) -> int:
+    if settings.EXECUTOR_KIND == "process":
+        print("⚠️ EXECUTOR_KIND=process can't be combined with pre-fork workers; use the thread executor.")
+        return 2
+
+    threads = _threads_per_worker(args.workers, args.threads)
+    shared_heatmaps = None
+    if args.workers > 1 and not settings.HEATMAP_DISK_DIR:
+        # Set before the app import creates heatmap_store
+        shared_heatmaps = settings.HEATMAP_DISK_DIR = tempfile.mkdtemp(prefix="heatmaps-")
+        print(f"✓ Heatmap store shared by the workers: {shared_heatmaps}")
+    try:
+        return _serve(args, threads)
+    finally:
+        if shared_heatmaps:
+            shutil.rmtree(shared_heatmaps, ignore_errors=True)
+
+
+def _serve(args, threads: int) -> int:
+    sock = _bind(args.host, args.port)
+    app = _preload()
+
+    # Everything allocated so far is shared with the workers; keep the GC off those pages
+    gc.collect()
+    gc.freeze()
+
+    workers = {}
+    for _ in range(args.workers):
+        pid = _fork_worker(app, sock, threads, args)
+        workers[pid] = time.monotonic()
+    print(f"✓ Pre-fork server on {args.host}:{args.port}: {args.workers} worker(s) x {threads} thread(s)")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        started = workers.pop(pid, None)
+        if started is None or stopping:
+            continue
+        print(f"⚠️ Worker {pid} exited ({os.waitstatus_to_exitcode(status)}); starting a new one")
+        if time.monotonic() - started < 1.0:
+            time.sleep(1.0)  # Don't spin when workers die on startup
+        workers[_fork_worker(app, sock, threads, args)] = time.monotonic()
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=settings.SERVE_WORKERS)
+    parser.add_argument("--threads", type=int, default=settings.SERVE_THREADS_PER_WORKER,
+                        help="torch intra-op threads per worker (0 = cores // workers)")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+    return serve(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+2D anatomical atlas of the 224x224 model view.
+
+The view is divided into cells (row band x column band), each labelled with
+a lobe and a hemisphere. A cell mask is the outer product of a row-band and
+a column-band indicator, so the atlas is stored as its two factors (3x224
+and 224x4 float32, ~7 KB) rather than as 12 dense masks, and the mass of a
+mask or CAM in every cell is one chained matrix product:
+row_bands @ weights @ column_bands.
+"""
+
+import cv2
+import numpy as np
+
+ATLAS_SIZE = 224
+
+# Band edges as fractions of the view: thirds from top to bottom; thirds from
+# left to right, the middle one split at the midline
+ROW_EDGES = (0.0, 1 / 3, 2 / 3, 1.0)
+COLUMN_EDGES = (0.0, 1 / 3, 1 / 2, 2 / 3, 1.0)
+CELL_LOBES = (
+    ("Frontal Lobe", "Frontal Lobe", "Frontal Lobe", "Frontal Lobe"),
+    ("Temporal Lobe", "Parietal Lobe", "Parietal Lobe", "Temporal Lobe"),
+    ("Cerebellum", "Brainstem", "Brainstem", "Cerebellum"),
+)
+# Radiological convention: the patient's left is on the right of the image
+COLUMN_HEMISPHERES = ("Right", "Right", "Left", "Left")
+HEMISPHERES = ("Left", "Right")
+# Share of the mass one hemisphere needs before a finding is called lateral
+LATERAL_SHARE = 0.6
+
+
+def _bands(edges: tuple, size: int) -> np.ndarray:
+    bounds = [int(size * edge) for edge in edges]
+    bands = np.zeros((len(bounds) - 1, size), dtype=np.float32)
+    for index, (start, stop) in enumerate(zip(bounds, bounds[1:])):
+        bands[index, start:stop] = 1.0
+    return bands
+
+
+class RegionAtlas:
+    """Region masks at ATLAS_SIZE, built once; overlap scores by matrix product."""
+
+    def __init__(self, size: int = ATLAS_SIZE):
+        self.size = size
+        self.row_bands = _bands(ROW_EDGES, size)
+        self.column_bands = np.ascontiguousarray(_bands(COLUMN_EDGES, size).T)
+        self.lobes = tuple(dict.fromkeys(lobe for row in CELL_LOBES for lobe in row))
+        # Cell -> (lobes..., Left, Right) aggregation, 0/1: one more tiny product
+        # turns the cell masses into region and hemisphere masses
+        self.cell_regions = np.array([[lobe == name for name in self.lobes] + [side == name for name in HEMISPHERES]
+                                      for row in CELL_LOBES for lobe, side in zip(row, COLUMN_HEMISPHERES)],
+                                     dtype=np.float32)
+
+    def masks(self) -> np.ndarray:
+        """Dense cell masks, (rows, columns, size, size) bool. For inspection; scoring never builds them."""
+        return np.einsum("ry,xc->rcyx", self.row_bands, self.column_bands).astype(bool)
+
+    def _resample(self, weights: np.ndarray) -> np.ndarray:
+        # Area resampling keeps the mean, so rescale to keep the total mass
+        height, width = weights.shape[-2:]
+        scale = height * width / (self.size * self.size)
+        resize = lambda plane: cv2.resize(plane, (self.size, self.size), interpolation=cv2.INTER_AREA) * scale
+        if weights.ndim == 2:
+            return resize(weights)
+        return np.stack([resize(plane) for plane in weights.reshape(-1, height, width)]).reshape(
+            *weights.shape[:-2], self.size, self.size)
+
+    def overlap(self, weights: np.ndarray) -> np.ndarray:
+        """Mass of a (H, W) or (N, H, W) mask/CAM in every cell: (..., rows, columns)."""
+        weights = np.asarray(weights, dtype=np.float32)
+        if weights.shape[-2:] != (self.size, self.size):
+            weights = self._resample(weights)
+        return self.row_bands @ weights @ self.column_bands
+
+    def fractions(self, weights: np.ndarray) -> tuple:
+        """(lobe fractions (..., lobes), hemisphere fractions (..., 2), total mass (...))."""
+        cells = self.overlap(weights)
+        masses = cells.reshape(*cells.shape[:-2], -1) @ self.cell_regions
+        total = masses[..., -2:].sum(axis=-1)
+        fractions = masses / np.where(total > 0, total, 1.0)[..., None]
+        return fractions[..., :-2], fractions[..., -2:], total
+
+    def locate(self, weights: np.ndarray) -> dict:
+        """Per-region fractions of one mask/CAM plus its dominant region and hemisphere."""
+        masses = (self.overlap(weights).ravel() @ self.cell_regions).tolist()
+        *lobes, left, right = masses
+        total = left + right
+        if total <= 0:
+            return {"region": "Unknown", "hemisphere": "Unknown", "mass": 0.0,
+                    "region_fractions": {}, "hemisphere_fractions": {}}
+        if left >= LATERAL_SHARE * total:
+            hemisphere = "Left"
+        elif right >= LATERAL_SHARE * total:
+            hemisphere = "Right"
+        else:
+            hemisphere = "Midline"
+        ranked = sorted(zip(self.lobes, lobes), key=lambda item: -item[1])
+        return {
+            "region": ranked[0][0],
+            "hemisphere": hemisphere,
+            "mass": total,
+            "region_fractions": {name: round(mass / total, 3) for name, mass in ranked if mass > 0},
+            "hemisphere_fractions": {"Left": round(left / total, 3), "Right": round(right / total, 3)},
+        }
+
+
+def describe_location(location: dict) -> str:
+    """'the Frontal Lobe, left hemisphere' / 'the Brainstem, midline' for a locate() result."""
+    if location["mass"] == 0:
+        return "an undetermined region"
+    if location["hemisphere"] == "Midline":
+        return f"the {location['region']}, midline"
+    return f"the {location['region']}, {location['hemisphere'].lower()} hemisphere"
+
+
+atlas = RegionAtlas()
@@ -0,0 +1,219 @@
+import hashlib
+import json
+import os
+import numpy as np
+import torch
+
+# Lazy import (onnxruntime is only needed for MODEL_BACKEND=onnx)
+ort = None
+
+GRAPH_OPTIMIZATION_LEVELS = {
+    "disable": "ORT_DISABLE_ALL",
+    "basic": "ORT_ENABLE_BASIC",
+    "extended": "ORT_ENABLE_EXTENDED",
+    "all": "ORT_ENABLE_ALL",
+}
+
+
+def _import_onnxruntime():
+    global ort
+    if ort is None:
+        import onnxruntime
+        ort = onnxruntime
+    return ort
+
+
+class TorchBackend:
+    """Eager PyTorch classifier. Supports the fused GradCAM pass."""
+
+    name = "torch"
+    supports_cam = True
+
+    def __init__(self, model: torch.nn.Module, device: torch.device):
+        self.model = model
+        self.device = device
+
+    def predict(self, batch: torch.Tensor) -> torch.Tensor:
+        """(N, 3, 224, 224) normalized batch -> (N, classes) softmax on CPU."""
+        with torch.no_grad():
+            outputs = self.model(batch.to(self.device))
+            return torch.nn.functional.softmax(outputs, dim=1).cpu()
+
+
+class TorchScriptBackend:
+    """
+    Serialized TorchScript classifier (e.g. the INT8 quantized artifact).
+    No autograd through quantized ops, so GradCAM uses the eager model.
+    """
+
+    name = "torchscript"
+    supports_cam = False
+
+    def __init__(self, path: str, quantized: bool = False):
+        if quantized:
+            engines = torch.backends.quantized.supported_engines
+            torch.backends.quantized.engine = "x86" if "x86" in engines else "fbgemm"
+        self.path = path
+        self.model = torch.jit.load(path, map_location="cpu").eval()
+
+    def predict(self, batch: torch.Tensor) -> torch.Tensor:
+        with torch.no_grad():
+            outputs = self.model(batch.cpu())
+            return torch.nn.functional.softmax(outputs, dim=1)
+
+
+class FrozenTorchBackend(TorchScriptBackend):
+    """
+    Frozen channels_last TorchScript export of the fp32 classifier
+    (training/export_torchscript.py). Same numbers as the eager model.
+    Artifacts that also return the backbone taps (metadata "taps") serve
+    the fused GradCAM and mask passes through encode(); older ones only
+    classify and leave those passes to the eager model.
+    """
+
+    name = "torchscript"
+    supports_cam = True
+    channels_last = True  # Input layout the artifact was traced with
+
+    def __init__(self, path: str):
+        extra_files = {"metadata.json": ""}
+        self.path = path
+        self.model = torch.jit.load(path, map_location="cpu", _extra_files=extra_files).eval()
+        self.metadata = json.loads(extra_files["metadata.json"] or "{}")
+        self.taps = tuple(self.metadata.get("taps", ()))
+
+    def _forward(self, batch: torch.Tensor):
+        with torch.no_grad():
+            return self.model(batch.cpu().contiguous(memory_format=torch.channels_last))
+
+    def predict(self, batch: torch.Tensor) -> torch.Tensor:
+        outputs = self._forward(batch)
+        logits = outputs[0] if self.taps else outputs
+        return torch.nn.functional.softmax(logits, dim=1)
+
+    def encode(self, batch: torch.Tensor) -> tuple:
+        """
+        (logits, {stage: feature map}) from one frozen pass. The maps are
+        returned contiguous: the eager heads that read them were never
+        measured in channels_last.
+        """
+        logits, *maps = self._forward(batch)
+        return logits, {tap: feature_map.contiguous() for tap, feature_map in zip(self.taps, maps)}
+
+
+def file_sha1(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _load_frozen_backend(settings):
+    """The TorchScript artifact, or None when missing or exported from another checkpoint."""
+    if not os.path.exists(settings.TORCHSCRIPT_PATH):
+        return None
+    try:
+        backend = FrozenTorchBackend(settings.TORCHSCRIPT_PATH)
+        if backend.metadata.get("source_sha1") != file_sha1(settings.CLASSIFIER_PATH):
+            print(f"⚠️ {settings.TORCHSCRIPT_PATH} was exported from a different checkpoint; "
+                  "re-run training/export_torchscript.py. Using the eager model.")
+            return None
+        print(f"✓ TorchScript backend loaded: {settings.TORCHSCRIPT_PATH} ({backend.metadata.get('variant')})")
+        return backend
+    except Exception as e:
+        print(f"TorchScript backend failed: {e}")
+        return None
+
+
+_session_options_cache = {}
+
+
+def get_session_options(intra_op_threads: int = 0, inter_op_threads: int = 0, graph_optimization: str = "all"):
+    """
+    One SessionOptions object per configuration, reused across sessions
+    (benchmarks and reloads build many sessions with the same settings).
+    """
+    key = (intra_op_threads, inter_op_threads, graph_optimization)
+    if key not in _session_options_cache:
+        runtime = _import_onnxruntime()
+        if graph_optimization not in GRAPH_OPTIMIZATION_LEVELS:
+            raise ValueError(f"Unknown ONNX graph optimization level: {graph_optimization}")
+        options = runtime.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+        options.graph_optimization_level = getattr(
+            runtime.GraphOptimizationLevel, GRAPH_OPTIMIZATION_LEVELS[graph_optimization]
+        )
+        _session_options_cache[key] = options
+    return _session_options_cache[key]
+
+
+class OnnxBackend:
+    """ONNX Runtime classifier (CPU). GradCAM still needs the eager model."""
+
+    name = "onnx"
+    supports_cam = False
+
+    def __init__(self, path: str, intra_op_threads: int = 0, inter_op_threads: int = 0, graph_optimization: str = "all"):
+        runtime = _import_onnxruntime()
+        self.path = path
+        self.session = runtime.InferenceSession(
+            path,
+            sess_options=get_session_options(intra_op_threads, inter_op_threads, graph_optimization),
+            providers=["CPUExecutionProvider"],
+        )
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, batch: torch.Tensor) -> torch.Tensor:
+        inputs = np.ascontiguousarray(batch.detach().cpu().numpy(), dtype=np.float32)
+        logits = self.session.run(None, {self.input_name: inputs})[0]
+        return torch.nn.functional.softmax(torch.from_numpy(logits), dim=1)
+
+
+def create_backend(kind: str, model, device, settings):
+    """
+    Builds the configured classifier backend.
+    Falls back to the eager model when the requested artifact can't be used.
+    """
+    if settings.MODEL_PRECISION == "int8":
+        if os.path.exists(settings.QUANTIZED_PATH):
+            try:
+                backend = TorchScriptBackend(settings.QUANTIZED_PATH, quantized=True)
+                backend.name = "torch-int8"
+                print(f"✓ INT8 quantized backend loaded: {settings.QUANTIZED_PATH}")
+                return backend
+            except Exception as e:
+                print(f"INT8 backend failed: {e}")
+        else:
+            print(f"INT8 model not found at {settings.QUANTIZED_PATH}")
+    elif settings.MODEL_PRECISION != "fp32":
+        print(f"Unknown MODEL_PRECISION '{settings.MODEL_PRECISION}'")
+
+    if kind == "onnx":
+        if os.path.exists(settings.ONNX_PATH):
+            try:
+                backend = OnnxBackend(
+                    settings.ONNX_PATH,
+                    intra_op_threads=settings.ONNX_INTRA_OP_THREADS,
+                    inter_op_threads=settings.ONNX_INTER_OP_THREADS,
+                    graph_optimization=settings.ONNX_GRAPH_OPTIMIZATION,
+                )
+                print(f"✓ ONNX Runtime backend loaded: {settings.ONNX_PATH}")
+                return backend
+            except Exception as e:
+                print(f"ONNX Runtime backend failed: {e}")
+        else:
+            print(f"ONNX model not found at {settings.ONNX_PATH}")
+    elif kind != "torch":
+        print(f"Unknown MODEL_BACKEND '{kind}'")
+
+    if model is not None:
+        if kind != "torch":
+            print("Falling back to PyTorch backend.")
+        elif settings.TORCHSCRIPT_ENABLED and device.type == "cpu":
+            backend = _load_frozen_backend(settings)
+            if backend is not None:
+                return backend
+        return TorchBackend(model, device)
+    return None
@@ -0,0 +1,91 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from backend.services.metrics import BATCH_SIZE
+
+_STOP = object()
+
+
+class BatchScheduler:
+    """
+    Collects concurrent single-item requests into one batched call.
+
+    A batch is flushed when it holds `max_batch_size` items or when the
+    oldest item has waited `max_wait_ms`. `process_batch` receives a list
+    of items and must return one result per item, in order.
+    """
+
+    def __init__(self, process_batch, max_batch_size: int = 8, max_wait_ms: float = 5.0, name: str = "batcher"):
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.name = name
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+
+    def _ensure_started(self):
+        # Started lazily so the thread is created in the process that uses it
+        # (safe with fork-based process pools).
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+                    self._thread.start()
+
+    def submit(self, item, timeout: float = None):
+        """Blocks until the batch containing `item` has been processed."""
+        future = Future()
+        self._ensure_started()
+        self._queue.put((item, future))
+        return future.result(timeout)
+
+    def _collect(self, first) -> list:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(entry)
+        return batch
+
+    def _loop(self):
+        while True:
+            entry = self._queue.get()
+            if entry is _STOP:
+                return
+            self._run(self._collect(entry))
+
+    def _run(self, batch: list):
+        futures = [future for _, future in batch]
+        try:
+            results = self.process_batch([item for item, _ in batch])
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.items += len(batch)
+        BATCH_SIZE.observe(len(batch), batcher=self.name)
+        for future, result in zip(futures, results):
+            future.set_result(result)
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.items / self.batches if self.batches else 0.0
+
+    def stop(self):
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+        self._thread = None
@@ -0,0 +1,153 @@
+import time
+from collections import Counter
+from contextlib import contextmanager
+import cv2
+import numpy as np
+from backend.services.image_header import read_image_header, is_dicom
+
+# JPEG decoders can scale by 1/2, 1/4, 1/8 during the DCT (largest first)
+REDUCED_DECODE_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8, cv2.IMREAD_REDUCED_GRAYSCALE_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4, cv2.IMREAD_REDUCED_GRAYSCALE_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2, cv2.IMREAD_REDUCED_GRAYSCALE_2),
+)
+
+
+class StageTimer:
+    """Collects wall-clock compute time per pipeline stage (milliseconds)."""
+
+    def __init__(self):
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            # Accumulates, so a stage entered twice reports its total
+            elapsed = (time.perf_counter() - start) * 1000
+            self.timings[name] = round(self.timings.get(name, 0.0) + elapsed, 2)
+
+
+class AnalysisContext:
+    """
+    Request-scoped views of one upload.
+
+    Every view (decoded image, gray, RGB, 224x224 RGB, model tensor) is
+    computed at most once and shared by the validator, inference, GradCAM
+    and anatomy stages. Views are shared arrays: stages must not modify them.
+    Services record sub-stage timings (e.g. heatmap_encode) on ctx.timer.
+    """
+
+    def __init__(self, contents: bytes = None, image: np.ndarray = None, frame: int = None):
+        self.contents = contents
+        self.frame = frame  # Multi-frame DICOM: which frame this context analyzes (default 0)
+        self._views = {}
+        self.counters = Counter()
+        self.timer = StageTimer()
+        if image is not None:
+            self._views["image"] = image
+
+    # Views small enough to ship across a process boundary (process executor,
+    # streamed responses); everything else is rebuilt lazily from the upload
+    PORTABLE_VIEWS = ("rgb_224", "gray_224", "model_input", "tensor")
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        keep = self.PORTABLE_VIEWS if self.contents is not None else self.PORTABLE_VIEWS + ("image",)
+        state["_views"] = {name: view for name, view in self._views.items() if name in keep}
+        return state
+
+    @classmethod
+    def from_bytes(cls, contents: bytes, frame: int = None) -> "AnalysisContext":
+        return cls(contents=contents, frame=frame)
+
+    @classmethod
+    def from_image(cls, image: np.ndarray) -> "AnalysisContext":
+        return cls(image=image)
+
+    def cached(self, name: str, factory):
+        """Returns the view `name`, building it with factory() on first use."""
+        if name not in self._views:
+            self._views[name] = factory()
+            self.counters[name] += 1
+        return self._views[name]
+
+    @property
+    def image(self) -> np.ndarray:
+        """Decoded upload (BGR or gray, OpenCV layout). None if undecodable."""
+        return self.cached("image", self._decode)
+
+    def _decode(self):
+        if is_dicom(self.contents):
+            return self._decode_dicom()
+        nparr = np.frombuffer(self.contents, np.uint8)
+        return cv2.imdecode(nparr, cv2.IMREAD_UNCHANGED)
+
+    def _decode_dicom(self):
+        # Imported here: pydicom is only needed for DICOM uploads
+        from backend.services.dicom import DicomImage
+        try:
+            return DicomImage.open(self.contents).frame(self.frame or 0)
+        except Exception as e:
+            print(f"⚠️ Could not read DICOM upload: {e}")
+            return None
+
+    @property
+    def header(self):
+        """Format and dimensions read from the upload header (no decode). None if unknown."""
+        return self.cached("header", lambda: read_image_header(self.contents) if self.contents is not None else None)
+
+    def preview(self, min_side: int) -> np.ndarray:
+        """
+        Downscaled image whose shorter side stays >= min_side, for checks that
+        don't need full resolution. JPEGs use a reduced (DCT-scaled) decode
+        and never materialize the full image; anything else is a strided view
+        of the full decode. Same layout as `image`. None if undecodable.
+        """
+        def build():
+            header = self.header
+            if "image" not in self._views and header is not None and header["format"] == "jpeg":
+                for factor, color_flag, gray_flag in REDUCED_DECODE_FLAGS:
+                    if min(header["width"], header["height"]) // factor >= min_side:
+                        flag = gray_flag if header["channels"] == 1 else color_flag
+                        nparr = np.frombuffer(self.contents, np.uint8)
+                        # IMREAD_UNCHANGED ignores EXIF orientation; keep the preview consistent
+                        return cv2.imdecode(nparr, flag | cv2.IMREAD_IGNORE_ORIENTATION)
+            image = self.image
+            if image is None:
+                return None
+            step = max(1, min(image.shape[:2]) // min_side)
+            return image[::step, ::step]
+        return self.cached(f"preview_{min_side}", build)
+
+    @property
+    def gray(self) -> np.ndarray:
+        def build():
+            if len(self.image.shape) == 3:
+                return cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+            return self.image
+        return self.cached("gray", build)
+
+    @property
+    def rgb(self) -> np.ndarray:
+        def build():
+            if len(self.image.shape) == 3:
+                return cv2.cvtColor(self.image, cv2.COLOR_BGR2RGB)
+            return cv2.cvtColor(self.image, cv2.COLOR_GRAY2RGB)
+        return self.cached("rgb", build)
+
+    @property
+    def rgb_224(self) -> np.ndarray:
+        """RGB resized to the model resolution (uint8), used for overlays."""
+        return self.cached("rgb_224", lambda: cv2.resize(self.rgb, (224, 224)))
+
+    @property
+    def rgb_224_float(self) -> np.ndarray:
+        """rgb_224 scaled to 0-1 float32 (same as preprocess_image output)."""
+        return self.cached("rgb_224_float", lambda: self.rgb_224.astype(np.float32) / 255.0)
+
+    @property
+    def gray_224(self) -> np.ndarray:
+        return self.cached("gray_224", lambda: cv2.resize(self.gray, (224, 224)))
@@ -0,0 +1,195 @@
+import io
+import struct
+import cv2
+import numpy as np
+import pydicom
+from pydicom.pixels import pixel_array
+
+PIXEL_DATA_TAG = (0x7FE0, 0x0010)
+UNDEFINED_LENGTH = 0xFFFFFFFF
+
+
+class DicomImage:
+    """
+    One DICOM file (single- or multi-frame) whose frames are converted to
+    8-bit only when requested.
+
+    Uncompressed pixel data is never copied: `pixels` is a view into the
+    upload bytes (np.frombuffer) or a read-only np.memmap of the file on
+    disk. Compressed transfer syntaxes are decoded by pydicom one frame at
+    a time. frame(i) applies rescale slope/intercept and the VOI window
+    (or a min/max window when the file has none) through one lookup table.
+    """
+
+    def __init__(self, dataset, source, pixels=None):
+        self.dataset = dataset
+        self.source = source
+        self.pixels = pixels  # (frames, rows, cols[, samples]) raw stored values, or None if compressed
+        self.num_frames = int(dataset.get("NumberOfFrames", 1) or 1)
+        self.rows = int(dataset.Rows)
+        self.columns = int(dataset.Columns)
+        self.photometric = str(dataset.get("PhotometricInterpretation", "MONOCHROME2"))
+        self._luts = {}
+
+    @classmethod
+    def open(cls, source) -> "DicomImage":
+        """source: upload bytes or a path. Only the header is parsed here."""
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            fp = io.BytesIO(source)
+            dataset = pydicom.dcmread(fp, stop_before_pixels=True)
+            image = cls(dataset, source)
+            image.pixels = image._map_pixels(fp.tell(), len(source), lambda offset, length: source[offset:offset + length])
+            return image
+
+        with open(source, "rb") as fp:
+            dataset = pydicom.dcmread(fp, stop_before_pixels=True)
+            position = fp.tell()
+            size = fp.seek(0, io.SEEK_END)
+
+            def read(offset, length):
+                fp.seek(offset)
+                return fp.read(length)
+
+            image = cls(dataset, source)
+            image.pixels = image._map_pixels(position, size, read)
+        return image
+
+    def _map_pixels(self, position: int, size: int, read):
+        """Zero-copy array over native (uncompressed) Pixel Data, or None to fall back to pydicom."""
+        syntax = self.dataset.file_meta.get("TransferSyntaxUID")
+        ds = self.dataset
+        if syntax is None or syntax.is_compressed or syntax.is_deflated or ds.get("BitsAllocated") not in (8, 16, 32):
+            return None
+
+        little_endian = syntax.is_little_endian
+        header = read(position, 12)
+        group, element = struct.unpack("<HH" if little_endian else ">HH", header[:4])
+        if (group, element) != PIXEL_DATA_TAG:
+            return None
+        if syntax.is_implicit_VR:
+            length, start = struct.unpack("<I" if little_endian else ">I", header[4:8])[0], position + 8
+        else:
+            # Explicit OB/OW: tag(4) VR(2) reserved(2) length(4)
+            length, start = struct.unpack("<I" if little_endian else ">I", header[8:12])[0], position + 12
+        if length == UNDEFINED_LENGTH:
+            return None
+
+        samples = int(ds.get("SamplesPerPixel", 1))
+        bits = int(ds.BitsAllocated)
+        dtype = np.dtype(f"{'<' if little_endian else '>'}{'i' if ds.get('PixelRepresentation', 0) else 'u'}{bits // 8}")
+        count = self.num_frames * self.rows * self.columns * samples
+        if count * dtype.itemsize > min(length, size - start):
+            return None  # Truncated: let pydicom report it
+
+        if samples == 1:
+            shape = (self.num_frames, self.rows, self.columns)
+        elif int(ds.get("PlanarConfiguration", 0)) == 0:
+            shape = (self.num_frames, self.rows, self.columns, samples)
+        else:
+            shape = (self.num_frames, samples, self.rows, self.columns)
+
+        if isinstance(self.source, (bytes, bytearray, memoryview)):
+            return np.frombuffer(self.source, dtype, count, offset=start).reshape(shape)
+        return np.memmap(self.source, dtype, mode="r", offset=start, shape=shape)
+
+    def raw_frame(self, index: int) -> np.ndarray:
+        """Stored values of one frame (a view when uncompressed)."""
+        if not 0 <= index < self.num_frames:
+            raise IndexError(f"Frame {index} out of range ({self.num_frames} frames)")
+        if self.pixels is not None:
+            frame = self.pixels[index]
+            if frame.ndim == 3 and frame.shape[0] != self.rows:  # Planar configuration 1
+                frame = np.moveaxis(frame, 0, -1)
+            return frame
+        source = io.BytesIO(self.source) if isinstance(self.source, (bytes, bytearray, memoryview)) else self.source
+        # Compressed / deflated: decode just this frame (returns RGB for YBR color data)
+        return pixel_array(source, index=index if self.num_frames > 1 else None)
+
+    def frame(self, index: int = 0) -> np.ndarray:
+        """Frame `index` as uint8 in OpenCV layout (gray, or BGR for color files)."""
+        raw = self.raw_frame(index)
+        if raw.ndim == 3:
+            # Color: no VOI windowing, just bring it to 8 bits
+            if raw.dtype != np.uint8:
+                raw = cv2.normalize(raw, None, 0, 255, cv2.NORM_MINMAX, cv2.CV_8U)
+            return cv2.cvtColor(np.ascontiguousarray(raw), cv2.COLOR_RGB2BGR)
+        return self.to_uint8(raw, index)
+
+    def frames(self, start: int = 0, stop: int = None):
+        """Yields frame(i) lazily; only the current frame's pixels are touched."""
+        stop = self.num_frames if stop is None else min(stop, self.num_frames)
+        for index in range(start, stop):
+            yield self.frame(index)
+
+    def to_uint8(self, raw: np.ndarray, index: int = 0) -> np.ndarray:
+        slope, intercept = self._rescale(index)
+        center, width = self._window(index)
+        if center is None:
+            # No VOI window in the file (common for MR): stretch this frame's range
+            low, high = float(raw.min()) * slope + intercept, float(raw.max()) * slope + intercept
+            center, width = (low + high) / 2 + 0.5, max(high - low, 1.0) + 1
+        invert = self.photometric == "MONOCHROME1"
+
+        if raw.dtype.itemsize <= 2:
+            if not raw.dtype.isnative:
+                raw = raw.astype(raw.dtype.newbyteorder("="))
+            # 8/16-bit: one gather through a 256 / 65536 entry table, no float copy of the frame
+            key = (raw.dtype.str, slope, intercept, center, width, invert)
+            lut = self._luts.get(key)
+            if lut is None:
+                if len(self._luts) > 16:
+                    self._luts.clear()
+                unsigned = np.dtype(f"u{raw.dtype.itemsize}")
+                values = np.arange(2 ** (8 * raw.dtype.itemsize), dtype=unsigned).view(raw.dtype)
+                lut = self._luts[key] = window(values, slope, intercept, center, width, invert)
+            return lut[raw.view(np.dtype(f"u{raw.dtype.itemsize}"))]
+        return window(raw, slope, intercept, center, width, invert)
+
+    def _rescale(self, index: int) -> tuple:
+        slope = _frame_attribute(self.dataset, index, "PixelValueTransformationSequence", "RescaleSlope", 1.0)
+        intercept = _frame_attribute(self.dataset, index, "PixelValueTransformationSequence", "RescaleIntercept", 0.0)
+        return float(slope), float(intercept)
+
+    def _window(self, index: int) -> tuple:
+        center = _frame_attribute(self.dataset, index, "FrameVOILUTSequence", "WindowCenter", None)
+        width = _frame_attribute(self.dataset, index, "FrameVOILUTSequence", "WindowWidth", None)
+        if center is None or width is None:
+            return None, None
+        return float(center), float(width)
+
+
+def window(values: np.ndarray, slope: float, intercept: float, center: float, width: float, invert: bool = False) -> np.ndarray:
+    """
+    Modality rescale + linear VOI window (DICOM PS3.3 C.11.2.1.2) to uint8,
+    folded into a single multiply-add per pixel.
+    """
+    span = max(width - 1.0, 1.0)
+    scale = slope * 255.0 / span
+    offset = ((intercept - (center - 0.5)) / span + 0.5) * 255.0
+    if invert:
+        scale, offset = -scale, 255.0 - offset
+    out = values.astype(np.float32)
+    out *= scale
+    out += offset + 0.5  # Round to nearest on the truncating cast below
+    np.clip(out, 0, 255, out=out)
+    return out.astype(np.uint8)
+
+
+def _frame_attribute(dataset, index: int, sequence: str, name: str, default):
+    """Per-frame functional group, then shared functional group, then the top-level attribute."""
+    for groups, item in (("PerFrameFunctionalGroupsSequence", index), ("SharedFunctionalGroupsSequence", 0)):
+        items = dataset.get(groups)
+        if items is not None and item < len(items):
+            macro = items[item].get(sequence)
+            if macro and name in macro[0]:
+                return _first(macro[0][name].value)
+    if name in dataset:
+        return _first(dataset[name].value)
+    return default
+
+
+def _first(value):
+    # Window center/width may be multi-valued; the first pair is the default view
+    if isinstance(value, (list, tuple, pydicom.multival.MultiValue)):
+        return value[0] if len(value) else None
+    return value
@@ -0,0 +1,157 @@
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from backend.core.config import settings
+
+
+class PipelineBusyError(Exception):
+    """Raised when the worker pool and its queue are both full."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Analysis queue is full")
+        self.retry_after = retry_after
+
+
+def _init_process_worker():
+    """
+    Loads and warms the model once per worker process, before its first job.
+    Workers are spawned rather than forked: forking after the parent has run
+    torch ops can deadlock the child on inherited OpenMP / import locks.
+    """
+    from backend.services.lifecycle import model_lifecycle
+    model_lifecycle.wait_ready()
+
+
+def _noop():
+    return None
+
+
+def _timed_call(fn, args, kwargs, submitted_at):
+    """
+    Runs inside the worker. time.monotonic() is system-wide on Linux,
+    so the queue wait is also correct for process pools.
+    """
+    started_at = time.monotonic()
+    result = fn(*args, **kwargs)
+    finished_at = time.monotonic()
+    return result, started_at - submitted_at, finished_at - started_at
+
+
+class PipelineExecutor:
+    """
+    Runs CPU-bound pipeline stages off the event loop on a bounded pool.
+    At most `workers + queue_size` jobs are admitted at once; anything
+    beyond that is rejected immediately with PipelineBusyError, unless the
+    caller asks to wait for a slot (batch requests that already hold a
+    connection open).
+    """
+
+    def __init__(self, kind: str = "thread", workers: int = 2, queue_size: int = 8, retry_after: int = 5):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self.retry_after = retry_after
+        self.capacity = self.workers + self.queue_size
+        self._pool = None
+        self._slots = None  # Created lazily so it binds to the running event loop
+        self._stages = {}
+        self.in_flight = 0
+        self.rejected = 0
+
+    def _get_pool(self):
+        if self._pool is None:
+            if self.kind == "process":
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_process_worker,
+                )
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="analysis")
+        return self._pool
+
+    def prestart(self):
+        """Starts (and, for process pools, warms) every worker before traffic arrives."""
+        pool = self._get_pool()
+        for future in [pool.submit(_noop) for _ in range(self.workers)]:
+            future.result()
+
+    async def run(self, stage: str, fn, *args, wait: bool = False, **kwargs):
+        """
+        Runs fn(*args, **kwargs) on the pool.
+        Returns (result, timing) where timing splits queue wait from compute.
+        With wait=True a full pool delays admission instead of rejecting.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.capacity)
+        if self._slots.locked() and not wait:
+            self.rejected += 1
+            raise PipelineBusyError(self.retry_after)
+
+        async with self._slots:
+            self.in_flight += 1
+            try:
+                loop = asyncio.get_running_loop()
+                submitted_at = time.monotonic()
+                result, queue_wait, compute = await loop.run_in_executor(
+                    self._get_pool(), _timed_call, fn, args, kwargs, submitted_at
+                )
+            finally:
+                self.in_flight -= 1
+
+        self._record(stage, queue_wait, compute)
+        timing = {
+            "queue_wait_ms": round(queue_wait * 1000, 2),
+            "compute_ms": round(compute * 1000, 2),
+        }
+        return result, timing
+
+    def _record(self, stage: str, queue_wait: float, compute: float):
+        entry = self._stages.setdefault(stage, {
+            "count": 0,
+            "queue_wait_total_ms": 0.0,
+            "queue_wait_max_ms": 0.0,
+            "compute_total_ms": 0.0,
+            "compute_max_ms": 0.0,
+        })
+        entry["count"] += 1
+        entry["queue_wait_total_ms"] += queue_wait * 1000
+        entry["queue_wait_max_ms"] = max(entry["queue_wait_max_ms"], queue_wait * 1000)
+        entry["compute_total_ms"] += compute * 1000
+        entry["compute_max_ms"] = max(entry["compute_max_ms"], compute * 1000)
+
+    def stats(self) -> dict:
+        stages = {}
+        for stage, entry in self._stages.items():
+            count = entry["count"]
+            stages[stage] = {
+                "count": count,
+                "queue_wait_avg_ms": round(entry["queue_wait_total_ms"] / count, 2),
+                "queue_wait_max_ms": round(entry["queue_wait_max_ms"], 2),
+                "compute_avg_ms": round(entry["compute_total_ms"] / count, 2),
+                "compute_max_ms": round(entry["compute_max_ms"], 2),
+            }
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+            "stages": stages,
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+pipeline_executor = PipelineExecutor(
+    kind=settings.EXECUTOR_KIND,
+    workers=settings.EXECUTOR_WORKERS,
+    queue_size=settings.EXECUTOR_QUEUE_SIZE,
+    retry_after=settings.EXECUTOR_RETRY_AFTER,
+)
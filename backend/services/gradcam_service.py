@@ -1,6 +1,8 @@
 import cv2
 import numpy as np
-import base64
+from backend.core.config import settings
+from backend.services.atlas import atlas, describe_location
+from backend.services.context import AnalysisContext
 
 # Lazy import flags
 GRADCAM_AVAILABLE = False
@@ -24,104 +26,165 @@ def _try_import_gradcam():
         GRADCAM_AVAILABLE = False
 
 
+def _scale_cam(cam: np.ndarray, size: tuple = None) -> np.ndarray:
+    # Same min-max scaling as pytorch_grad_cam.utils.image.scale_cam_image
+    cam = cam - np.min(cam)
+    cam = cam / (1e-7 + np.max(cam))
+    if size is not None:
+        cam = cv2.resize(np.float32(cam), size)
+    return np.float32(cam)
+
+
+def compute_gradcam(activations: np.ndarray, gradients: np.ndarray, size: tuple = (224, 224)) -> np.ndarray:
+    """
+    GradCAM maps from target-layer activations and gradients, both (N, C, h, w).
+    Mirrors pytorch_grad_cam.GradCAM for a single target layer.
+    Returns (N, H, W) float32 maps scaled to 0-1.
+    """
+    weights = np.mean(gradients, axis=(2, 3))
+    cams = (weights[:, :, None, None] * activations).sum(axis=1)
+    cams = np.maximum(cams, 0)
+    return np.float32([_scale_cam(_scale_cam(cam, size)) for cam in cams])
+
+
+def _colorize_cam(cam: np.ndarray) -> np.ndarray:
+    """
+    Blue(low) -> Cyan -> Green -> Yellow -> Red(high) colormap, vectorized.
+    Bands are evaluated in float64 like the former per-pixel loop (NumPy
+    scalar math), so the float32 result is pixel-identical.
+    """
+    v = cam.astype(np.float64)
+    bands = [v < 0.2, v < 0.4, v < 0.6, v < 0.8]
+    t_cyan = (v - 0.2) / 0.2
+    t_green = (v - 0.4) / 0.2
+    t_orange = (v - 0.6) / 0.2
+    t_red = (v - 0.8) / 0.2
+    
+    red = np.select(bands, [v * 5 * 0.2, 0, t_green, 1], default=1)
+    green = np.select(bands, [v * 5 * 0.2, 0.5 + t_cyan * 0.5, 1, 1 - t_orange * 0.5], default=0.5 - t_red * 0.5)
+    blue = np.select(bands, [v * 5, 1 - t_cyan, 0, 0], default=0)
+    return np.stack([red, green, blue], axis=-1).astype(np.float32)
+
+
+def _colorize_highlight(mask: np.ndarray) -> np.ndarray:
+    """Blue -> Green-Yellow -> Red colormap of the fallback view, vectorized (pixel-identical)."""
+    v = mask.astype(np.float64)
+    bands = [v < 0.3, v < 0.6]
+    t_mid = (v - 0.3) / 0.3
+    t_high = (v - 0.6) / 0.4
+    
+    red = np.select(bands, [0, t_mid], default=1)
+    green = np.select(bands, [0, 1 - t_mid * 0.5], default=0.5 - t_high * 0.5)
+    blue = np.select(bands, [v * 3, 1 - t_mid], default=0)
+    return np.stack([red, green, blue], axis=-1).astype(np.float32)
+
+
+HEATMAP_MEDIA_TYPES = {
+    "png": "image/png",
+    "webp": "image/webp",
+    "jpeg": "image/jpeg",
+}
+
+
+def encode_heatmap(rgb: np.ndarray, fmt: str = None, png_level: int = None, quality: int = None) -> tuple:
+    """
+    Encodes an RGB uint8 overlay. Returns (bytes, media type).
+    png: lossless, png_level 0-9 trades CPU for size.
+    webp / jpeg: lossy, quality 1-100 (webp 101 = lossless).
+    """
+    fmt = (fmt or settings.HEATMAP_FORMAT).lower()
+    png_level = settings.HEATMAP_PNG_LEVEL if png_level is None else png_level
+    quality = settings.HEATMAP_QUALITY if quality is None else quality
+
+    if fmt == "png":
+        ext, params = ".png", [cv2.IMWRITE_PNG_COMPRESSION, png_level]
+    elif fmt == "webp":
+        ext, params = ".webp", [cv2.IMWRITE_WEBP_QUALITY, quality]
+    elif fmt in ("jpeg", "jpg"):
+        fmt, ext, params = "jpeg", ".jpg", [cv2.IMWRITE_JPEG_QUALITY, quality]
+    else:
+        raise ValueError(f"Unknown heatmap format: {fmt}")
+
+    ok, buffer = cv2.imencode(ext, cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR), params)
+    if not ok:
+        raise RuntimeError(f"Heatmap {fmt} encoding failed")
+    return buffer.tobytes(), HEATMAP_MEDIA_TYPES[fmt]
+
+
 class GradCAMService:
     """Generates clear, accurate heatmaps for tumor visualization."""
     
     def __init__(self, model, device):
         self.model = model
         self.device = device
-        self.cam = None
+        self.cam_ready = False
         
         _try_import_gradcam()
         
         if GRADCAM_AVAILABLE and model is not None:
             try:
-                from torchvision import transforms
-                self.transform = transforms.Compose([
-                    transforms.Resize((224, 224)),
-                    transforms.ToTensor(),
-                    transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
-                ])
                 self.target_layer = [model.features[-1]]
-                self.cam = GradCAM(model=model, target_layers=self.target_layer)
+                self.cam_ready = True
                 print("✓ GradCAM visualization ready!")
             except Exception as e:
                 print(f"GradCAM init error: {e}")
-                self.cam = None
-        else:
-            self.transform = None
+                self.cam_ready = False
     
-    def generate_heatmap(self, raw_image: np.ndarray, predicted_class_idx: int) -> dict:
-        """Generates heatmap with clear tumor region visualization."""
-        if GRADCAM_AVAILABLE and self.cam is not None:
-            return self._generate_real_gradcam(raw_image, predicted_class_idx)
+    def generate_heatmap(self, ctx: AnalysisContext, predicted_class_idx: int, input_tensor=None) -> dict:
+        """
+        Generates heatmap with clear tumor region visualization.
+        input_tensor is the request's normalized (3, 224, 224) model input.
+        """
+        if GRADCAM_AVAILABLE and self.cam_ready and input_tensor is not None:
+            return self._generate_real_gradcam(ctx, predicted_class_idx, input_tensor)
         else:
-            return self._generate_enhanced_fallback(raw_image)
+            return self._generate_enhanced_fallback(ctx)
     
-    def _generate_real_gradcam(self, raw_image: np.ndarray, predicted_class_idx: int) -> dict:
-        """Uses actual GradCAM library."""
+    def _generate_real_gradcam(self, ctx: AnalysisContext, predicted_class_idx: int, input_tensor) -> dict:
+        """Uses actual GradCAM library (second forward + backward pass)."""
         try:
-            from PIL import Image
-            
-            if len(raw_image.shape) == 3:
-                rgb_image = cv2.cvtColor(raw_image, cv2.COLOR_BGR2RGB)
-            else:
-                rgb_image = cv2.cvtColor(raw_image, cv2.COLOR_GRAY2RGB)
-            
-            rgb_resized = cv2.resize(rgb_image, (224, 224))
-            rgb_normalized = rgb_resized.astype(np.float32) / 255.0
-            
-            pil_image = Image.fromarray(rgb_resized)
-            input_tensor = self.transform(pil_image).unsqueeze(0).to(self.device)
+            input_tensor = input_tensor.unsqueeze(0).to(self.device)
             
+            # Hooks only live for this call so they never tax the classify pass
             targets = [ClassifierOutputTarget(predicted_class_idx)]
-            grayscale_cam = self.cam(input_tensor=input_tensor, targets=targets)
+            with GradCAM(model=self.model, target_layers=self.target_layer) as cam:
+                grayscale_cam = cam(input_tensor=input_tensor, targets=targets)
             grayscale_cam = grayscale_cam[0, :]
             
-            # Create enhanced colored overlay
-            heatmap_overlay = self._create_enhanced_overlay(rgb_normalized, grayscale_cam)
-            location = self._analyze_location(grayscale_cam)
-            
-            _, buffer = cv2.imencode('.png', cv2.cvtColor(heatmap_overlay, cv2.COLOR_RGB2BGR))
-            heatmap_base64 = base64.b64encode(buffer).decode('utf-8')
-            
-            return {
-                "heatmap": heatmap_base64,
-                "location": location,
-                "intensity": float(grayscale_cam.max()),
-                "success": True
-            }
+            return self._render(ctx, grayscale_cam)
         except Exception as e:
             print(f"GradCAM error: {e}")
-            return self._generate_enhanced_fallback(raw_image)
+            return self._generate_enhanced_fallback(ctx)
+    
+    def render(self, ctx: AnalysisContext, grayscale_cam: np.ndarray) -> dict:
+        """Builds the heatmap response from a CAM computed elsewhere (fused pass)."""
+        try:
+            return self._render(ctx, grayscale_cam)
+        except Exception as e:
+            print(f"GradCAM render error: {e}")
+            return self._generate_enhanced_fallback(ctx)
+    
+    def _render(self, ctx: AnalysisContext, grayscale_cam: np.ndarray) -> dict:
+        # Create enhanced colored overlay
+        heatmap_overlay = self._create_enhanced_overlay(ctx.rgb_224_float, grayscale_cam)
+        location = self._analyze_location(grayscale_cam)
+        
+        # Raw image bytes; base64 (if any) is applied per delivery mode by the API
+        with ctx.timer.stage("heatmap_encode"):
+            heatmap_bytes, media_type = encode_heatmap(heatmap_overlay)
+        
+        return {
+            "heatmap": heatmap_bytes,
+            "media_type": media_type,
+            "location": location,
+            "intensity": float(grayscale_cam.max()),
+            "success": True
+        }
     
     def _create_enhanced_overlay(self, rgb_normalized: np.ndarray, cam: np.ndarray) -> np.ndarray:
         """Creates clear, color-coded overlay with distinct tumor regions."""
         # Create custom colormap: Blue(low) -> Cyan -> Green -> Yellow -> Red(high)
-        heatmap = np.zeros((cam.shape[0], cam.shape[1], 3), dtype=np.float32)
-        
-        for i in range(cam.shape[0]):
-            for j in range(cam.shape[1]):
-                v = cam[i, j]
-                if v < 0.2:
-                    # Blue (very low activation)
-                    heatmap[i, j] = [v * 5 * 0.2, v * 5 * 0.2, v * 5]
-                elif v < 0.4:
-                    # Cyan to Green
-                    t = (v - 0.2) / 0.2
-                    heatmap[i, j] = [0, 0.5 + t * 0.5, 1 - t]
-                elif v < 0.6:
-                    # Green to Yellow
-                    t = (v - 0.4) / 0.2
-                    heatmap[i, j] = [t, 1, 0]
-                elif v < 0.8:
-                    # Yellow to Orange
-                    t = (v - 0.6) / 0.2
-                    heatmap[i, j] = [1, 1 - t * 0.5, 0]
-                else:
-                    # Orange to Red (tumor hotspot)
-                    t = (v - 0.8) / 0.2
-                    heatmap[i, j] = [1, 0.5 - t * 0.5, 0]
+        heatmap = _colorize_cam(cam)
         
         # Blend with original image
         alpha = 0.4 + cam * 0.3  # Higher activation = more visible
@@ -134,33 +197,13 @@ class GradCAMService:
     
     def _analyze_location(self, cam: np.ndarray) -> str:
         """Provides clear, doctor-friendly location description."""
-        h, w = cam.shape
-        
         # Find hotspot
         max_val = cam.max()
         if max_val < 0.3:
             return "Minimal activation detected - scan appears normal"
         
-        # Find center of mass
-        y_idx, x_idx = np.indices((h, w))
-        total = cam.sum()
-        cy = (y_idx * cam).sum() / total
-        cx = (x_idx * cam).sum() / total
-        
-        # Determine region
-        if cy < h * 0.33:
-            vertical = "frontal (superior)"
-        elif cy > h * 0.67:
-            vertical = "occipital (inferior)"
-        else:
-            vertical = "parietal (central)"
-        
-        if cx < w * 0.4:
-            horizontal = "left hemisphere"
-        elif cx > w * 0.6:
-            horizontal = "right hemisphere"
-        else:
-            horizontal = "midline"
+        # Dominant atlas region of the activation mass (same atlas as anatomy.locate_tumor)
+        region = describe_location(atlas.locate(cam))
         
         # Intensity
         if max_val > 0.7:
@@ -170,21 +213,13 @@ class GradCAMService:
         else:
             intensity = "Diffuse"
         
-        return f"{intensity} activation in {vertical} region, {horizontal}"
+        return f"{intensity} activation in {region}"
     
-    def _generate_enhanced_fallback(self, raw_image: np.ndarray) -> dict:
+    def _generate_enhanced_fallback(self, ctx: AnalysisContext) -> dict:
         """Smart fallback that analyzes image intensity for tumor detection."""
         try:
-            # Convert and resize
-            if len(raw_image.shape) == 3:
-                gray = cv2.cvtColor(raw_image, cv2.COLOR_BGR2GRAY)
-                rgb = cv2.cvtColor(raw_image, cv2.COLOR_BGR2RGB)
-            else:
-                gray = raw_image.copy()
-                rgb = cv2.cvtColor(raw_image, cv2.COLOR_GRAY2RGB)
-            
-            gray_resized = cv2.resize(gray, (224, 224))
-            rgb_resized = cv2.resize(rgb, (224, 224))
+            # Shared request views (converted and resized once)
+            gray_resized = ctx.gray_224
             
             # Analyze intensity to find potential tumor regions
             # Brain MRIs: tumors often appear as brighter regions
@@ -203,21 +238,10 @@ class GradCAMService:
             highlight_mask = highlight_mask / (highlight_mask.max() + 1e-8)
             
             # Create heatmap
-            heatmap = np.zeros((224, 224, 3), dtype=np.float32)
-            for i in range(224):
-                for j in range(224):
-                    v = highlight_mask[i, j]
-                    if v < 0.3:
-                        heatmap[i, j] = [0, 0, v * 3]  # Blue
-                    elif v < 0.6:
-                        t = (v - 0.3) / 0.3
-                        heatmap[i, j] = [t, 1 - t * 0.5, 1 - t]  # Green-Yellow
-                    else:
-                        t = (v - 0.6) / 0.4
-                        heatmap[i, j] = [1, 0.5 - t * 0.5, 0]  # Red
+            heatmap = _colorize_highlight(highlight_mask)
             
             # Blend
-            rgb_norm = rgb_resized.astype(np.float32) / 255.0
+            rgb_norm = ctx.rgb_224_float
             alpha = 0.3 + highlight_mask * 0.4
             alpha = np.expand_dims(alpha, axis=2)
             
@@ -225,31 +249,15 @@ class GradCAMService:
             result = (result * 255).clip(0, 255).astype(np.uint8)
             
             # Find location
-            y_idx, x_idx = np.indices((224, 224))
-            total = highlight_mask.sum() + 1e-8
-            cy = (y_idx * highlight_mask).sum() / total
-            cx = (x_idx * highlight_mask).sum() / total
-            
-            if cy < 75:
-                vert = "superior (upper)"
-            elif cy > 150:
-                vert = "inferior (lower)"
-            else:
-                vert = "central"
-            
-            if cx < 90:
-                horiz = "left"
-            elif cx > 134:
-                horiz = "right"
-            else:
-                horiz = "midline"
+            region = describe_location(atlas.locate(highlight_mask))
             
-            _, buffer = cv2.imencode('.png', cv2.cvtColor(result, cv2.COLOR_RGB2BGR))
-            heatmap_base64 = base64.b64encode(buffer).decode('utf-8')
+            with ctx.timer.stage("heatmap_encode"):
+                heatmap_bytes, media_type = encode_heatmap(result)
             
             return {
-                "heatmap": heatmap_base64,
-                "location": f"Detected in {vert} {horiz} region of brain",
+                "heatmap": heatmap_bytes,
+                "media_type": media_type,
+                "location": f"Detected in {region}",
                 "intensity": float(highlight_mask.max()),
                 "success": True
             }
@@ -0,0 +1,122 @@
+import base64
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from backend.core.config import settings
+
+
+def to_base64(data: bytes) -> str:
+    return base64.b64encode(data).decode('utf-8')
+
+
+class HeatmapStore:
+    """
+    Short-lived in-memory store behind GET /api/v1/heatmaps/{id}.
+    IDs are content hashes, so re-delivering the same heatmap (cache hits,
+    retries) reuses one entry. Oldest entries go first once the byte budget
+    is exceeded; expired ones are dropped on access.
+
+    With disk_dir set every entry is also written there (same TTL and byte
+    budget), so processes sharing the directory, e.g. pre-fork workers, can
+    serve each other's heatmaps.
+    """
+
+    def __init__(self, ttl_seconds: float, max_bytes: int, disk_dir: str = ""):
+        self.ttl = ttl_seconds
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()  # id -> (expires_at, media_type, data)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def put(self, data: bytes, media_type: str) -> str:
+        heatmap_id = hashlib.sha256(data).hexdigest()[:32]
+        with self._lock:
+            if heatmap_id in self._entries:
+                self._bytes -= len(self._entries.pop(heatmap_id)[2])
+            self._entries[heatmap_id] = (time.monotonic() + self.ttl, media_type, data)
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, (_, _, old) = self._entries.popitem(last=False)
+                self._bytes -= len(old)
+        if self.disk_dir:
+            self._disk_put(heatmap_id, pickle.dumps((media_type, data), protocol=pickle.HIGHEST_PROTOCOL))
+        return heatmap_id
+
+    def get(self, heatmap_id: str):
+        """Returns (data, media_type) or None when unknown / expired."""
+        with self._lock:
+            entry = self._entries.get(heatmap_id)
+            if entry is None:
+                return self._disk_get(heatmap_id) if self.disk_dir else None
+            expires_at, media_type, data = entry
+            if expires_at < time.monotonic():
+                del self._entries[heatmap_id]
+                self._bytes -= len(data)
+                return None
+            return data, media_type
+
+    # Disk tier
+    def _disk_path(self, heatmap_id: str) -> str:
+        return os.path.join(self.disk_dir, f"{heatmap_id}.pkl")
+
+    def _disk_get(self, heatmap_id: str):
+        if not all(c in "0123456789abcdef" for c in heatmap_id):
+            return None  # IDs come from the URL; never build other paths from them
+        path = self._disk_path(heatmap_id)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                return None
+            with open(path, "rb") as f:
+                media_type, data = pickle.load(f)
+            return data, media_type
+        except (OSError, pickle.PickleError, EOFError, ValueError):
+            return None
+
+    def _disk_put(self, heatmap_id: str, payload: bytes):
+        path = self._disk_path(heatmap_id)
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+            self._trim_disk()
+        except OSError as e:
+            print(f"Heatmap store disk write failed: {e}")
+
+    def _trim_disk(self):
+        files = []
+        for name in os.listdir(self.disk_dir):
+            path = os.path.join(self.disk_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        now = time.time()
+        for mtime, size, path in sorted(files):
+            if total <= self.max_bytes and now - mtime <= self.ttl:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def info(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                    "disk_dir": self.disk_dir or None}
+
+
+heatmap_store = HeatmapStore(
+    ttl_seconds=settings.HEATMAP_TTL_SECONDS,
+    max_bytes=settings.HEATMAP_STORE_MAX_BYTES,
+    disk_dir=settings.HEATMAP_DISK_DIR,
+)
@@ -0,0 +1,74 @@
+import struct
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+JPEG_SOI = b"\xff\xd8"
+DICOM_PREAMBLE = 128
+DICOM_MAGIC = b"DICM"
+
+# Start-of-frame markers carry the dimensions (DHT/JPG/DAC share the range but don't)
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# Markers without a length field
+JPEG_STANDALONE_MARKERS = {0x01} | set(range(0xD0, 0xD9))
+
+
+def is_dicom(data: bytes) -> bool:
+    """DICOM Part 10 file: 128-byte preamble followed by "DICM"."""
+    return data[DICOM_PREAMBLE:DICOM_PREAMBLE + 4] == DICOM_MAGIC
+
+
+def read_image_header(data: bytes):
+    """
+    Format and dimensions from the first bytes of an upload, without decoding.
+    Returns {"format", "width", "height", "channels"} or None if unknown/corrupt.
+    """
+    if not data:
+        return None
+    if data.startswith(PNG_SIGNATURE):
+        return _png_header(data)
+    if data.startswith(JPEG_SOI):
+        return _jpeg_header(data)
+    if data.startswith(b"BM"):
+        return _bmp_header(data)
+    return None
+
+
+def _png_header(data: bytes):
+    # Signature, then IHDR must be the first chunk: length(4) "IHDR" width(4) height(4) depth(1) color type(1)
+    if len(data) < 26 or data[12:16] != b"IHDR":
+        return None
+    width, height = struct.unpack(">II", data[16:24])
+    channels = {0: 1, 2: 3, 3: 3, 4: 2, 6: 4}.get(data[25])
+    return {"format": "png", "width": width, "height": height, "channels": channels}
+
+
+def _jpeg_header(data: bytes):
+    i = 2
+    size = len(data)
+    while i + 4 <= size:
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:  # Fill byte
+            i += 1
+            continue
+        if marker in JPEG_STANDALONE_MARKERS:
+            i += 2
+            continue
+        if marker == 0xD9:  # EOI before any frame
+            return None
+        (length,) = struct.unpack(">H", data[i + 2:i + 4])
+        if marker in JPEG_SOF_MARKERS:
+            if i + 10 > size:
+                return None
+            height, width = struct.unpack(">HH", data[i + 5:i + 9])
+            return {"format": "jpeg", "width": width, "height": height, "channels": data[i + 9]}
+        i += 2 + length
+    return None
+
+
+def _bmp_header(data: bytes):
+    if len(data) < 30:
+        return None
+    width, height = struct.unpack("<ii", data[18:26])
+    (bits,) = struct.unpack("<H", data[28:30])
+    return {"format": "bmp", "width": abs(width), "height": abs(height), "channels": 4 if bits == 32 else 3}
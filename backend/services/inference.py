@@ -1,48 +1,59 @@
 import os
+import hashlib
 import random
+import threading
 import numpy as np
 import torch
-from torchvision import models, transforms
-from PIL import Image
+from torchvision import models
 import torch.nn as nn
-import cv2
-from .gradcam_service import initialize_gradcam
+from backend.core.config import settings
+from .backends import create_backend
+from .batching import BatchScheduler
+from .context import AnalysisContext
+from .preprocessing import BatchPreprocessor, MODEL_TRANSFORM, normalize, resize_for_model
+from .segmentation import ENCODER_TAPS, FINAL_TAP, encode, load_segmentation_head
+from .gradcam_service import initialize_gradcam, compute_gradcam
 
 class InferenceService:
     def __init__(self):
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         self.classes = ["glioma", "meningioma", "notumor", "pituitary"]
         self.model = None
+        self.backend = None
         self.gradcam = None
+        self.seg_head = None
+        self.batcher = None
+        self.cam_batcher = None
+        self.model_version = "demo"
         self.model_path = os.path.join(os.path.dirname(__file__), "../models/classifier_real.pth")
         self.classes_path = os.path.join(os.path.dirname(__file__), "../models/classes.txt")
         
-        # Preprocessing transform (MUST match training exactly)
-        self.transform = transforms.Compose([
-            transforms.Resize((224, 224)),
-            transforms.ToTensor(),
-            transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
-        ])
+        # Training preprocessing (reference); requests use the equivalent vectorized kernels
+        self.transform = MODEL_TRANSFORM
+        self.preprocessor = BatchPreprocessor()
         
         self._load_model()
 
+    def _build_architecture(self) -> nn.Module:
+        # EfficientNet-B0 (matches training)
+        model = models.efficientnet_b0(weights=None)
+        num_ftrs = model.classifier[1].in_features
+        model.classifier = nn.Sequential(
+            nn.Dropout(0.3),
+            nn.Linear(num_ftrs, len(self.classes))
+        )
+        return model
+
     def _load_model(self):
+        if os.path.exists(self.classes_path):
+            with open(self.classes_path, "r") as f:
+                self.classes = f.read().splitlines()
+        
         if os.path.exists(self.model_path):
             try:
-                if os.path.exists(self.classes_path):
-                    with open(self.classes_path, "r") as f:
-                        self.classes = f.read().splitlines()
-                
                 print(f"Loading Model: {self.model_path}")
                 
-                # EfficientNet-B0 (matches training)
-                self.model = models.efficientnet_b0(weights=None)
-                num_ftrs = self.model.classifier[1].in_features
-                self.model.classifier = nn.Sequential(
-                    nn.Dropout(0.3),
-                    nn.Linear(num_ftrs, len(self.classes))
-                )
-                
+                self.model = self._build_architecture()
                 self.model.load_state_dict(torch.load(self.model_path, map_location=self.device))
                 self.model.to(self.device)
                 self.model.eval()
@@ -50,61 +61,210 @@ class InferenceService:
                 # Initialize GradCAM
                 self.gradcam = initialize_gradcam(self.model, self.device)
                 
+                # Segmentation decoder on the same backbone features (when trained)
+                if settings.SEGMENTATION_ENABLED:
+                    self.seg_head = load_segmentation_head(settings.SEGMENTATION_PATH, self.device, self.model_path)
+                
                 print(f"✓ Model loaded! Classes: {self.classes}")
                 print(f"✓ GradCAM initialized!")
             except Exception as e:
                 print(f"Model load failed: {e}")
                 self.model = None
-        else:
+        
+        # Classification backend (eager PyTorch or ONNX Runtime)
+        self.backend = create_backend(settings.MODEL_BACKEND, self.model, self.device, settings)
+        self.model_version = self._fingerprint()
+        # Batches are built in the layout the backend runs in
+        self.preprocessor = BatchPreprocessor(channels_last=getattr(self.backend, "channels_last", False))
+        if self.backend is None:
             print("No model found. Using demo mode.")
+            return
+        
+        # Concurrent requests share one stacked forward pass
+        if settings.BATCH_ENABLED:
+            self.batcher = BatchScheduler(
+                self._classify_batch,
+                max_batch_size=settings.BATCH_MAX_SIZE,
+                max_wait_ms=settings.BATCH_MAX_WAIT_MS,
+                name="classifier-batcher"
+            )
+            if self.backend.supports_cam:
+                self.cam_batcher = BatchScheduler(
+                    self.predict_with_cam,
+                    max_batch_size=settings.BATCH_MAX_SIZE,
+                    max_wait_ms=settings.BATCH_MAX_WAIT_MS,
+                    name="classifier-cam-batcher"
+                )
 
-    def classify_tumor(self, raw_image: np.ndarray) -> dict:
+    def _fingerprint(self) -> str:
         """
-        Classifies tumor from raw image (BGR from OpenCV).
+        Identifies the weights actually being served (part of every result-cache key).
+        Changes whenever an artifact is replaced or the backend / Grad-CAM path changes.
+        """
+        parts = [self.backend.name if self.backend else "demo", f"fused={settings.FUSED_GRADCAM}"]
+        seg_path = settings.SEGMENTATION_PATH if self.seg_head is not None else None
+        for path in (self.model_path, self.classes_path, getattr(self.backend, "path", None), seg_path):
+            if path and os.path.exists(path):
+                stat = os.stat(path)
+                parts.append(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}")
+        return hashlib.sha1("|".join(parts).encode()).hexdigest()[:12]
+
+    def prepare_tensor(self, raw_image: np.ndarray) -> torch.Tensor:
+        """
+        Converts a raw image (BGR from OpenCV) into a normalized (3, 224, 224) tensor.
         Applies EXACT same preprocessing as training.
         """
-        predicted_idx = 0  # Default
+        return self.context_tensor(AnalysisContext.from_image(raw_image))
+
+    def model_input(self, ctx: AnalysisContext) -> torch.Tensor:
+        """
+        The request's image at model resolution (uint8, 3x224x224), resized
+        once from the shared RGB view like the training transform does.
+        Normalization happens when inputs are stacked into a batch.
+        """
+        return ctx.cached("model_input", lambda: resize_for_model(ctx.rgb))
+
+    def context_tensor(self, ctx: AnalysisContext) -> torch.Tensor:
+        """The request's normalized model input as its own tensor (two-pass GradCAM, scripts)."""
+        return ctx.cached("tensor", lambda: normalize(self.model_input(ctx)))
+
+    def predict_batch(self, inputs: list) -> list:
+        """
+        Runs one stacked forward pass over N model inputs (model_input()
+        or context_tensor() tensors).
+        Returns one softmax probability vector per input.
+        """
+        probabilities = self.backend.predict(self.preprocessor.batch(inputs))
+        return list(probabilities)
+
+    @property
+    def shared_mask(self) -> bool:
+        """True when tumor masks come out of the classification pass (fp32 backbone + segmentation head)."""
+        return self.seg_head is not None and self.backend is not None and self.backend.supports_cam
+
+    def _encode(self, batch: torch.Tensor, taps=ENCODER_TAPS) -> tuple:
+        """
+        One backbone pass over a stacked batch: (logits or None, {stage: output}).
+        Runs in the backend's frozen graph when its artifact exports the taps
+        (logits included); otherwise on the eager model, fed a contiguous
+        batch, and the caller applies the classifier head.
+        """
+        if getattr(self.backend, "taps", None):
+            return self.backend.encode(batch)
+        _, outputs = encode(self.model.features, batch.to(self.device).contiguous(), taps)
+        return None, outputs
+
+    def _head(self, features: torch.Tensor) -> torch.Tensor:
+        """Eager pooling + classifier over the final feature map: logits."""
+        return self.model.classifier(torch.flatten(self.model.avgpool(features), 1))
+
+    def predict_with_mask(self, inputs: list) -> list:
+        """
+        Classification + tumor mask for N model inputs from one backbone pass:
+        the classifier head and the segmentation head read the same features.
+        Returns one (probabilities, mask) pair per input.
+        """
+        batch = self.preprocessor.batch(inputs)
+        with torch.no_grad():
+            logits, taps = self._encode(batch)
+            if logits is None:
+                logits = self._head(taps[FINAL_TAP])
+            probabilities = torch.nn.functional.softmax(logits, dim=1).cpu()
+        masks = self.seg_head.masks(taps, (batch.shape[-1], batch.shape[-2]), settings.SEGMENTATION_THRESHOLD)
+        return list(zip(probabilities, masks))
+
+    def _classify_batch(self, inputs: list) -> list:
+        """The classification pass behind classify_context: (probabilities, mask or None) pairs."""
+        if self.shared_mask:
+            return self.predict_with_mask(inputs)
+        return [(probabilities, None) for probabilities in self.predict_batch(inputs)]
+
+    def segment_batch(self, inputs: list) -> list:
+        """Tumor masks only (a backbone pass of its own), for when classification didn't produce them."""
+        batch = self.preprocessor.batch(inputs)
+        with torch.no_grad():
+            _, taps = self._encode(batch)
+        return self.seg_head.masks(taps, (batch.shape[-1], batch.shape[-2]), settings.SEGMENTATION_THRESHOLD)
+
+    def predict_with_cam(self, inputs: list) -> list:
+        """
+        Fused classification + GradCAM (+ tumor mask) for N model inputs.
+        The backbone runs once without autograd (in the backend's frozen
+        graph when it exports the taps); only the eager pooling + classifier
+        head is differentiated w.r.t. the final feature map, which is exactly
+        the gradient GradCAM needs. The segmentation head, when loaded,
+        decodes the same pass.
+        Returns one (probabilities, cam, mask or None) triple per input.
+        """
+        batch = self.preprocessor.batch(inputs)
+        with torch.no_grad():
+            logits, taps = self._encode(batch, ENCODER_TAPS if self.seg_head is not None else (FINAL_TAP,))
+        activations = taps[FINAL_TAP].detach().requires_grad_(True)
+        
+        with torch.enable_grad():
+            outputs = self._head(activations)
+            probabilities = torch.nn.functional.softmax(outputs.detach() if logits is None else logits, dim=1)
+            preds = probabilities.argmax(dim=1, keepdim=True)
+            # Samples are independent in eval mode, so the gradient of the summed
+            # target logits gives every sample its own GradCAM gradient.
+            target = outputs.gather(1, preds).sum()
+            gradients, = torch.autograd.grad(target, activations)
+        
+        size = (batch.shape[-1], batch.shape[-2])
+        cams = compute_gradcam(
+            activations.detach().cpu().numpy(),
+            gradients.cpu().numpy(),
+            size=size
+        )
+        masks = self.seg_head.masks(taps, size, settings.SEGMENTATION_THRESHOLD) if self.seg_head is not None else [None] * len(cams)
+        return list(zip(probabilities.cpu(), cams, masks))
+
+    def _format_prediction(self, probabilities: torch.Tensor) -> dict:
+        confidence, pred = torch.max(probabilities, 0)
+        predicted_idx = pred.item()
+        predicted_class = self.classes[predicted_idx]
+        conf_score = confidence.item()
+        
+        # Determine risk level
+        if predicted_class.lower() == "notumor":
+            risk = "Low"
+        elif predicted_class.lower() == "pituitary":
+            risk = "Medium"
+        else:
+            risk = "High"
         
-        if self.model:
+        # Print for debugging
+        print(f"Prediction: {predicted_class} ({conf_score*100:.1f}%) - Risk: {risk}")
+        
+        return {
+            "type": predicted_class.title(),
+            "confidence": conf_score,
+            "risk": risk,
+            "class_index": predicted_idx
+        }
+
+    def classify_tumor(self, raw_image: np.ndarray) -> dict:
+        """
+        Classifies tumor from raw image (BGR from OpenCV).
+        """
+        return self.classify_context(AnalysisContext.from_image(raw_image))
+
+    def classify_context(self, ctx: AnalysisContext) -> dict:
+        """
+        Classifies the request's image.
+        Concurrent callers are micro-batched when BATCH_ENABLED is set.
+        """
+        if self.backend:
             try:
-                # Convert BGR to RGB
-                if len(raw_image.shape) == 3:
-                    rgb_image = cv2.cvtColor(raw_image, cv2.COLOR_BGR2RGB)
-                else:
-                    rgb_image = cv2.cvtColor(raw_image, cv2.COLOR_GRAY2RGB)
-                
-                # Convert to PIL Image (training uses ImageFolder which returns PIL)
-                pil_image = Image.fromarray(rgb_image)
+                img_tensor = self.model_input(ctx)
                 
-                # Apply EXACT same transform as training
-                img_tensor = self.transform(pil_image).unsqueeze(0).to(self.device)
-                
-                with torch.no_grad():
-                    outputs = self.model(img_tensor)
-                    probabilities = torch.nn.functional.softmax(outputs, dim=1)
-                    confidence, preds = torch.max(probabilities, 1)
-                    
-                    predicted_idx = preds.item()
-                    predicted_class = self.classes[predicted_idx]
-                    conf_score = confidence.item()
-                
-                # Determine risk level
-                if predicted_class.lower() == "notumor":
-                    risk = "Low"
-                elif predicted_class.lower() == "pituitary":
-                    risk = "Medium"
+                if self.batcher is not None:
+                    probabilities, mask = self.batcher.submit(img_tensor)
                 else:
-                    risk = "High"
+                    probabilities, mask = self._classify_batch([img_tensor])[0]
                 
-                # Print for debugging
-                print(f"Prediction: {predicted_class} ({conf_score*100:.1f}%) - Risk: {risk}")
-                
-                return {
-                    "type": predicted_class.title(),
-                    "confidence": conf_score,
-                    "risk": risk,
-                    "class_index": predicted_idx
-                }
+                self._keep_mask(ctx, mask)
+                return self._format_prediction(probabilities)
                 
             except Exception as e:
                 print(f"Inference Error: {e}")
@@ -117,12 +277,73 @@ class InferenceService:
             "class_index": 0
         }
     
-    def generate_visualization(self, raw_image: np.ndarray, class_index: int) -> dict:
+    @property
+    def fused_cam(self) -> bool:
+        """True when GradCAM can come out of the classification pass (predict_with_cam)."""
+        return bool(self.backend and self.backend.supports_cam and self.gradcam
+                    and self.gradcam.cam_ready and settings.FUSED_GRADCAM)
+
+    def classify_with_cam(self, ctx: AnalysisContext) -> tuple:
+        """
+        Classification, plus the raw GradCAM map when the fused single-pass
+        path is available. Returns (classification, cam or None).
+        """
+        with ctx.timer.stage("classify"):
+            if self.fused_cam:
+                try:
+                    img_tensor = self.model_input(ctx)
+                    
+                    if self.cam_batcher is not None:
+                        probabilities, cam, mask = self.cam_batcher.submit(img_tensor)
+                    else:
+                        probabilities, cam, mask = self.predict_with_cam([img_tensor])[0]
+                    
+                    self._keep_mask(ctx, mask)
+                    return self._format_prediction(probabilities), cam
+                    
+                except Exception as e:
+                    print(f"Fused inference error: {e}")
+            
+            return self.classify_context(ctx), None
+
+    def explain(self, ctx: AnalysisContext, classification: dict, cam=None) -> dict:
+        """
+        GradCAM visualization: renders the fused-pass CAM when there is one,
+        otherwise runs the separate GradCAM pass.
+        """
+        with ctx.timer.stage("gradcam"):
+            if cam is not None:
+                return self.gradcam.render(ctx, cam)
+            return self.generate_visualization(ctx, classification.get("class_index", 0))
+
+    def explain_batch(self, ctxs: list, classifications: list) -> list:
+        """
+        GradCAM visualizations for several images: one stacked fused pass
+        when available, otherwise explain() image by image.
+        """
+        cams = [None] * len(ctxs)
+        if self.fused_cam and ctxs:
+            try:
+                cams = [cam for _, cam, _ in self.predict_with_cam([self.model_input(ctx) for ctx in ctxs])]
+            except Exception as e:
+                print(f"Fused GradCAM batch error: {e}")
+        return [self.explain(ctx, classification, cam) for ctx, classification, cam in zip(ctxs, classifications, cams)]
+
+    def classify_and_explain(self, ctx: AnalysisContext) -> tuple:
+        """
+        Classification + GradCAM visualization from a single model pass.
+        Returns (classification, visualization); falls back to the two-pass
+        path when the fused pass is disabled or unavailable.
+        """
+        classification, cam = self.classify_with_cam(ctx)
+        return classification, self.explain(ctx, classification, cam)
+
+    def generate_visualization(self, ctx: AnalysisContext, class_index: int) -> dict:
         """
         Generates GradCAM visualization for the detected tumor.
         """
         if self.gradcam:
-            return self.gradcam.generate_heatmap(raw_image, class_index)
+            return self.gradcam.generate_heatmap(ctx, class_index, self.context_tensor(ctx))
         return {
             "heatmap": None,
             "location": "Visualization unavailable",
@@ -130,9 +351,31 @@ class InferenceService:
             "success": False
         }
 
+    @staticmethod
+    def _keep_mask(ctx: AnalysisContext, mask):
+        if mask is not None:
+            ctx.cached("mask", lambda: mask)
+
+    @property
+    def segmentation_source(self) -> str:
+        return "model" if self.seg_head is not None else "mock"
+
+    def segment_context(self, ctx: AnalysisContext) -> np.ndarray:
+        """
+        Tumor mask (uint8 0/255, 224x224). Reuses the mask decoded from the
+        classification pass when there was one; otherwise runs the
+        segmentation head on its own, or falls back to the mock mask when no
+        head is trained.
+        """
+        def build():
+            if self.seg_head is not None:
+                return self.segment_batch([self.model_input(ctx)])[0]
+            return self.segment_tumor(ctx.rgb_224_float)
+        return ctx.cached("mask", build)
+
     def segment_tumor(self, processed_image: np.ndarray) -> np.ndarray:
         """
-        Mock segmentation - creates dummy mask.
+        Mock segmentation - creates dummy mask (no trained segmentation head).
         """
         mask = np.zeros((224, 224), dtype=np.uint8)
         cx, cy = random.randint(50, 170), random.randint(50, 170)
@@ -142,4 +385,23 @@ class InferenceService:
         mask[mask_area] = 255
         return mask
 
-inference_service = InferenceService()
+_inference_service = None
+_service_lock = threading.Lock()
+
+
+def get_inference_service() -> InferenceService:
+    """Builds the process-wide InferenceService (loads the weights) on first use."""
+    global _inference_service
+    if _inference_service is None:
+        with _service_lock:
+            if _inference_service is None:
+                _inference_service = InferenceService()
+    return _inference_service
+
+
+def __getattr__(name):
+    # `from backend.services.inference import inference_service` keeps working,
+    # but nothing is loaded until the service is actually asked for
+    if name == "inference_service":
+        return get_inference_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,164 @@
+import multiprocessing
+import threading
+import time
+import traceback
+from backend.core.config import settings
+
+
+def _in_worker_process() -> bool:
+    return multiprocessing.parent_process() is not None
+
+
+def configure_torch_threads(threads: int, interop_threads: int):
+    """
+    Applies the CPU thread budget (0 = leave torch's default). The inter-op
+    pool size can only be set before it is first used, so that part is
+    best-effort.
+    """
+    import torch
+
+    if threads > 0:
+        torch.set_num_threads(threads)
+    if interop_threads > 0 and torch.get_num_interop_threads() != interop_threads:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError as e:
+            print(f"⚠️ Could not set torch inter-op threads to {interop_threads}: {e}")
+
+
+class ModelNotReadyError(Exception):
+    """Raised when a request arrives before the model has loaded and warmed up."""
+
+    def __init__(self, state: str, retry_after: int):
+        super().__init__(f"Model is {state}")
+        self.state = state
+        self.retry_after = retry_after
+
+
+class ModelLifecycle:
+    """
+    Loads the model off the startup path so the server binds immediately.
+
+    start() imports torch / torchvision / the pipeline modules, builds the
+    InferenceService and runs a few dummy passes in a background thread.
+    /health only says the process is up; /ready turns green once this is done.
+    """
+
+    def __init__(self, warmup_passes: int = 3, retry_after: int = 5):
+        self.warmup_passes = warmup_passes
+        self.retry_after = retry_after
+        self.state = "cold"  # cold -> loading -> warming -> ready | failed
+        self.error = None
+        self.service = None
+        self.timings = {}
+        self._started_at = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def start(self):
+        if self._thread is None:
+            self._started_at = time.perf_counter()
+            self._thread = threading.Thread(target=self._load, args=(settings.TORCH_THREADS,),
+                                            name="model-loader", daemon=True)
+            self._thread.start()
+
+    def preload(self) -> bool:
+        """
+        Loads and warms up single-threaded in the calling thread (pre-fork
+        parent, see backend.serve): neither a loader thread nor an OpenMP
+        team is left running across fork().
+        """
+        if self._thread is None:
+            self._started_at = time.perf_counter()
+            self._thread = threading.current_thread()
+            self._load(torch_threads=1)
+        return self.ready
+
+    def wait_ready(self, timeout: float = None) -> bool:
+        """Starts loading if needed and blocks until ready (scripts, benchmarks)."""
+        self.start()
+        self._ready.wait(timeout)
+        return self.ready
+
+    def require(self):
+        """The loaded InferenceService, or ModelNotReadyError."""
+        if not self.ready:
+            raise ModelNotReadyError(self.state, self.retry_after)
+        return self.service
+
+    def _mark(self, phase: str, since: float) -> float:
+        now = time.perf_counter()
+        self.timings[f"{phase}_ms"] = round((now - since) * 1000, 2)
+        return now
+
+    def _load(self, torch_threads: int):
+        try:
+            self.state = "loading"
+            start = time.perf_counter()
+            configure_torch_threads(torch_threads, settings.TORCH_INTEROP_THREADS)
+            # Heavy imports (torch, torchvision, cv2) happen here, not at app import
+            from backend.services import inference
+            start = self._mark("import", start)
+
+            service = inference.get_inference_service()
+            from backend.services import pipeline  # noqa: F401 (validator, XAI, anatomy stages)
+            start = self._mark("load", start)
+
+            self.state = "warming"
+            self._warm_up(service)
+            start = self._mark("warmup", start)
+
+            if settings.EXECUTOR_KIND == "process" and not _in_worker_process():
+                # Each spawned worker loads + warms its own copy (see executor._init_process_worker)
+                from backend.services.executor import pipeline_executor
+                pipeline_executor.prestart()
+                self._mark("workers", start)
+
+            self.service = service
+            self.state = "ready"
+            self.timings["time_to_ready_ms"] = round((time.perf_counter() - self._started_at) * 1000, 2)
+            self._ready.set()
+            print(f"✓ Model ready in {self.timings['time_to_ready_ms']:.0f} ms ({self.timings})")
+        except Exception as e:
+            traceback.print_exc()
+            self.state = "failed"
+            self.error = str(e)
+
+    def _warm_up(self, service):
+        """
+        Dummy passes so the first real request doesn't pay for kernel selection,
+        allocator growth and lazy GradCAM setup.
+        """
+        if self.warmup_passes <= 0 or service.backend is None:
+            return
+        import numpy as np
+        from backend.services.context import AnalysisContext
+
+        dummy = np.random.default_rng(0).integers(0, 256, (256, 256, 3), dtype=np.uint8)
+        tensor = service.model_input(AnalysisContext.from_image(dummy))
+        for _ in range(self.warmup_passes):
+            service.classify_and_explain(AnalysisContext.from_image(dummy))
+            # Classification-only path too (a TorchScript backend profiles its first calls)
+            service.predict_batch([tensor])
+        if settings.BATCH_ENABLED and settings.BATCH_MAX_SIZE > 1:
+            # Full-size batch too, so micro-batched shapes are warm as well
+            service.predict_batch([tensor] * settings.BATCH_MAX_SIZE)
+
+    def status(self) -> dict:
+        status = {"status": self.state, "ready": self.ready, "timings": self.timings}
+        if self.service is not None:
+            status["backend"] = self.service.backend.name if self.service.backend else "demo"
+            status["model_version"] = self.service.model_version
+        if self.error:
+            status["error"] = self.error
+        return status
+
+
+model_lifecycle = ModelLifecycle(
+    warmup_passes=settings.WARMUP_PASSES,
+    retry_after=settings.EXECUTOR_RETRY_AFTER,
+)
@@ -0,0 +1,191 @@
+import bisect
+import threading
+
+# Seconds; pipeline stages range from sub-millisecond (anatomy) to seconds (cold GradCAM)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labelnames: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    """
+    Minimal Prometheus metric (no client library needed).
+    Label values are passed as keyword arguments on every update; one lock
+    per metric keeps updates from the worker / batcher threads consistent.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def _header(self) -> list:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted(self._values.items())
+        lines = self._header()
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set_total(self, value: float, **labels):
+        """For totals kept elsewhere (executor, cache) and copied in at scrape time."""
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # Per-bucket (non-cumulative) counts, sum, count
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted((key, (list(entry[0]), entry[1], entry[2])) for key, entry in self._values.items())
+        lines = self._header()
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+REGISTRY = []
+
+# Pipeline (observed per computed request - cache hits don't run stages)
+STAGE_SECONDS = Histogram(
+    "analysis_stage_seconds",
+    "Compute time per pipeline stage (sub-stages such as heatmap_encode overlap their parent stage).",
+    ("stage",),
+)
+QUEUE_WAIT_SECONDS = Histogram("analysis_queue_wait_seconds", "Time a job waited for an executor worker.")
+REQUEST_SECONDS = Histogram("analysis_request_seconds", "End-to-end handler latency per image.", ("endpoint",))
+REQUESTS = Counter("analysis_requests_total", "Analyzed images by endpoint and outcome.", ("endpoint", "outcome"))
+BATCH_SIZE = Histogram(
+    "classifier_batch_size",
+    "Images per micro-batched forward pass.",
+    ("batcher",),
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+UPLOAD_REJECTIONS = Counter(
+    "upload_rejections_total",
+    "Uploads rejected before decoding (body/file size, format sniffing, header dimensions).",
+    ("reason",),
+)
+
+# Copied from their owners at scrape time
+EXECUTOR_IN_FLIGHT = Gauge("analysis_executor_in_flight", "Jobs admitted to the worker pool (running + queued).")
+EXECUTOR_QUEUE_DEPTH = Gauge("analysis_executor_queue_depth", "Admitted jobs waiting for a free worker.")
+EXECUTOR_CAPACITY = Gauge("analysis_executor_capacity", "Maximum admitted jobs (workers + queue).")
+EXECUTOR_REJECTED = Counter("analysis_executor_rejected_total", "Jobs rejected with 503 because the pool was full.")
+CACHE_EVENTS = Counter("result_cache_events_total", "Result cache lookups and maintenance events.", ("event",))
+CACHE_HIT_RATIO = Gauge("result_cache_hit_ratio", "Share of lookups served without running the pipeline.")
+CACHE_BYTES = Gauge("result_cache_bytes", "Bytes held by the in-memory result cache.")
+CACHE_ENTRIES = Gauge("result_cache_entries", "Results held by the in-memory result cache.")
+MODEL_READY = Gauge("model_ready", "1 once the model is loaded and warmed up.")
+MODEL_INFO = Gauge("model_info", "Served classifier backend and model version (value is always 1).", ("backend", "version", "state"))
+
+
+def observe_pipeline(timing: dict, stages: dict):
+    """Records one computed request: executor queue wait + per-stage compute (ms in, seconds out)."""
+    QUEUE_WAIT_SECONDS.observe(timing.get("queue_wait_ms", 0.0) / 1000)
+    for stage, ms in stages.items():
+        STAGE_SECONDS.observe(ms / 1000, stage=stage)
+
+
+def _collect_runtime():
+    # Imported here: these modules are cheap, but metrics must stay importable from all of them
+    from backend.services.executor import pipeline_executor
+    from backend.services.lifecycle import model_lifecycle
+    from backend.services.result_cache import result_cache
+
+    EXECUTOR_IN_FLIGHT.set(pipeline_executor.in_flight)
+    EXECUTOR_QUEUE_DEPTH.set(max(0, pipeline_executor.in_flight - pipeline_executor.workers))
+    EXECUTOR_CAPACITY.set(pipeline_executor.capacity)
+    EXECUTOR_REJECTED.set_total(pipeline_executor.rejected)
+
+    info = result_cache.info()
+    for event in ("hits", "disk_hits", "coalesced", "misses", "evictions", "expirations", "invalidations"):
+        CACHE_EVENTS.set_total(info[event], event=event)
+    CACHE_HIT_RATIO.set(info["hit_rate"])
+    CACHE_BYTES.set(info["bytes"])
+    CACHE_ENTRIES.set(info["entries"])
+
+    status = model_lifecycle.status()
+    MODEL_READY.set(1 if status["ready"] else 0)
+    MODEL_INFO.clear()
+    MODEL_INFO.set(1, backend=status.get("backend", ""), version=status.get("model_version", ""), state=status["status"])
+
+
+def render_metrics() -> str:
+    """Prometheus text exposition format (version 0.0.4)."""
+    _collect_runtime()
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
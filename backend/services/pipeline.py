@@ -0,0 +1,136 @@
+import base64
+import cv2
+import numpy as np
+from backend.services.context import AnalysisContext
+from backend.services.validator import validator
+from backend.services.inference import inference_service
+from backend.services.xai import xai_service
+from backend.services.anatomy import locate_tumor
+
+# GradCAM result used when the client asked for no explanation (explain=false)
+NOT_REQUESTED = {
+    "heatmap": None,
+    "location": "Not requested",
+    "intensity": 0,
+    "success": False
+}
+
+
+def classify_upload(contents: bytes, explain: bool = True, frame: int = None) -> tuple:
+    """
+    Phase 1: everything up to (but not including) rendering the GradCAM overlay.
+    Returns (ctx, partial). partial["cam"] holds the raw CAM when the fused
+    pass produced one; explain_context() turns it into the heatmap later.
+    frame selects the frame of a multi-frame DICOM upload.
+    """
+    ctx = AnalysisContext.from_bytes(contents, frame)
+    timer = ctx.timer
+
+    # 1. Decode + Strict Validation (the fast validator works from the header
+    # and a reduced preview, so rejected uploads are never fully decoded)
+    if validator.mode != "fast":
+        with timer.stage("decode"):
+            ctx.image
+    with timer.stage("validate"):
+        validation = validator.validate_context(ctx)
+    if not validation["valid"]:
+        return ctx, {"status": "invalid", "validation": validation, "stages": timer.timings}
+    with timer.stage("decode"):
+        ctx.image
+
+    # 2. Preprocessing (for display only)
+    with timer.stage("preprocess"):
+        ctx.rgb_224_float
+
+    # 3. Inference (the fused pass also yields the raw GradCAM map)
+    if explain:
+        classification, cam = inference_service.classify_with_cam(ctx)
+    else:
+        with timer.stage("classify"):
+            classification, cam = inference_service.classify_context(ctx), None
+    # Segmentation head output shared with the classification pass when available
+    with timer.stage("segment"):
+        mask = inference_service.segment_context(ctx)
+
+    # 4. Anatomical Localization
+    with timer.stage("anatomy"):
+        location = locate_tumor(mask)
+
+    # 5. XAI Generation (text explanation)
+    with timer.stage("xai"):
+        heatmap = xai_service.generate_heatmap(ctx.image, mask)
+        explanation = xai_service.generate_explanation(classification, location)
+
+    return ctx, {
+        "status": "success",
+        "validation": validation,
+        "classification": classification,
+        "segmentation": segmentation_response(mask, classification),
+        "anatomy": location,
+        "xai": {
+            "heatmap_base64": heatmap,
+            "explanation": explanation
+        },
+        "cam": cam,
+        "stages": timer.timings
+    }
+
+
+def segmentation_response(mask, classification: dict) -> dict:
+    """The "segmentation" block: the predicted mask as a PNG (model head) or the placeholder (mock)."""
+    if inference_service.segmentation_source == "model":
+        ok, png = cv2.imencode(".png", mask)
+        mask_base64 = base64.b64encode(png.tobytes()).decode("ascii") if ok else None
+    else:
+        mask_base64 = "dummy_base64_mask"
+    return {
+        "mask_base64": mask_base64,
+        "source": inference_service.segmentation_source,
+        "area_fraction": round(float(np.count_nonzero(mask)) / mask.size, 4),
+        "has_tumor": classification["type"].lower() != "notumor"
+    }
+
+
+def explain_context(ctx: AnalysisContext, classification: dict, cam=None) -> dict:
+    """Phase 2: GradCAM overlay, PNG + base64 encoding. Returns the response's "gradcam" block."""
+    return gradcam_response(inference_service.explain(ctx, classification, cam))
+
+
+def run_explanation(ctx: AnalysisContext, classification: dict, cam=None) -> tuple:
+    """explain_context() as its own worker job (streamed responses). Returns (gradcam, stages)."""
+    return explain_context(ctx, classification, cam), ctx.timer.timings
+
+
+def gradcam_response(gradcam_result: dict) -> dict:
+    """
+    The "gradcam" block with the raw encoded heatmap. The API turns it into
+    heatmap_base64 or a heatmap URL per request (see endpoints._deliver_gradcam).
+    """
+    return {
+        "heatmap": gradcam_result.get("heatmap"),
+        "heatmap_media_type": gradcam_result.get("media_type"),
+        "tumor_location": gradcam_result.get("location", "Analysis pending"),
+        "intensity": gradcam_result.get("intensity", 0),
+        "available": gradcam_result.get("success", False)
+    }
+
+
+def run_analysis(contents: bytes, explain: bool = True, frame: int = None) -> dict:
+    """
+    Full synchronous analysis of one upload.
+    Runs inside the worker pool, never on the event loop. The upload is
+    decoded and converted once; every stage reads from the same context.
+    explain=False skips GradCAM entirely (no gradient pass, no rendering).
+    """
+    ctx, result = classify_upload(contents, explain, frame)
+    if result["status"] == "invalid":
+        return result
+
+    cam = result.pop("cam")
+    stages = result.pop("stages")
+    if explain:
+        result["gradcam"] = explain_context(ctx, result["classification"], cam)
+    else:
+        result["gradcam"] = gradcam_response(NOT_REQUESTED)
+    result["stages"] = stages
+    return result
@@ -1,9 +1,22 @@
+import threading
 import cv2
 import numpy as np
 from PIL import Image
 import torch
+import torch.nn.functional as F
 from torchvision import transforms
 
+MODEL_INPUT_SIZE = 224
+IMAGENET_MEAN = [0.485, 0.456, 0.406]
+IMAGENET_STD = [0.229, 0.224, 0.225]
+
+# Training / reference preprocessing (PIL path), built once
+MODEL_TRANSFORM = transforms.Compose([
+    transforms.Resize((MODEL_INPUT_SIZE, MODEL_INPUT_SIZE)),
+    transforms.ToTensor(),
+    transforms.Normalize(IMAGENET_MEAN, IMAGENET_STD)
+])
+
 def preprocess_image(image: np.ndarray) -> np.ndarray:
     """
     Preprocesses image EXACTLY as training does.
@@ -27,8 +40,8 @@ def preprocess_image(image: np.ndarray) -> np.ndarray:
 
 def preprocess_for_model(image: np.ndarray, device: torch.device) -> torch.Tensor:
     """
-    Full preprocessing pipeline that matches training exactly.
-    Returns tensor ready for model inference.
+    Full preprocessing pipeline that matches training.
+    Returns a (1, 3, 224, 224) tensor ready for model inference.
     """
     # Ensure RGB
     if len(image.shape) == 3 and image.shape[2] == 3:
@@ -36,15 +49,72 @@ def preprocess_for_model(image: np.ndarray, device: torch.device) -> torch.Tenso
     elif len(image.shape) == 2:
         image = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
     
-    # Convert to PIL for transforms (matches training)
-    pil_image = Image.fromarray(image)
-    
-    # Exact same transforms as training
-    transform = transforms.Compose([
-        transforms.Resize((224, 224)),
-        transforms.ToTensor(),
-        transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
-    ])
-    
-    tensor = transform(pil_image).unsqueeze(0).to(device)
-    return tensor
+    return normalize(resize_for_model(image)).unsqueeze(0).to(device)
+
+
+def reference_tensor(rgb: np.ndarray) -> torch.Tensor:
+    """The torchvision training transform on a PIL image: what the kernels below must reproduce."""
+    return MODEL_TRANSFORM(Image.fromarray(rgb))
+
+
+def resize_for_model(rgb: np.ndarray, size: int = MODEL_INPUT_SIZE) -> torch.Tensor:
+    """
+    uint8 RGB (H, W, 3) -> uint8 (3, size, size) model input.
+    Antialiased bilinear resize with PIL's filter (what transforms.Resize
+    does on PIL images); torch's uint8 kernel rounds in the same fixed
+    point, so pixels differ from PIL by at most 1 level.
+    """
+    image = torch.from_numpy(np.ascontiguousarray(rgb)).permute(2, 0, 1).unsqueeze(0)
+    return F.interpolate(image, size=(size, size), mode="bilinear", antialias=True, align_corners=False)[0]
+
+
+_MEAN = torch.tensor(IMAGENET_MEAN).view(3, 1, 1)
+_STD = torch.tensor(IMAGENET_STD).view(3, 1, 1)
+
+
+def normalize_(tensor: torch.Tensor) -> torch.Tensor:
+    """In place: ToTensor's /255 then Normalize, as the same float32 ops (bit-identical)."""
+    return tensor.div_(255).sub_(_MEAN).div_(_STD)
+
+
+def normalize(image: torch.Tensor) -> torch.Tensor:
+    """uint8 (3, H, W) model input -> new normalized float32 tensor."""
+    return normalize_(image.to(torch.float32))
+
+
+class BatchPreprocessor:
+    """
+    Stacks model inputs into one normalized (N, 3, 224, 224) float32 batch.
+
+    uint8 inputs (resize_for_model) are copied into a preallocated buffer
+    and normalized there in place, three vectorized passes for the whole
+    batch; already-normalized float tensors are copied as they are. Each
+    thread reuses its own buffer, so the returned batch is only valid until
+    that thread's next call.
+    """
+
+    def __init__(self, size: int = MODEL_INPUT_SIZE, channels_last: bool = False):
+        self.size = size
+        self.memory_format = torch.channels_last if channels_last else torch.contiguous_format
+        self._local = threading.local()
+
+    def _buffer(self, n: int) -> torch.Tensor:
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None or buffer.shape[0] < n:
+            buffer = torch.empty((n, 3, self.size, self.size), dtype=torch.float32).contiguous(memory_format=self.memory_format)
+            self._local.buffer = buffer
+        return buffer[:n]
+
+    def batch(self, inputs: list) -> torch.Tensor:
+        batch = self._buffer(len(inputs))
+        raw = []
+        for i, item in enumerate(inputs):
+            batch[i].copy_(item)
+            if item.dtype == torch.uint8:
+                raw.append(i)
+        if len(raw) == len(inputs):
+            normalize_(batch)
+        else:
+            for i in raw:
+                normalize_(batch[i])
+        return batch
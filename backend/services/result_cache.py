@@ -0,0 +1,220 @@
+import asyncio
+import hashlib
+import os
+import pickle
+import time
+from collections import OrderedDict
+from backend.core.config import settings
+
+
+class ResultCache:
+    """
+    Content-addressed cache for /analyze results.
+
+    Keys are sha256(model version + upload bytes). The memory tier is an
+    LRU with a TTL and a byte budget; the optional disk tier keeps pickled
+    results per model version. Identical uploads that arrive while the
+    first one is still being analyzed share its in-flight computation.
+    Only touched from the event loop, so no locking is needed.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float, disk_dir: str = "", disk_max_bytes: int = 0):
+        self.max_bytes = max_bytes
+        self.ttl = ttl_seconds
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.model_version = None
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._inflight = {}
+        self.stats = {
+            "hits": 0,
+            "disk_hits": 0,
+            "coalesced": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+        }
+
+    def key_for(self, contents: bytes, model_version: str, variant: str = "") -> str:
+        """variant separates results of the same upload computed with different options."""
+        # A new model version means old results are stale
+        if model_version != self.model_version:
+            if self.model_version is not None:
+                self.invalidate()
+            self.model_version = model_version
+        digest = hashlib.sha256()
+        digest.update(f"{model_version}|{variant}|".encode())
+        digest.update(contents)
+        return digest.hexdigest()
+
+    # Memory tier
+    def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, size, value = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            self.stats["expirations"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: str, value, size: int = None):
+        if size is None:
+            size = len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl, size, value)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats["evictions"] += 1
+
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    # Disk tier
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, self.model_version or "unversioned", f"{key}.pkl")
+
+    def _disk_get(self, key: str):
+        path = self._disk_path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                return None
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except (OSError, pickle.PickleError, EOFError):
+            return None
+
+    def _disk_put(self, key: str, payload: bytes):
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+            if self.disk_max_bytes:
+                self._trim_disk()
+        except OSError as e:
+            print(f"Result cache disk write failed: {e}")
+
+    def _trim_disk(self):
+        files = []
+        for root, _, names in os.walk(self.disk_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                self.stats["evictions"] += 1
+            except OSError:
+                pass
+
+    async def get_or_compute(self, key: str, compute):
+        """
+        Returns (value, source) where source is "hit", "disk", "coalesced" or "miss".
+        compute is an async callable; its exceptions are not cached and are
+        re-raised to every coalesced waiter.
+        """
+        value = self.get(key)
+        if value is not None:
+            self.stats["hits"] += 1
+            return value, "hit"
+
+        if key in self._inflight:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(self._inflight[key]), "coalesced"
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            if self.disk_dir:
+                value = await asyncio.to_thread(self._disk_get, key)
+                if value is not None:
+                    self.stats["disk_hits"] += 1
+                    self.put(key, value)
+                    future.set_result(value)
+                    return value, "disk"
+
+            self.stats["misses"] += 1
+            value = await compute()
+            future.set_result(value)
+            await self.store(key, value)
+            return value, "miss"
+        except BaseException as e:
+            if not future.done():
+                if isinstance(e, asyncio.CancelledError):
+                    # The owning request went away; don't cancel the others
+                    e = RuntimeError("Analysis was cancelled")
+                future.set_exception(e)
+                future.exception()  # Mark retrieved when nobody else is waiting
+            raise
+        finally:
+            del self._inflight[key]
+
+    def lookup(self, key: str):
+        """get() with hit/miss accounting, for callers that compute results themselves."""
+        value = self.get(key)
+        self.stats["hits" if value is not None else "misses"] += 1
+        return value
+
+    async def store(self, key: str, value):
+        """Adds a result computed outside get_or_compute (e.g. a streamed response)."""
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self.put(key, value, size=len(payload))
+        if self.disk_dir:
+            await asyncio.to_thread(self._disk_put, key, payload)
+
+    def invalidate(self):
+        """Drops every cached result (memory and disk)."""
+        self._entries.clear()
+        self._bytes = 0
+        self.stats["invalidations"] += 1
+        if self.disk_dir and os.path.isdir(self.disk_dir):
+            for root, _, names in os.walk(self.disk_dir):
+                for name in names:
+                    try:
+                        os.remove(os.path.join(root, name))
+                    except OSError:
+                        pass
+
+    def info(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["disk_hits"] + self.stats["coalesced"] + self.stats["misses"]
+        served = lookups - self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hit_rate": round(served / lookups, 4) if lookups else 0.0,
+            "in_flight": len(self._inflight),
+            "model_version": self.model_version,
+            "disk_dir": self.disk_dir or None,
+        }
+
+
+result_cache = ResultCache(
+    max_bytes=settings.CACHE_MAX_BYTES,
+    ttl_seconds=settings.CACHE_TTL_SECONDS,
+    disk_dir=settings.CACHE_DISK_DIR,
+    disk_max_bytes=settings.CACHE_DISK_MAX_BYTES,
+)
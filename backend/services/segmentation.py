@@ -0,0 +1,101 @@
+import os
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from .backends import file_sha1
+
+# EfficientNet-B0 `features` stages the decoder reads: strides 4, 8, 16 and the
+# final 1280-channel map (stride 32) that classification and GradCAM also use
+ENCODER_TAPS = (2, 3, 5, 8)
+FINAL_TAP = ENCODER_TAPS[-1]
+TAP_CHANNELS = (24, 40, 112, 1280)
+
+
+def encode(features: nn.Sequential, batch: torch.Tensor, taps=ENCODER_TAPS) -> tuple:
+    """
+    Runs the backbone once, stage by stage (same computation as
+    features(batch)). Returns (final feature map, {stage index: output}).
+    """
+    outputs = {}
+    x = batch
+    for index, stage in enumerate(features):
+        x = stage(x)
+        if index in taps:
+            outputs[index] = x
+    return x, outputs
+
+
+def _block(in_channels: int, out_channels: int) -> nn.Sequential:
+    # Pointwise mix + depthwise 3x3: a few MACs per pixel at every scale
+    return nn.Sequential(
+        nn.Conv2d(in_channels, out_channels, 1, bias=False),
+        nn.BatchNorm2d(out_channels),
+        nn.ReLU(inplace=True),
+        nn.Conv2d(out_channels, out_channels, 3, padding=1, groups=out_channels, bias=False),
+        nn.BatchNorm2d(out_channels),
+        nn.ReLU(inplace=True),
+    )
+
+
+class SegmentationHead(nn.Module):
+    """
+    Lightweight U-Net style decoder over the classifier's EfficientNet-B0
+    feature maps: starts from the stride-32 map, upsamples x2 three times
+    and merges the stride-16/8/4 skips. Outputs one tumor logit per pixel
+    at stride 4 (56x56 for a 224 input); ~12M MACs against the backbone's
+    ~390M, so a mask costs a small head on top of the classification pass.
+    """
+
+    def __init__(self, decoder_channels=(64, 32, 16)):
+        super().__init__()
+        self.decoder_channels = tuple(decoder_channels)
+        skip_4, skip_8, skip_16, deep = TAP_CHANNELS
+        c16, c8, c4 = decoder_channels
+        self.lateral = _block(deep, c16)
+        self.up16 = _block(c16 + skip_16, c16)
+        self.up8 = _block(c16 + skip_8, c8)
+        self.up4 = _block(c8 + skip_4, c4)
+        self.classifier = nn.Conv2d(c4, 1, 1)
+
+    @staticmethod
+    def _merge(x: torch.Tensor, skip: torch.Tensor) -> torch.Tensor:
+        x = F.interpolate(x, size=skip.shape[-2:], mode="bilinear", align_corners=False)
+        return torch.cat([x, skip], dim=1)
+
+    def forward(self, taps: dict) -> torch.Tensor:
+        x = self.lateral(taps[8])
+        x = self.up16(self._merge(x, taps[5]))
+        x = self.up8(self._merge(x, taps[3]))
+        x = self.up4(self._merge(x, taps[2]))
+        return self.classifier(x)
+
+    def masks(self, taps: dict, size: tuple, threshold: float = 0.5) -> list:
+        """uint8 0/255 masks at `size` (width, height), one per batch item."""
+        with torch.no_grad():
+            logits = F.interpolate(self(taps), size=(size[1], size[0]), mode="bilinear", align_corners=False)
+            probability = torch.sigmoid(logits[:, 0])
+            masks = (probability > threshold).to(torch.uint8).mul_(255)
+        return list(masks.cpu().numpy())
+
+
+def load_segmentation_head(path: str, device: torch.device, encoder_path: str = None):
+    """
+    The trained head from training/train_segmentation.py, or None. A head
+    trained on another classifier checkpoint (different backbone features)
+    is not used.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        checkpoint = torch.load(path, map_location=device)
+        if encoder_path and checkpoint.get("encoder_sha1") not in (None, file_sha1(encoder_path)):
+            print(f"⚠️ {path} was trained on a different classifier checkpoint; retrain it. Using the mock mask.")
+            return None
+        head = SegmentationHead(tuple(checkpoint.get("decoder_channels", (64, 32, 16))))
+        head.load_state_dict(checkpoint["state_dict"])
+        head.to(device).eval()
+        print(f"✓ Segmentation head loaded: {path}")
+        return head
+    except Exception as e:
+        print(f"Segmentation head load failed: {e}")
+        return None
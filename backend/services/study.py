@@ -0,0 +1,158 @@
+import time
+import numpy as np
+from backend.core.config import settings
+from backend.services.context import AnalysisContext
+from backend.services.validator import validator
+from backend.services.inference import get_inference_service
+from backend.services.pipeline import gradcam_response
+from backend.services.uploads import UploadError, screen_image
+
+
+def classify_slices(slices: list) -> tuple:
+    """
+    Validates and classifies a chunk of [(index, filename, contents, frame)]
+    slices with one stacked forward pass (worker job). Returns (entries,
+    forward_ms): one {"index", "filename", "status", ...} entry per slice,
+    with class probabilities for valid slices and the validator's error
+    otherwise.
+    """
+    service = get_inference_service()
+    results, contexts = [], []
+    for index, filename, contents, frame in slices:
+        entry = {"index": index, "filename": filename}
+        results.append(entry)
+        try:
+            screen_image(contents, settings.MIN_IMAGE_SIDE, settings.MAX_IMAGE_SIDE)
+        except UploadError as e:
+            entry.update(status="invalid", error=str(e))
+            continue
+        ctx = AnalysisContext.from_bytes(contents, frame)
+        validation = validator.validate_context(ctx)
+        if not validation["valid"]:
+            entry.update(status="invalid", error=validation["error"])
+        else:
+            contexts.append((entry, ctx))
+
+    if service.backend is not None and contexts:
+        started = time.perf_counter()
+        probabilities = service.predict_batch([service.model_input(ctx) for _, ctx in contexts])
+        forward_ms = (time.perf_counter() - started) * 1000
+        for (entry, _), probs in zip(contexts, probabilities):
+            entry.update(status="success", classification=service._format_prediction(probs),
+                         probabilities=[round(float(p), 6) for p in probs])
+    else:
+        # Demo mode: the fixed demo prediction, spread into a probability vector
+        forward_ms = 0.0
+        for entry, ctx in contexts:
+            classification = service.classify_context(ctx)
+            probs = np.full(len(service.classes), (1 - classification["confidence"]) / max(len(service.classes) - 1, 1))
+            probs[classification["class_index"]] = classification["confidence"]
+            entry.update(status="success", classification=classification, probabilities=probs.round(6).tolist())
+    return results, round(forward_ms, 2)
+
+
+def explain_slices(slices: list, classifications: list) -> list:
+    """
+    GradCAM for the study's top slices only (worker job): one stacked fused
+    pass over [(index, filename, contents, frame)]. Returns the "gradcam"
+    blocks in the same order.
+    """
+    service = get_inference_service()
+    contexts = [AnalysisContext.from_bytes(contents, frame) for _, _, contents, frame in slices]
+    return [gradcam_response(result) for result in service.explain_batch(contexts, classifications)]
+
+
+class StudyAggregator:
+    """
+    Study-level verdict from per-slice class probabilities.
+
+    Each slice's tumor score is 1 - P(notumor); the study score is the mean
+    of the top_k slice scores, so one noisy slice can't flip a study and a
+    small lesion visible on a few slices isn't diluted by the many normal
+    ones. The tumor type is the class with the highest summed probability
+    over those top slices.
+
+    certain(remaining) tells when the unread slices can't change the
+    verdict, so they may be skipped. It assumes the worst: every unread
+    slice scores 1.0 (probabilities are <= 1) with all its mass on one
+    competing class, so it enters the top slices and displaces the lowest
+    ones. The verdict is certain only if it survives that for every class.
+    The study score itself never decreases (a top-k mean), but the tumor
+    type can flip when other-class slices enter the top, so this only
+    happens once few slices remain relative to top_k.
+    """
+
+    def __init__(self, classes: list, top_k: int, threshold: float):
+        self.classes = classes
+        self.top_k = max(1, top_k)
+        self.threshold = threshold
+        lowered = [name.lower() for name in classes]
+        self.normal_index = lowered.index("notumor") if "notumor" in lowered else None
+        self.slices = []  # (tumor_score, index, probabilities, classification)
+
+    def add(self, results: list):
+        for entry in results:
+            if entry["status"] != "success":
+                continue
+            probs = np.asarray(entry["probabilities"], dtype=np.float64)
+            score = 1.0 - probs[self.normal_index] if self.normal_index is not None else float(probs.max())
+            self.slices.append((float(score), entry["index"], probs, entry["classification"]))
+
+    def top(self, slices: list = None) -> list:
+        slices = self.slices if slices is None else slices
+        return sorted(slices, key=lambda item: (-item[0], item[1]))[:self.top_k]
+
+    def score(self, top: list = None) -> float:
+        top = self.top() if top is None else top
+        return float(np.mean([item[0] for item in top])) if top else 0.0
+
+    def _tumor_type(self, top: list):
+        summed = np.sum([item[2] for item in top], axis=0)
+        if self.normal_index is not None:
+            summed[self.normal_index] = -1
+        return int(np.argmax(summed))
+
+    def _class_index(self, top: list):
+        if not top:
+            return None
+        if self.score(top) >= self.threshold or self.normal_index is None:
+            return self._tumor_type(top)
+        return self.normal_index
+
+    def certain(self, remaining: int) -> bool:
+        """True when no `remaining` unread slices could change verdict()."""
+        current = self._class_index(self.top())
+        if remaining <= 0:
+            return True
+        if current is None:
+            return False
+        # Unread slices sort after every read one with the same score
+        after = max((item[1] for item in self.slices), default=-1) + 1
+        for class_index in range(len(self.classes)):
+            if class_index == self.normal_index:
+                continue
+            probs = np.zeros(len(self.classes))
+            probs[class_index] = 1.0
+            unread = [(1.0, after + i, probs, None) for i in range(min(remaining, self.top_k))]
+            if self._class_index(self.top(self.slices + unread)) != current:
+                return False
+        return True
+
+    def verdict(self) -> dict:
+        top = self.top()
+        if not top:
+            return {"type": None, "tumor_score": 0.0, "risk": None, "class_index": None}
+        score = self.score(top)
+        class_index = self._class_index(top)
+        name = self.classes[class_index]
+        if name.lower() == "notumor":
+            risk = "Low"
+        elif name.lower() == "pituitary":
+            risk = "Medium"
+        else:
+            risk = "High"
+        return {"type": name.title(), "tumor_score": round(score, 6), "risk": risk, "class_index": class_index}
+
+    def top_slices(self) -> list:
+        return [{"index": index, "tumor_score": round(score, 6), "classification": classification}
+                for score, index, _, classification in self.top()]
@@ -0,0 +1,171 @@
+import io
+import os
+import zipfile
+from backend.services import metrics
+from backend.services.image_header import read_image_header, is_dicom, PNG_SIGNATURE, JPEG_SOI
+
+ZIP_MAGIC = b"PK\x03\x04"
+SUPPORTED_FORMATS = "PNG, JPEG or DICOM"
+
+
+class UploadError(Exception):
+    """
+    Raised when an upload is rejected before analysis (too large, wrong
+    format, impossible dimensions) or can't be unpacked into images.
+    `reason` labels the upload_rejections_total metric.
+    """
+
+    def __init__(self, message: str, status_code: int = 400, reason: str = "invalid_archive"):
+        super().__init__(message)
+        self.status_code = status_code
+        self.reason = reason
+
+
+def reject(message: str, status_code: int, reason: str) -> UploadError:
+    metrics.UPLOAD_REJECTIONS.inc(reason=reason)
+    return UploadError(message, status_code, reason)
+
+
+def sniff_format(head: bytes):
+    """"png", "jpeg", "dicom", "zip" or None, from the first bytes of an upload."""
+    if head.startswith(PNG_SIGNATURE):
+        return "png"
+    if head.startswith(JPEG_SOI + b"\xff"):
+        return "jpeg"
+    if is_dicom(head):
+        return "dicom"
+    if head.startswith(ZIP_MAGIC):
+        return "zip"
+    return None
+
+
+def dimension_error(width: int, height: int, min_side: int, max_side: int):
+    """The validator's size message for these dimensions, or None if they're acceptable."""
+    if height < min_side or width < min_side:
+        return "Image too small. Please upload a higher resolution scan."
+    if height > max_side or width > max_side:
+        return "Image too large. Please reduce the file size."
+    return None
+
+
+async def read_upload(file, max_bytes: int, chunk_size: int, allow_zip: bool = False, sniff: bool = True) -> bytes:
+    """
+    Reads an UploadFile in chunks, stopping as soon as it exceeds max_bytes
+    and (sniff=True) right after the first chunk if it isn't a supported
+    format. Multi-image requests pass sniff=False: one bad file is reported
+    on its own line by screen_image, not by failing the whole request.
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise reject(f"File too large (max {max_bytes // (1024 * 1024)} MB).", 413, "too_large")
+    chunks = []
+    size = 0
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        if sniff and not chunks:
+            kind = sniff_format(chunk)
+            if kind is None or (kind == "zip" and not allow_zip):
+                raise reject(f"Unsupported file type. Please upload a {SUPPORTED_FORMATS} file.", 415, "unsupported_format")
+        size += len(chunk)
+        if size > max_bytes:
+            raise reject(f"File too large (max {max_bytes // (1024 * 1024)} MB).", 413, "too_large")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def screen_image(contents: bytes, min_side: int, max_side: int):
+    """
+    Header-only checks for one image: raises UploadError for uploads that
+    can't pass validation (unsupported format, unreadable header, dimensions
+    out of range) before any pixel buffer is allocated.
+    """
+    kind = sniff_format(contents)
+    if kind is None or kind == "zip":
+        raise reject(f"Unsupported file type. Please upload a {SUPPORTED_FORMATS} file.", 415, "unsupported_format")
+    if kind == "dicom":
+        return  # Dimensions live in the dataset; checked after parsing
+    header = read_image_header(contents)
+    if header is None:
+        raise reject("Unable to read image. Please upload a valid file.", 400, "unreadable_header")
+    error = dimension_error(header["width"], header["height"], min_side, max_side)
+    if error:
+        raise reject(error, 400, "dimensions")
+
+
+def is_zip(filename: str, contents: bytes) -> bool:
+    return contents.startswith(ZIP_MAGIC) or (filename or "").lower().endswith(".zip")
+
+
+def dicom_frames(filename: str, contents: bytes) -> list:
+    """[(name, contents, frame)] for each frame of a multi-frame DICOM (header only, no pixels read)."""
+    # Imported here: pydicom is only needed for DICOM uploads
+    from backend.services.dicom import DicomImage
+    try:
+        count = DicomImage.open(contents).num_frames
+    except Exception:
+        return [(filename, contents, None)]  # Reported as unreadable by the pipeline
+    if count <= 1:
+        return [(filename, contents, None)]
+    return [(f"{filename}#{index}", contents, index) for index in range(count)]
+
+
+def _megabytes(size: int) -> int:
+    return size // (1024 * 1024)
+
+
+def expand_uploads(files: list, max_images: int, max_entry_bytes: int = None, max_total_bytes: int = None,
+                   max_zip_ratio: float = None) -> list:
+    """
+    Flattens [(filename, bytes)] uploads into [(filename, bytes, frame)] images,
+    unpacking zip archives in place (directories and macOS metadata skipped)
+    and multi-frame DICOM files into one entry per frame (frame is None otherwise).
+    Refused before anything is decompressed: images (and zip entries) over
+    max_entry_bytes, more than max_total_bytes of images in all, and zip
+    entries that expand more than max_zip_ratio times.
+    """
+    images = []
+    total = 0
+
+    def count(name: str, size: int):
+        nonlocal total
+        if max_entry_bytes is not None and size > max_entry_bytes:
+            raise reject(f"{name} is too large (max {_megabytes(max_entry_bytes)} MB).", 413, "too_large")
+        total += size
+        if max_total_bytes is not None and total > max_total_bytes:
+            raise reject(f"Images too large in total (max {_megabytes(max_total_bytes)} MB once unpacked).",
+                         413, "too_large")
+
+    for filename, contents in files:
+        if not is_zip(filename, contents):
+            count(filename, len(contents))
+            if is_dicom(contents):
+                images.extend(dicom_frames(filename, contents))
+            else:
+                images.append((filename, contents, None))
+        else:
+            try:
+                with zipfile.ZipFile(io.BytesIO(contents)) as archive:
+                    for info in archive.infolist():
+                        name = info.filename
+                        if info.is_dir() or name.startswith("__MACOSX/") or os.path.basename(name).startswith("."):
+                            continue
+                        if len(images) >= max_images:
+                            raise UploadError(f"Too many images (max {max_images})")
+                        count(f"{filename}/{name}", info.file_size)
+                        if max_zip_ratio is not None and info.file_size > max_zip_ratio * max(info.compress_size, 1):
+                            raise reject(f"{filename}/{name} is compressed suspiciously well "
+                                         f"(over {max_zip_ratio:g}x).", 413, "compression_ratio")
+                        # zipfile stops at the declared size and checks the CRC, so the
+                        # checks above bound what is actually decompressed
+                        entry = archive.read(info)
+                        if is_dicom(entry):
+                            images.extend(dicom_frames(f"{filename}/{name}", entry))
+                        else:
+                            images.append((f"{filename}/{name}", entry, None))
+            except zipfile.BadZipFile:
+                raise UploadError(f"{filename} is not a valid zip archive")
+
+        if len(images) > max_images:
+            raise UploadError(f"Too many images (max {max_images})")
+    return images
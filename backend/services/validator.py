@@ -1,6 +1,9 @@
 import cv2
 import numpy as np
 import logging
+from backend.core.config import settings
+from backend.services.context import AnalysisContext
+from backend.services.uploads import dimension_error
 
 logger = logging.getLogger(__name__)
 
@@ -9,114 +12,162 @@ class MRIValidator:
     Brain MRI Validator with user-friendly error messages.
     """
     
-    def __init__(self):
-        self.min_size = 100
-        self.max_size = 4000
+    def __init__(self, mode: str = "full"):
+        self.min_size = settings.MIN_IMAGE_SIDE
+        self.max_size = settings.MAX_IMAGE_SIDE
+        # "full": checks on the full-resolution decode; "fast": header + reduced preview
+        self.mode = mode
+        self.preview_size = 256
     
     def validate(self, image_bytes: bytes) -> dict:
         """
         Validates if the input image is a valid brain MRI.
         Returns simple, doctor-friendly messages.
         """
+        return self.validate_context(AnalysisContext.from_bytes(image_bytes))
+    
+    def validate_context(self, ctx: AnalysisContext) -> dict:
+        """
+        Same checks as validate(), reading the decoded image and gray view
+        from the request context so later stages can reuse them.
+        """
+        if self.mode == "fast":
+            return self._validate_fast(ctx)
+        return self._validate_full(ctx)
+
+    def _validate_full(self, ctx: AnalysisContext) -> dict:
         try:
-            # Decode image
-            nparr = np.frombuffer(image_bytes, np.uint8)
-            img = cv2.imdecode(nparr, cv2.IMREAD_UNCHANGED)
+            # Decode image (once per request)
+            img = ctx.image
             
             if img is None:
                 return {"valid": False, "error": "Unable to read image. Please upload a valid file."}
             
             h, w = img.shape[:2]
-            
-            # Size check
-            if h < self.min_size or w < self.min_size:
-                return {"valid": False, "error": "Image too small. Please upload a higher resolution scan."}
-            if h > self.max_size or w > self.max_size:
-                return {"valid": False, "error": "Image too large. Please reduce the file size."}
+            size_error = self._check_size(h, w)
+            if size_error:
+                return size_error
 
             # Grayscale check
-            if len(img.shape) == 3:
-                b, g, r = cv2.split(img)
-                diff_rg = np.mean(np.abs(r.astype("float") - g.astype("float")))
-                diff_gb = np.mean(np.abs(g.astype("float") - b.astype("float")))
+            if len(img.shape) == 3 and self._is_color(img):
+                return {"valid": False, "error": "Please upload a valid brain MRI scan."}
                 
-                if diff_rg > 8.0 or diff_gb > 8.0:
+            gray = ctx.gray
+            
+            return self._check_content(cv2.resize(gray, (200, 200)))
+            
+        except Exception as e:
+            logger.error(f"Validation error: {e}")
+            return {"valid": False, "error": "Could not process image. Please try another file."}
+
+    def _validate_fast(self, ctx: AnalysisContext) -> dict:
+        """
+        Same checks without a full-resolution decode: dimensions come from
+        the file header (oversized or tiny uploads are rejected before any
+        decoding) and the color/content heuristics run on ctx.preview().
+        Unknown formats fall back to the full path.
+        """
+        header = ctx.header
+        if header is None:
+            return self._validate_full(ctx)
+        try:
+            size_error = self._check_size(header["height"], header["width"])
+            if size_error:
+                return size_error
+
+            img = ctx.preview(self.preview_size)
+            if img is None:
+                return {"valid": False, "error": "Unable to read image. Please upload a valid file."}
+
+            if len(img.shape) == 3:
+                if self._is_color(img):
                     return {"valid": False, "error": "Please upload a valid brain MRI scan."}
-                
                 gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
             else:
-                gray = img.copy()
-            
-            gray_resized = cv2.resize(gray, (200, 200))
-            
-            # Background analysis
-            edge_thickness = 20
-            top = gray_resized[:edge_thickness, :].mean()
-            bottom = gray_resized[-edge_thickness:, :].mean()
-            left = gray_resized[:, :edge_thickness].mean()
-            right = gray_resized[:, -edge_thickness:].mean()
-            edge_mean = (top + bottom + left + right) / 4
-            center = gray_resized[50:150, 50:150].mean()
-            
-            if edge_mean > 80:
-                return {"valid": False, "error": "Not a valid brain MRI. Please upload an actual MRI scan."}
-            
-            if center < 30:
-                return {"valid": False, "error": "Image too dark. Please upload a clear brain MRI."}
-            
-            # Brain content check
-            hist = cv2.calcHist([gray_resized], [0], None, [256], [0, 256]).flatten()
-            mid_range = hist[40:180].sum() / hist.sum()
-            
-            if mid_range < 0.25:
-                return {"valid": False, "error": "No brain tissue visible. Please upload a valid MRI scan."}
-            
-            # Texture check
-            blurred = cv2.GaussianBlur(gray_resized, (5, 5), 0)
-            laplacian = cv2.Laplacian(blurred, cv2.CV_64F)
-            variance = laplacian.var()
-            
-            if variance < 50:
-                return {"valid": False, "error": "Image lacks detail. Please upload a clear MRI scan."}
-            
-            # Brain shape detection
-            _, thresh = cv2.threshold(gray_resized, 30, 255, cv2.THRESH_BINARY)
-            contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            has_brain_shape = False
-            for contour in contours:
-                if cv2.contourArea(contour) > 5000:
-                    perimeter = cv2.arcLength(contour, True)
-                    if perimeter > 0:
-                        circularity = 4 * np.pi * cv2.contourArea(contour) / (perimeter ** 2)
-                        if 0.3 < circularity < 1.2:
-                            has_brain_shape = True
-                            break
-            
-            if not has_brain_shape:
-                return {"valid": False, "error": "No brain structure found. Please upload a brain MRI image."}
-            
-            # Intensity check
-            std_dev = gray_resized.std()
-            if std_dev < 15:
-                return {"valid": False, "error": "Image appears blank. Please upload a valid brain MRI."}
-            if std_dev > 100:
-                return {"valid": False, "error": "Image quality too low. Please upload a clearer scan."}
-            
-            return {
-                "valid": True, 
-                "message": "Valid brain MRI detected",
-                "metadata": {
-                    "edge_intensity": float(edge_mean),
-                    "center_intensity": float(center),
-                    "variance": float(variance),
-                    "mid_range_ratio": float(mid_range),
-                    "std_dev": float(std_dev)
-                }
-            }
-            
+                gray = img
+
+            return self._check_content(cv2.resize(gray, (200, 200)))
+
         except Exception as e:
             logger.error(f"Validation error: {e}")
             return {"valid": False, "error": "Could not process image. Please try another file."}
 
-validator = MRIValidator()
+    def _check_size(self, h: int, w: int):
+        error = dimension_error(w, h, self.min_size, self.max_size)
+        return {"valid": False, "error": error} if error else None
+
+    def _is_color(self, img: np.ndarray) -> bool:
+        b, g, r = cv2.split(img)
+        diff_rg = np.mean(np.abs(r.astype("float") - g.astype("float")))
+        diff_gb = np.mean(np.abs(g.astype("float") - b.astype("float")))
+        return diff_rg > 8.0 or diff_gb > 8.0
+
+    def _check_content(self, gray_resized: np.ndarray) -> dict:
+        """Background, tissue, texture, shape and intensity checks on the 200x200 gray image."""
+        # Background analysis
+        edge_thickness = 20
+        top = gray_resized[:edge_thickness, :].mean()
+        bottom = gray_resized[-edge_thickness:, :].mean()
+        left = gray_resized[:, :edge_thickness].mean()
+        right = gray_resized[:, -edge_thickness:].mean()
+        edge_mean = (top + bottom + left + right) / 4
+        center = gray_resized[50:150, 50:150].mean()
+        
+        if edge_mean > 80:
+            return {"valid": False, "error": "Not a valid brain MRI. Please upload an actual MRI scan."}
+        
+        if center < 30:
+            return {"valid": False, "error": "Image too dark. Please upload a clear brain MRI."}
+        
+        # Brain content check
+        hist = cv2.calcHist([gray_resized], [0], None, [256], [0, 256]).flatten()
+        mid_range = hist[40:180].sum() / hist.sum()
+        
+        if mid_range < 0.25:
+            return {"valid": False, "error": "No brain tissue visible. Please upload a valid MRI scan."}
+        
+        # Texture check
+        blurred = cv2.GaussianBlur(gray_resized, (5, 5), 0)
+        laplacian = cv2.Laplacian(blurred, cv2.CV_64F)
+        variance = laplacian.var()
+        
+        if variance < 50:
+            return {"valid": False, "error": "Image lacks detail. Please upload a clear MRI scan."}
+        
+        # Brain shape detection
+        _, thresh = cv2.threshold(gray_resized, 30, 255, cv2.THRESH_BINARY)
+        contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        
+        has_brain_shape = False
+        for contour in contours:
+            if cv2.contourArea(contour) > 5000:
+                perimeter = cv2.arcLength(contour, True)
+                if perimeter > 0:
+                    circularity = 4 * np.pi * cv2.contourArea(contour) / (perimeter ** 2)
+                    if 0.3 < circularity < 1.2:
+                        has_brain_shape = True
+                        break
+        
+        if not has_brain_shape:
+            return {"valid": False, "error": "No brain structure found. Please upload a brain MRI image."}
+        
+        # Intensity check
+        std_dev = gray_resized.std()
+        if std_dev < 15:
+            return {"valid": False, "error": "Image appears blank. Please upload a valid brain MRI."}
+        if std_dev > 100:
+            return {"valid": False, "error": "Image quality too low. Please upload a clearer scan."}
+        
+        return {
+            "valid": True, 
+            "message": "Valid brain MRI detected",
+            "metadata": {
+                "edge_intensity": float(edge_mean),
+                "center_intensity": float(center),
+                "variance": float(variance),
+                "mid_range_ratio": float(mid_range),
+                "std_dev": float(std_dev)
+            }
+        }
+
+validator = MRIValidator(mode=settings.VALIDATOR_MODE)
@@ -0,0 +1,22 @@
+from backend.services.heatmaps import HeatmapStore
+
+
+def test_stores_sharing_a_disk_dir_serve_each_others_heatmaps(tmp_path):
+    # Two pre-fork workers: the GET can land on the one that didn't render it
+    first = HeatmapStore(ttl_seconds=60, max_bytes=1024, disk_dir=str(tmp_path))
+    second = HeatmapStore(ttl_seconds=60, max_bytes=1024, disk_dir=str(tmp_path))
+    heatmap_id = first.put(b"png bytes", "image/png")
+    assert second.get(heatmap_id) == (b"png bytes", "image/png")
+    assert second.get("../" + heatmap_id) is None
+
+
+def test_disk_tier_honours_ttl_and_byte_budget(tmp_path):
+    store = HeatmapStore(ttl_seconds=0, max_bytes=1024, disk_dir=str(tmp_path))
+    expired = store.put(b"old", "image/png")
+    store._entries.clear()
+    assert store.get(expired) is None
+
+    store = HeatmapStore(ttl_seconds=60, max_bytes=300, disk_dir=str(tmp_path))
+    for index in range(10):
+        store.put(bytes([index]) * 100, "image/png")
+    assert sum(path.stat().st_size for path in tmp_path.iterdir()) <= 300
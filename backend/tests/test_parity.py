@@ -0,0 +1,86 @@
+"""
+Parity, tolerance and budget gates behind the benchmark scripts, with small
+inputs. Uses the trained checkpoint when present, otherwise randomly
+initialized weights (same architecture, same code paths).
+"""
+
+import cv2
+import pytest
+import torch
+from backend.benchmarks import bench_preprocess, check_fused_gradcam, check_segmentation_budget
+from backend.benchmarks.common import ensure_model, synthetic_mri
+from backend.services import gradcam_service
+from backend.services.backends import FrozenTorchBackend
+from backend.services.inference import get_inference_service
+from backend.services.preprocessing import BatchPreprocessor, resize_for_model
+from backend.services.segmentation import ENCODER_TAPS, SegmentationHead, encode
+from backend.training.export_torchscript import export_torchscript
+
+
+@pytest.fixture(scope="module")
+def service():
+    return ensure_model(get_inference_service())
+
+
+@pytest.fixture(scope="module")
+def inputs():
+    return [resize_for_model(cv2.cvtColor(synthetic_mri(256, seed), cv2.COLOR_BGR2RGB)) for seed in range(4)]
+
+
+def test_preprocess_kernel_matches_torchvision_reference():
+    parity = bench_preprocess.check_parity(BatchPreprocessor(), count=10)
+    assert parity["max_abs_diff_levels"] <= 1.0001
+    assert parity["mismatch_fraction"] <= 0.01
+    assert parity["passed"]
+
+
+def test_channels_last_preprocess_matches_contiguous():
+    images = bench_preprocess._parity_images(8)
+    contiguous = bench_preprocess._kernel_batch(BatchPreprocessor(), images).clone()
+    channels_last = bench_preprocess._kernel_batch(BatchPreprocessor(channels_last=True), images)
+    assert torch.equal(contiguous, channels_last)
+
+
+def test_fused_gradcam_matches_two_pass(service):
+    gradcam_service._try_import_gradcam()
+    if not gradcam_service.GRADCAM_AVAILABLE:
+        pytest.skip("pytorch-grad-cam is not installed")
+    results = check_fused_gradcam.compare(service, images=2, prob_atol=1e-5, cam_atol=1e-3)
+    for row in results["images"]:
+        assert row["same_class"]
+        assert row["prob_err"] <= 1e-5
+        assert row["cam_err"] <= 1e-3
+    assert results["passed"]
+
+
+def test_torchscript_export_matches_eager(service, inputs, tmp_path):
+    path = str(tmp_path / "classifier_ts.pt")
+    metadata = export_torchscript(service.model, path, optimize="off", atol=1e-4)
+    assert metadata["max_abs_prob_diff"] <= 1e-4
+    assert metadata["batch_norms_left"] == 0
+    assert tuple(metadata["taps"]) == ENCODER_TAPS
+
+    backend = FrozenTorchBackend(path)
+    batch = BatchPreprocessor().batch(inputs)
+    with torch.no_grad():
+        features, taps = encode(service.model.features, batch)
+        reference = torch.softmax(service.model.classifier(torch.flatten(service.model.avgpool(features), 1)), dim=1)
+    assert torch.allclose(backend.predict(batch), reference, atol=1e-4)
+
+    logits, frozen_taps = backend.encode(batch)
+    assert torch.allclose(torch.softmax(logits, dim=1), reference, atol=1e-4)
+    for tap in ENCODER_TAPS:
+        assert frozen_taps[tap].is_contiguous()
+        assert torch.allclose(frozen_taps[tap], taps[tap], atol=1e-3, rtol=1e-3)
+
+
+def test_segmentation_encoder_reproduces_features(service, inputs):
+    assert check_segmentation_budget.encoder_error(service, inputs[:2]) == 0
+
+
+def test_segmentation_head_within_budget(service, inputs):
+    head = service.seg_head or SegmentationHead().to(service.device).eval()
+    results = check_segmentation_budget.measure(service, head, inputs, [4], budget_ms=15.0, budget_fraction=0.25,
+                                                repeat=5)
+    assert results[4]["head_ms_per_image"] <= 15.0
+    assert results[4]["head_fraction"] <= 0.25
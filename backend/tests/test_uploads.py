@@ -0,0 +1,44 @@
+import io
+import zipfile
+import pytest
+from backend.services.uploads import UploadError, expand_uploads
+
+MB = 1024 * 1024
+
+
+def _zip(entries: dict, compression=zipfile.ZIP_DEFLATED) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression) as archive:
+        for name, data in entries.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def test_zip_entries_and_plain_files_are_flattened():
+    archive = _zip({"a.png": b"a" * 10, "__MACOSX/._a.png": b"x", "dir/b.png": b"b" * 10}, zipfile.ZIP_STORED)
+    images = expand_uploads([("scan.png", b"c" * 10), ("study.zip", archive)], max_images=8, max_entry_bytes=MB,
+                            max_total_bytes=MB, max_zip_ratio=100)
+    assert [name for name, _, _ in images] == ["scan.png", "study.zip/a.png", "study.zip/dir/b.png"]
+
+
+def test_decompressed_total_is_capped():
+    # 8 x 3 MB of zeros compress to a few KB: fine per entry, too much in total
+    archive = _zip({f"{i}.png": bytes(3 * MB) for i in range(8)})
+    assert len(archive) < 1 * MB
+    with pytest.raises(UploadError) as error:
+        expand_uploads([("bomb.zip", archive)], max_images=64, max_entry_bytes=32 * MB, max_total_bytes=16 * MB)
+    assert (error.value.status_code, error.value.reason) == (413, "too_large")
+
+
+def test_total_counts_plain_files_too():
+    archive = _zip({"a.png": bytes(MB)}, zipfile.ZIP_STORED)
+    with pytest.raises(UploadError) as error:
+        expand_uploads([("big.png", bytes(MB)), ("more.zip", archive)], max_images=8, max_total_bytes=MB + MB // 2)
+    assert error.value.reason == "too_large"
+
+
+def test_absurd_compression_ratio_is_rejected():
+    archive = _zip({"zeros.png": bytes(4 * MB)})
+    with pytest.raises(UploadError) as error:
+        expand_uploads([("bomb.zip", archive)], max_images=8, max_entry_bytes=32 * MB, max_zip_ratio=100)
+    assert (error.value.status_code, error.value.reason) == (413, "compression_ratio")
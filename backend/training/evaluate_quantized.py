@@ -0,0 +1,118 @@
+"""
+INT8 vs. fp32 accuracy-parity harness (shipping gate)
+=======================================================
+Runs the fp32 classifier_real.pth and the INT8 artifact over the Testing
+split and compares top-1 agreement and per-class accuracy. Exits non-zero
+when agreement is below --min-agreement or any class loses more than
+--max-class-drop accuracy, so it can block a release.
+
+Run from the repository root:
+    python -m backend.training.evaluate_quantized --data-dir "/data/Brain MRI"
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import torch
+from torch.utils.data import DataLoader
+from torchvision import datasets
+from backend.core.config import settings
+from backend.training.quantize import QUANTIZED_ENGINE, load_fp32_model
+from backend.training.train import BATCH_SIZE, DATA_DIR, INPUT_SIZE, get_data_transforms
+
+
+def evaluate(fp32_model, int8_model, loader: DataLoader, class_names: list) -> dict:
+    agree = 0
+    total = 0
+    correct = {"fp32": [0] * len(class_names), "int8": [0] * len(class_names)}
+    per_class_total = [0] * len(class_names)
+    elapsed = {"fp32": 0.0, "int8": 0.0}
+
+    with torch.no_grad():
+        for inputs, labels in loader:
+            start = time.perf_counter()
+            fp32_preds = fp32_model(inputs).argmax(1)
+            elapsed["fp32"] += time.perf_counter() - start
+
+            start = time.perf_counter()
+            int8_preds = int8_model(inputs).argmax(1)
+            elapsed["int8"] += time.perf_counter() - start
+
+            agree += (fp32_preds == int8_preds).sum().item()
+            total += len(labels)
+            for i, label in enumerate(labels.tolist()):
+                per_class_total[label] += 1
+                correct["fp32"][label] += int(fp32_preds[i] == label)
+                correct["int8"][label] += int(int8_preds[i] == label)
+
+    per_class = {}
+    for idx, name in enumerate(class_names):
+        count = max(per_class_total[idx], 1)
+        per_class[name] = {
+            "fp32": correct["fp32"][idx] / count,
+            "int8": correct["int8"][idx] / count,
+            "count": per_class_total[idx],
+        }
+
+    return {
+        "images": total,
+        "top1_agreement": agree / max(total, 1),
+        "accuracy": {k: sum(v) / max(total, 1) for k, v in correct.items()},
+        "per_class": per_class,
+        "ms_per_image": {k: v * 1000 / max(total, 1) for k, v in elapsed.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="INT8 accuracy-parity gate")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--int8-path", default=settings.QUANTIZED_PATH)
+    parser.add_argument("--min-agreement", type=float, default=0.99)
+    parser.add_argument("--max-class-drop", type=float, default=0.01)
+    parser.add_argument("--report", help="Optional JSON report path")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.int8_path):
+        print(f"✗ INT8 model not found at {args.int8_path}. Run backend.training.quantize first.")
+        return 1
+
+    torch.backends.quantized.engine = QUANTIZED_ENGINE
+    fp32_model = load_fp32_model()
+    int8_model = torch.jit.load(args.int8_path, map_location="cpu").eval()
+
+    dataset = datasets.ImageFolder(os.path.join(args.data_dir, "Testing"), get_data_transforms(INPUT_SIZE)["Testing"])
+    loader = DataLoader(dataset, batch_size=BATCH_SIZE, shuffle=False, num_workers=0)
+    report = evaluate(fp32_model, int8_model, loader, dataset.classes)
+
+    print(f'\n{"="*40}')
+    print(f'Top-1 agreement: {report["top1_agreement"]*100:.2f}%  ({report["images"]} images)')
+    print(f'Accuracy fp32: {report["accuracy"]["fp32"]*100:.2f}% | int8: {report["accuracy"]["int8"]*100:.2f}%')
+    print(f'Latency fp32: {report["ms_per_image"]["fp32"]:.1f} ms/img | int8: {report["ms_per_image"]["int8"]:.1f} ms/img')
+    print(f'{"="*40}')
+
+    failures = []
+    if report["top1_agreement"] < args.min_agreement:
+        failures.append(f"top-1 agreement {report['top1_agreement']:.4f} < {args.min_agreement}")
+    for name, row in report["per_class"].items():
+        drop = row["fp32"] - row["int8"]
+        print(f'  {name}: fp32 {row["fp32"]*100:.1f}% | int8 {row["int8"]*100:.1f}% (Δ {(row["int8"] - row["fp32"])*100:+.1f})')
+        if drop > args.max_class_drop:
+            failures.append(f"{name} accuracy drops by {drop*100:.2f} points")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if failures:
+        print("\n✗ INT8 model NOT cleared for shipping:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+    print("\n✓ INT8 model cleared for shipping")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
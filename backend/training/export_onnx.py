@@ -0,0 +1,54 @@
+"""
+Export the trained PyTorch classifier to ONNX
+Produces models/classifier.onnx, used by MODEL_BACKEND=onnx and by
+convert_to_tflite.py. The batch dimension is dynamic so the server can
+run micro-batches.
+
+Run from the repository root:
+    python -m backend.training.export_onnx
+"""
+
+import os
+import torch
+from backend.services.inference import InferenceService
+
+MODEL_DIR = os.path.join(os.path.dirname(__file__), "../models")
+ONNX_PATH = os.path.join(MODEL_DIR, "classifier.onnx")
+OPSET = 17
+
+
+def export_onnx(model: torch.nn.Module, path: str = ONNX_PATH):
+    model = model.cpu().eval()
+    dummy = torch.randn(1, 3, 224, 224)
+    torch.onnx.export(
+        model,
+        dummy,
+        path,
+        input_names=["input"],
+        output_names=["logits"],
+        dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}},
+        opset_version=OPSET,
+        do_constant_folding=True,
+    )
+    return path
+
+
+def main():
+    print("="*50)
+    print("Exporting PyTorch -> ONNX")
+    print("="*50)
+
+    service = InferenceService()
+    if service.model is None:
+        print(f"\n✗ No trained model at {service.model_path}")
+        return False
+
+    export_onnx(service.model)
+    size_mb = os.path.getsize(ONNX_PATH) / 1024 / 1024
+    print(f"\n✓ ONNX model saved: {ONNX_PATH}")
+    print(f"  Size: {size_mb:.2f} MB")
+    return True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Export the trained classifier as an optimized TorchScript artifact
+=================================================================
+trace (channels_last) -> freeze (BatchNorm folded into the convs, weights
+become constants) -> optionally torch.jit.optimize_for_inference.
+
+Produces models/classifier_ts.pt. The default torch backend serves it
+whenever it is present and was exported from the current checkpoint
+(TORCHSCRIPT_ENABLED). Besides the logits the artifact returns the backbone
+stages the segmentation decoder taps (the last one is the map GradCAM
+differentiates), so the fused GradCAM and mask passes run the frozen
+backbone too; only the small eager heads run on its outputs.
+
+optimize_for_inference rewrites convolutions to MKLDNN, which helps on some
+CPUs and hurts on others (depthwise-heavy EfficientNet, few cores). With
+--optimize auto both variants are timed on this machine and the faster one
+is kept; export on hardware like the serving host.
+
+The export is refused if the artifact's softmax differs from the eager
+model by more than --atol. Run from the repository root:
+    python -m backend.training.export_torchscript
+"""
+
+import argparse
+import copy
+import json
+import os
+import time
+import torch
+import torch.nn as nn
+from backend.core.config import settings
+from backend.services.backends import file_sha1
+from backend.services.segmentation import ENCODER_TAPS, encode
+
+INPUT_SIZE = 224
+METADATA_FILE = "metadata.json"
+
+
+def _example(batch_size: int = 1) -> torch.Tensor:
+    return torch.randn(batch_size, 3, INPUT_SIZE, INPUT_SIZE).contiguous(memory_format=torch.channels_last)
+
+
+class EncoderOutputs(nn.Module):
+    """The classifier, returning (logits, *feature maps at `taps`) from one backbone pass."""
+
+    def __init__(self, model: nn.Module, taps=ENCODER_TAPS):
+        super().__init__()
+        self.model = model
+        self.taps = tuple(taps)
+
+    def forward(self, x: torch.Tensor) -> tuple:
+        features, outputs = encode(self.model.features, x, self.taps)
+        logits = self.model.classifier(torch.flatten(self.model.avgpool(features), 1))
+        return (logits,) + tuple(outputs[tap] for tap in self.taps)
+
+
+def freeze(model: nn.Module, optimize: bool) -> torch.jit.ScriptModule:
+    model = EncoderOutputs(copy.deepcopy(model)).cpu().eval().to(memory_format=torch.channels_last)
+    with torch.no_grad():
+        frozen = torch.jit.freeze(torch.jit.trace(model, _example()))
+        if optimize:
+            frozen = torch.jit.optimize_for_inference(frozen)
+    return frozen
+
+
+def count_batch_norms(module: torch.jit.ScriptModule) -> int:
+    return sum(1 for node in module.graph.nodes() if node.kind() == "aten::batch_norm")
+
+
+def median_ms(module, batch: torch.Tensor, repeat: int = 10) -> float:
+    durations = []
+    with torch.no_grad():
+        for i in range(repeat + 3):  # The first runs profile and optimize the graph
+            start = time.perf_counter()
+            module(batch)
+            if i >= 3:
+                durations.append(time.perf_counter() - start)
+    return sorted(durations)[len(durations) // 2] * 1000
+
+
+def max_prob_diff(model: nn.Module, module, batch: torch.Tensor) -> float:
+    with torch.no_grad():
+        reference = torch.softmax(model(batch.contiguous()), dim=1)
+        probabilities = torch.softmax(module(batch)[0], dim=1)
+    return float((probabilities - reference).abs().max())
+
+
+def export_torchscript(model: nn.Module, path: str, source_path: str = None, optimize: str = "auto",
+                       atol: float = 1e-4) -> dict:
+    """
+    Writes the artifact and returns its metadata (also stored inside the
+    file). Raises ValueError when the parity check fails.
+    """
+    model = model.cpu().eval()
+    batch = _example(8)
+    candidates = {"frozen": freeze(model, optimize=False)} if optimize != "on" else {}
+    if optimize != "off":
+        candidates["frozen+optimize_for_inference"] = freeze(model, optimize=True)
+
+    timings = {name: round(median_ms(module, batch), 2) for name, module in candidates.items()}
+    timings["eager"] = round(median_ms(model, batch.contiguous()), 2)
+    variant = min(candidates, key=timings.get)
+    module = candidates[variant]
+
+    diff = max_prob_diff(model, module, torch.randn(8, 3, INPUT_SIZE, INPUT_SIZE).contiguous(memory_format=torch.channels_last))
+    if diff > atol:
+        raise ValueError(f"{variant} artifact differs from the eager model by {diff:.2e} (> {atol:.0e})")
+
+    metadata = {
+        "variant": variant,
+        "memory_format": "channels_last",
+        "taps": list(ENCODER_TAPS),
+        "batch_norms_left": count_batch_norms(module),
+        "max_abs_prob_diff": diff,
+        "batch8_ms": timings,
+        "torch": torch.__version__,
+        "torch_threads": torch.get_num_threads(),
+        "source_sha1": file_sha1(source_path) if source_path else None,
+    }
+    torch.jit.save(module, path, _extra_files={METADATA_FILE: json.dumps(metadata)})
+    return metadata
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Optimized TorchScript export")
+    parser.add_argument("--optimize", choices=["auto", "on", "off"], default="auto",
+                        help="torch.jit.optimize_for_inference (auto: keep it only if faster here)")
+    parser.add_argument("--atol", type=float, default=1e-4, help="Max softmax difference vs. eager")
+    parser.add_argument("--output", default=settings.TORCHSCRIPT_PATH)
+    args = parser.parse_args()
+
+    print("="*50)
+    print("Exporting PyTorch -> optimized TorchScript")
+    print("="*50)
+
+    from backend.services.inference import InferenceService
+    service = InferenceService()
+    if service.model is None:
+        print(f"\n✗ No trained model at {service.model_path}")
+        return False
+
+    try:
+        metadata = export_torchscript(service.model, args.output, service.model_path, args.optimize, args.atol)
+    except ValueError as e:
+        print(f"\n✗ {e}")
+        return False
+
+    size_mb = os.path.getsize(args.output) / 1024 / 1024
+    print(f"\n✓ TorchScript model saved: {args.output}")
+    print(f"  Variant: {metadata['variant']} ({metadata['batch_norms_left']} BatchNorm left)")
+    print(f"  Batch-8 latency (ms): {metadata['batch8_ms']}")
+    print(f"  Max |softmax diff| vs eager: {metadata['max_abs_prob_diff']:.2e}")
+    print(f"  Size: {size_mb:.2f} MB")
+    return True
+
+
+if __name__ == "__main__":
+    main()
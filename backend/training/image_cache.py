@@ -0,0 +1,160 @@
+"""
+Pre-decoded image cache for training
+====================================
+Decoding and resizing the JPEGs is most of the data-loading cost, and an
+ImageFolder pays it again in every epoch. build_cache() decodes each split
+once, resizes it exactly as the first transform step does
+(Resize((size, size)), PIL bilinear) and stores the uint8 RGB pixels in
+memory-mapped .npy shards:
+
+    <cache_dir>/<split>/index.json      classes, samples, targets, size
+    <cache_dir>/<split>/shard_000.npy   (shard_size, size, size, 3) uint8
+
+CachedImageFolder hands each row back as a PIL image (a 150 KB copy
+instead of a JPEG decode + resize). The usual PIL transforms then run on
+it, minus the Resize (get_data_transforms(..., cached=True)). Each
+DataLoader worker opens the shards lazily, so the pages come from the OS
+page cache shared by all workers, not from pickled copies. A split is
+rebuilt when its file list or the image size changes.
+
+Build ahead of time (train.py --cache-dir builds whatever is missing):
+    python -m backend.training.image_cache --data-dir "/data/Brain MRI" --cache-dir "/data/Brain MRI cache"
+"""
+
+import argparse
+import json
+import os
+import time
+import numpy as np
+from PIL import Image
+from torch.utils.data import DataLoader, Dataset
+from torchvision import datasets, transforms
+
+INDEX_FILE = "index.json"
+SHARD_SIZE = 1024  # Images per shard (~150 MB at 224x224)
+SPLITS = ("Training", "Validation", "Testing")
+
+
+def _to_hwc_array(image) -> np.ndarray:
+    return np.asarray(image.convert("RGB"), dtype=np.uint8)
+
+
+def _collate_arrays(batch):
+    images, targets = zip(*batch)
+    return np.stack(images), list(targets)
+
+
+def _index_for(folder: datasets.ImageFolder, root: str, size: int) -> dict:
+    return {
+        "size": size,
+        "classes": folder.classes,
+        "samples": [os.path.relpath(path, root) for path, _ in folder.samples],
+        "targets": list(folder.targets),
+        "shard_size": SHARD_SIZE,
+    }
+
+
+def _read_index(split_dir: str):
+    try:
+        with open(os.path.join(split_dir, INDEX_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def build_split(split_root: str, split_dir: str, size: int, num_workers: int = 0) -> dict:
+    """Decodes + resizes one ImageFolder split into shards. Returns its index (reused if current)."""
+    folder = datasets.ImageFolder(split_root, transforms.Compose([transforms.Resize((size, size)), _to_hwc_array]))
+    index = _index_for(folder, split_root, size)
+    existing = _read_index(split_dir)
+    if existing is not None and all(existing.get(key) == index[key] for key in ("size", "samples", "targets")):
+        return existing
+
+    os.makedirs(split_dir, exist_ok=True)
+    # The index goes last: an interrupted build is never mistaken for a complete one
+    if os.path.exists(os.path.join(split_dir, INDEX_FILE)):
+        os.remove(os.path.join(split_dir, INDEX_FILE))
+    start = time.time()
+    loader = DataLoader(folder, batch_size=64, num_workers=num_workers, collate_fn=_collate_arrays)
+    shard, shard_number, written = None, -1, 0
+    for images, _ in loader:
+        for image in images:
+            offset = written % SHARD_SIZE
+            if offset == 0:
+                if shard is not None:
+                    shard.flush()
+                shard_number += 1
+                count = min(SHARD_SIZE, len(folder) - written)
+                shard = np.lib.format.open_memmap(os.path.join(split_dir, f"shard_{shard_number:03d}.npy"), mode="w+",
+                                                  dtype=np.uint8, shape=(count, size, size, 3))
+            shard[offset] = image
+            written += 1
+    if shard is not None:
+        shard.flush()
+    with open(os.path.join(split_dir, INDEX_FILE), "w") as f:
+        json.dump(index, f)
+    print(f"✓ Cached {os.path.basename(split_root)}: {written} images in {shard_number + 1} shard(s) "
+          f"({written * size * size * 3 / 1024 / 1024:.0f} MB, {time.time() - start:.0f}s)")
+    return index
+
+
+def build_cache(data_dir: str, cache_dir: str, size: int, splits=SPLITS, num_workers: int = 0):
+    for split in splits:
+        build_split(os.path.join(data_dir, split), os.path.join(cache_dir, split), size, num_workers)
+
+
+class CachedImageFolder(Dataset):
+    """
+    ImageFolder over a built cache split: same classes, targets and sample
+    order; items are (transform(resized PIL RGB image), target).
+    """
+
+    def __init__(self, split_dir: str, transform=None):
+        index = _read_index(split_dir)
+        if index is None:
+            raise FileNotFoundError(f"No image cache at {split_dir} (run build_cache first)")
+        self.split_dir = split_dir
+        self.transform = transform
+        self.classes = index["classes"]
+        self.class_to_idx = {name: i for i, name in enumerate(self.classes)}
+        self.targets = index["targets"]
+        self.shard_size = index["shard_size"]
+        self.size = index["size"]
+        self._shards = None
+
+    def __getstate__(self):
+        # Workers open their own maps; never pickle the pixel data
+        state = self.__dict__.copy()
+        state["_shards"] = None
+        return state
+
+    def _open(self) -> list:
+        count = -(-len(self.targets) // self.shard_size)
+        return [np.load(os.path.join(self.split_dir, f"shard_{number:03d}.npy"), mmap_mode="r")
+                for number in range(count)]
+
+    def __len__(self):
+        return len(self.targets)
+
+    def __getitem__(self, index):
+        if self._shards is None:
+            self._shards = self._open()
+        shard, offset = divmod(index, self.shard_size)
+        image = Image.fromarray(np.array(self._shards[shard][offset]))
+        if self.transform is not None:
+            image = self.transform(image)
+        return image, self.targets[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the pre-decoded training image cache")
+    parser.add_argument("--data-dir", required=True)
+    parser.add_argument("--cache-dir", required=True)
+    parser.add_argument("--size", type=int, default=224)
+    parser.add_argument("--num-workers", type=int, default=min(4, os.cpu_count() or 1))
+    args = parser.parse_args()
+    build_cache(args.data_dir, args.cache_dir, args.size, num_workers=args.num_workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+INT8 Post-Training Quantization for CPU serving
+=================================================
+static  : FX graph-mode static PTQ (conv + linear, x86/fbgemm kernels),
+          calibrated on a slice of the training split.
+dynamic : dynamic quantization of the Linear head only (no calibration,
+          smaller gain - the backbone stays fp32).
+
+The result is saved as frozen TorchScript (models/classifier_int8.pt) and
+served with MODEL_PRECISION=int8. Run evaluate_quantized.py before shipping.
+
+Run from the repository root:
+    python -m backend.training.quantize --mode static --data-dir "/data/Brain MRI"
+"""
+
+import argparse
+import os
+import copy
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader, Subset
+from torchvision import datasets
+from torch.ao.quantization import get_default_qconfig_mapping, quantize_dynamic
+from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+from backend.core.config import settings
+from backend.services.inference import InferenceService
+from backend.training.train import DATA_DIR, INPUT_SIZE, get_data_transforms
+
+QUANTIZED_ENGINE = "x86" if "x86" in torch.backends.quantized.supported_engines else "fbgemm"
+
+
+def load_fp32_model() -> nn.Module:
+    service = InferenceService()
+    if service.model is None:
+        raise SystemExit(f"✗ No fp32 model at {service.model_path}")
+    return copy.deepcopy(service.model).cpu().eval()
+
+
+def calibration_loader(data_dir: str, num_images: int, batch_size: int = 16) -> DataLoader:
+    dataset = datasets.ImageFolder(os.path.join(data_dir, "Training"), get_data_transforms(INPUT_SIZE)["Testing"])
+    # Evenly spaced subset so every class folder is represented
+    step = max(1, len(dataset) // num_images)
+    indices = list(range(0, len(dataset), step))[:num_images]
+    return DataLoader(Subset(dataset, indices), batch_size=batch_size, shuffle=False, num_workers=0)
+
+
+def quantize_static(model: nn.Module, loader: DataLoader) -> nn.Module:
+    torch.backends.quantized.engine = QUANTIZED_ENGINE
+    example_inputs = (torch.randn(1, 3, INPUT_SIZE, INPUT_SIZE),)
+    prepared = prepare_fx(model, get_default_qconfig_mapping(QUANTIZED_ENGINE), example_inputs)
+
+    print(f"Calibrating on {len(loader.dataset)} images...")
+    with torch.no_grad():
+        for inputs, _ in loader:
+            prepared(inputs)
+    return convert_fx(prepared)
+
+
+def quantize_linear_head(model: nn.Module) -> nn.Module:
+    torch.backends.quantized.engine = QUANTIZED_ENGINE
+    return quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+
+def save_torchscript(model: nn.Module, path: str):
+    example = torch.randn(1, 3, INPUT_SIZE, INPUT_SIZE)
+    with torch.no_grad():
+        scripted = torch.jit.freeze(torch.jit.trace(model, example))
+    torch.jit.save(scripted, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="INT8 post-training quantization")
+    parser.add_argument("--mode", choices=["static", "dynamic"], default="static")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--calibration-images", type=int, default=256)
+    parser.add_argument("--output", default=settings.QUANTIZED_PATH)
+    args = parser.parse_args()
+
+    print('='*50)
+    print(f'INT8 QUANTIZATION ({args.mode}, engine={QUANTIZED_ENGINE})')
+    print('='*50)
+
+    model = load_fp32_model()
+    if args.mode == "static":
+        quantized = quantize_static(model, calibration_loader(args.data_dir, args.calibration_images))
+    else:
+        quantized = quantize_linear_head(model)
+
+    save_torchscript(quantized, args.output)
+    size_mb = os.path.getsize(args.output) / 1024 / 1024
+    print(f'\n✓ Quantized model saved: {args.output} ({size_mb:.2f} MB)')
+    print('  Gate it with: python -m backend.training.evaluate_quantized')
+
+
+if __name__ == '__main__':
+    main()
@@ -5,8 +5,13 @@
 ✓ High Precision: Focal Loss + Class Weights
 ✓ High Accuracy: Strong augmentation + proper regularization
 ✓ MRI-Ready: Grayscale-aware preprocessing
+✓ Fast input: optional loader workers (--num-workers) + pre-decoded cache (--cache-dir)
+
+--cache-dir imports backend.training.image_cache, so run that mode from the
+repository root as a module: python -m backend.training.train --cache-dir ...
 """
 
+import argparse
 import os
 import copy
 import time
@@ -31,6 +36,7 @@ INPUT_SIZE = 224
 LEARNING_RATE = 0.001
 EARLY_STOP_PATIENCE = 5
 COOLING_PAUSE = 8  # Seconds
+NUM_WORKERS = 0  # DataLoader worker processes (kept alive across epochs when > 0)
 
 # =============================================================================
 # FOCAL LOSS (Better precision on hard cases)
@@ -50,7 +56,17 @@ class FocalLoss(nn.Module):
 # =============================================================================
 # DATA TRANSFORMS (MRI-optimized)
 # =============================================================================
-def get_data_transforms(input_size):
+def get_data_transforms(input_size, cached=False):
+    """
+    cached=True: for the image cache, whose images are already resized to
+    input_size - the same transforms without the Resize.
+    """
+    normalize = transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
+    if cached:
+        return {
+            split: transforms.Compose([t for t in pipeline.transforms if not isinstance(t, transforms.Resize)])
+            for split, pipeline in get_data_transforms(input_size).items()
+        }
     return {
         'Training': transforms.Compose([
             transforms.Resize((input_size, input_size)),
@@ -59,43 +75,57 @@ def get_data_transforms(input_size):
             transforms.RandomAffine(degrees=0, translate=(0.05, 0.05)),
             transforms.ColorJitter(brightness=0.1, contrast=0.1),
             transforms.ToTensor(),
-            transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225]),
+            normalize,
         ]),
         'Validation': transforms.Compose([
             transforms.Resize((input_size, input_size)),
             transforms.ToTensor(),
-            transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
+            normalize
         ]),
         'Testing': transforms.Compose([
             transforms.Resize((input_size, input_size)),
             transforms.ToTensor(),
-            transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225])
+            normalize
         ]),
     }
 
-def load_data():
+def class_weights_from_targets(targets, num_classes):
+    """Inverse-frequency weights (mean 1) from the dataset's labels alone - no image is decoded."""
+    class_counts = Counter(targets)
+    total = sum(class_counts.values())
+    class_weights = torch.tensor([total / class_counts[i] for i in range(num_classes)], dtype=torch.float32)
+    return class_weights / class_weights.sum() * num_classes
+
+def load_data(data_dir=DATA_DIR, cache_dir=None, num_workers=NUM_WORKERS):
+    """
+    cache_dir: decode + resize every split once into memory-mapped uint8
+    shards (image_cache.py) and train from them; built on first use.
+    """
     print("Loading dataset...")
-    data_transforms = get_data_transforms(INPUT_SIZE)
+    splits = ['Training', 'Validation', 'Testing']
+    data_transforms = get_data_transforms(INPUT_SIZE, cached=cache_dir is not None)
     
-    image_datasets = {
-        x: datasets.ImageFolder(os.path.join(DATA_DIR, x), data_transforms[x])
-        for x in ['Training', 'Validation', 'Testing']
-    }
+    if cache_dir is not None:
+        from backend.training.image_cache import CachedImageFolder, build_cache
+        build_cache(data_dir, cache_dir, INPUT_SIZE, splits, num_workers=num_workers)
+        image_datasets = {x: CachedImageFolder(os.path.join(cache_dir, x), data_transforms[x]) for x in splits}
+    else:
+        image_datasets = {
+            x: datasets.ImageFolder(os.path.join(data_dir, x), data_transforms[x])
+            for x in splits
+        }
     
     dataloaders = {
-        x: DataLoader(image_datasets[x], batch_size=BATCH_SIZE, shuffle=(x == 'Training'), num_workers=0)
-        for x in ['Training', 'Validation', 'Testing']
+        x: DataLoader(image_datasets[x], batch_size=BATCH_SIZE, shuffle=(x == 'Training'), num_workers=num_workers,
+                      persistent_workers=num_workers > 0, pin_memory=torch.cuda.is_available())
+        for x in splits
     }
     
-    dataset_sizes = {x: len(image_datasets[x]) for x in ['Training', 'Validation', 'Testing']}
+    dataset_sizes = {x: len(image_datasets[x]) for x in splits}
     class_names = image_datasets['Training'].classes
     
     # Class weights
-    train_labels = [label for _, label in image_datasets['Training']]
-    class_counts = Counter(train_labels)
-    total = sum(class_counts.values())
-    class_weights = torch.tensor([total / class_counts[i] for i in range(len(class_names))], dtype=torch.float32)
-    class_weights = class_weights / class_weights.sum() * len(class_names)
+    class_weights = class_weights_from_targets(image_datasets['Training'].targets, len(class_names))
     
     return dataloaders, dataset_sizes, class_names, class_weights
 
@@ -132,6 +162,7 @@ def train_model(model, dataloaders, dataset_sizes, criterion, optimizer, schedul
         
         for phase in ['Training', 'Validation']:
             model.train() if phase == 'Training' else model.eval()
+            phase_start = time.time()
             
             running_loss = 0.0
             running_corrects = 0
@@ -156,7 +187,7 @@ def train_model(model, dataloaders, dataset_sizes, criterion, optimizer, schedul
             epoch_loss = running_loss / dataset_sizes[phase]
             epoch_acc = running_corrects.double() / dataset_sizes[phase]
             
-            print(f'{phase:10} Loss: {epoch_loss:.4f} | Acc: {epoch_acc*100:.2f}%')
+            print(f'{phase:10} Loss: {epoch_loss:.4f} | Acc: {epoch_acc*100:.2f}% | {time.time() - phase_start:.0f}s')
             
             if phase == 'Validation':
                 if epoch_acc > best_acc:
@@ -212,6 +243,13 @@ def test_model(model, dataloader, dataset_size, class_names, device):
 # MAIN
 # =============================================================================
 def main():
+    parser = argparse.ArgumentParser(description="Train the EfficientNet-B0 classifier")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--cache-dir", help="Train from pre-decoded uint8 shards here (built on first use)")
+    parser.add_argument("--num-workers", type=int, default=NUM_WORKERS,
+                        help="DataLoader worker processes, e.g. 4 (default: load in the main process)")
+    args = parser.parse_args()
+    
     print('='*50)
     print('BRAIN TUMOR CLASSIFICATION')
     print('Lightweight + High Accuracy')
@@ -220,7 +258,7 @@ def main():
     device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
     print(f'Device: {device}')
     
-    dataloaders, sizes, classes, weights = load_data()
+    dataloaders, sizes, classes, weights = load_data(args.data_dir, args.cache_dir, args.num_workers)
     print(f'Classes: {classes}')
     print(f'Training: {sizes["Training"]} | Val: {sizes["Validation"]} | Test: {sizes["Testing"]}')
     
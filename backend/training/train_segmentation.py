@@ -0,0 +1,171 @@
+"""
+Train the tumor segmentation head on the classifier's frozen backbone
+======================================================================
+The decoder (services/segmentation.py) reads the feature maps of the
+trained EfficientNet-B0 classifier, so the backbone is loaded from
+models/classifier_real.pth and kept frozen (eval mode, no gradients):
+serving shares one backbone pass between classification and segmentation,
+and the head must see exactly those features. Only the head is trained.
+
+Data: image/mask pairs with matching file names,
+    <data-dir>/images/<name>.(png|jpg)   MRI slice
+    <data-dir>/masks/<name>.(png|jpg)    tumor mask (non-zero = tumor)
+Images go through the classifier's transform (Resize -> ToTensor ->
+Normalize); masks are resized with nearest neighbour. Loss: BCE + soft Dice.
+
+Run from the repository root:
+    python -m backend.training.train_segmentation --data-dir "/data/Brain MRI Segmentation"
+"""
+
+import argparse
+import os
+import random
+import time
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+import torchvision.transforms.functional as TF
+from PIL import Image
+from torch.utils.data import DataLoader, Dataset, random_split
+from backend.core.config import settings
+from backend.services.backends import file_sha1
+from backend.services.preprocessing import MODEL_INPUT_SIZE, MODEL_TRANSFORM
+from backend.services.segmentation import SegmentationHead, encode
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp")
+
+
+class SegmentationPairs(Dataset):
+    def __init__(self, data_dir: str, augment: bool = False):
+        image_dir, mask_dir = os.path.join(data_dir, "images"), os.path.join(data_dir, "masks")
+        masks = {os.path.splitext(name)[0]: name for name in os.listdir(mask_dir) if name.lower().endswith(IMAGE_EXTENSIONS)}
+        self.pairs = [(os.path.join(image_dir, name), os.path.join(mask_dir, masks[os.path.splitext(name)[0]]))
+                      for name in sorted(os.listdir(image_dir))
+                      if name.lower().endswith(IMAGE_EXTENSIONS) and os.path.splitext(name)[0] in masks]
+        self.augment = augment
+
+    def __len__(self):
+        return len(self.pairs)
+
+    def __getitem__(self, index):
+        image_path, mask_path = self.pairs[index]
+        image = Image.open(image_path).convert("RGB")
+        mask = Image.open(mask_path).convert("L").resize(image.size, Image.NEAREST)
+        if self.augment:
+            # Same geometric transform for image and mask
+            if random.random() < 0.5:
+                image, mask = TF.hflip(image), TF.hflip(mask)
+            angle = random.uniform(-15, 15)
+            translate = [int(random.uniform(-0.05, 0.05) * size) for size in image.size]
+            image = TF.affine(image, angle, translate, 1.0, [0.0], interpolation=TF.InterpolationMode.BILINEAR)
+            mask = TF.affine(mask, angle, translate, 1.0, [0.0], interpolation=TF.InterpolationMode.NEAREST)
+        mask = mask.resize((MODEL_INPUT_SIZE, MODEL_INPUT_SIZE), Image.NEAREST)
+        target = torch.from_numpy((np.asarray(mask) > 0).astype(np.float32))[None]
+        return MODEL_TRANSFORM(image), target
+
+
+def dice_loss(logits: torch.Tensor, target: torch.Tensor, eps: float = 1.0) -> torch.Tensor:
+    probability = torch.sigmoid(logits)
+    intersection = (probability * target).sum(dim=(1, 2, 3))
+    union = probability.sum(dim=(1, 2, 3)) + target.sum(dim=(1, 2, 3))
+    return (1 - (2 * intersection + eps) / (union + eps)).mean()
+
+
+def load_backbone(device: torch.device) -> nn.Module:
+    from backend.services.inference import InferenceService
+    service = InferenceService()
+    if service.model is None:
+        raise SystemExit(f"✗ No trained classifier at {service.model_path} (the head reuses its backbone)")
+    backbone = service.model.features.to(device).eval()
+    for param in backbone.parameters():
+        param.requires_grad = False
+    return backbone
+
+
+def run_epoch(head, backbone, loader, device, optimizer=None) -> dict:
+    training = optimizer is not None
+    head.train(training)
+    totals = {"loss": 0.0, "dice": 0.0, "iou": 0.0}
+    for inputs, targets in loader:
+        inputs, targets = inputs.to(device), targets.to(device)
+        with torch.no_grad():
+            _, taps = encode(backbone, inputs)
+        with torch.set_grad_enabled(training):
+            logits = F.interpolate(head(taps), size=targets.shape[-2:], mode="bilinear", align_corners=False)
+            loss = F.binary_cross_entropy_with_logits(logits, targets) + dice_loss(logits, targets)
+            if training:
+                optimizer.zero_grad()
+                loss.backward()
+                optimizer.step()
+        predicted = (logits.detach() > 0).float()
+        intersection = (predicted * targets).sum(dim=(1, 2, 3))
+        union = predicted.sum(dim=(1, 2, 3)) + targets.sum(dim=(1, 2, 3))
+        totals["loss"] += loss.item() * inputs.size(0)
+        totals["dice"] += ((2 * intersection + 1) / (union + 1)).sum().item()
+        totals["iou"] += ((intersection + 1) / (union - intersection + 1)).sum().item()
+    return {name: value / len(loader.dataset) for name, value in totals.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the segmentation head on the frozen classifier backbone")
+    parser.add_argument("--data-dir", required=True)
+    parser.add_argument("--epochs", type=int, default=30)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--lr", type=float, default=1e-3)
+    parser.add_argument("--val-fraction", type=float, default=0.15)
+    parser.add_argument("--num-workers", type=int, default=2)
+    parser.add_argument("--output", default=settings.SEGMENTATION_PATH)
+    args = parser.parse_args()
+
+    print('='*50)
+    print('SEGMENTATION HEAD TRAINING (frozen EfficientNet-B0 backbone)')
+    print('='*50)
+
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    backbone = load_backbone(device)
+
+    dataset = SegmentationPairs(args.data_dir)
+    if len(dataset) == 0:
+        raise SystemExit(f"✗ No image/mask pairs under {args.data_dir}/images and {args.data_dir}/masks")
+    val_size = max(1, int(len(dataset) * args.val_fraction))
+    generator = torch.Generator().manual_seed(0)
+    train_set, val_set = random_split(dataset, [len(dataset) - val_size, val_size], generator=generator)
+    # Augment the training split only (random_split shares the dataset object)
+    train_set.dataset = SegmentationPairs(args.data_dir, augment=True)
+    loaders = {
+        "train": DataLoader(train_set, batch_size=args.batch_size, shuffle=True, num_workers=args.num_workers),
+        "val": DataLoader(val_set, batch_size=args.batch_size, shuffle=False, num_workers=args.num_workers),
+    }
+    print(f'Pairs: {len(train_set)} train | {len(val_set)} val | Device: {device}')
+
+    head = SegmentationHead().to(device)
+    optimizer = torch.optim.AdamW(head.parameters(), lr=args.lr, weight_decay=1e-4)
+    scheduler = torch.optim.lr_scheduler.CosineAnnealingLR(optimizer, T_max=args.epochs)
+    params = sum(p.numel() for p in head.parameters())
+    print(f'Head parameters: {params / 1e3:.0f}K')
+
+    best_dice, best_state = -1.0, None
+    for epoch in range(args.epochs):
+        start = time.time()
+        train = run_epoch(head, backbone, loaders["train"], device, optimizer)
+        val = run_epoch(head, backbone, loaders["val"], device)
+        scheduler.step()
+        print(f'Epoch {epoch+1:>3}/{args.epochs} | train loss {train["loss"]:.4f} dice {train["dice"]:.3f} | '
+              f'val loss {val["loss"]:.4f} dice {val["dice"]:.3f} iou {val["iou"]:.3f} | {time.time() - start:.0f}s')
+        if val["dice"] > best_dice:
+            best_dice = val["dice"]
+            best_state = {name: value.detach().cpu().clone() for name, value in head.state_dict().items()}
+            print(f'  ✓ New best: dice {best_dice:.3f}')
+
+    torch.save({
+        "state_dict": best_state,
+        "decoder_channels": head.decoder_channels,
+        "encoder_sha1": file_sha1(settings.CLASSIFIER_PATH),
+        "val_dice": best_dice,
+    }, args.output)
+    print(f'\n✓ Segmentation head saved: {args.output} (val dice {best_dice:.3f})')
+
+
+if __name__ == '__main__':
+    main()